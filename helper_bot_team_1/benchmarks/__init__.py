@@ -0,0 +1,3 @@
+"""
+Benchmarks of the helper bot. Run from the folder with setup.py: python -m benchmarks --help
+"""
@@ -0,0 +1,104 @@
+import datetime
+import io
+import os
+import random
+import tarfile
+import zipfile
+from typing import List
+
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.notebook import NoteRecord
+
+FIRST_NAMES = ("Oleksandr", "Олександр", "Olena", "Олена", "Ivan", "Іван", "Maria", "Марія",
+               "Dmytro", "Дмитро", "Anna", "Ганна", "Yurii", "Юрій", "Sofiia", "Софія")
+LAST_NAMES = ("Petrenko", "Петренко", "Kovalenko", "Коваленко", "Shevchenko", "Шевченко",
+              "Bondarenko", "Бондаренко", "Tkachenko", "Ткаченко", "Kravets", "Кравець")
+WORDS = ("milk", "bread", "meeting", "deadline", "trip", "Київ", "Львів", "подарунок",
+         "зустріч", "report", "budget", "doctor", "ремонт", "garden", "книга", "film", "birthday",
+         "project", "invoice", "погода")
+TAGS = ("work", "home", "shop", "travel", "ideas", "urgent", "family", "робота", "дім")
+EXTENSIONS = (".jpg", ".png", ".mp4", ".txt", ".pdf", ".docx", ".mp3", ".ogg", ".xyz", ".log", "")
+FILE_STEMS = ("photo", "фото", "document", "документ", "song", "пісня", "notes", "a b c", "scan (1)")
+
+
+def make_contacts(count: int, seed: int = 0) -> List[Record]:
+    """
+    Generates contacts with Latin and Cyrillic names, phones, birthdays and emails.
+
+    :param count: number of contacts
+    :param seed: seed of the random generator, the same seed gives the same contacts
+    :return: the contacts
+    """
+    generator = random.Random(seed)
+    today = datetime.date.today()
+    records = []
+    for i in range(count):
+        record = Record(f"{generator.choice(FIRST_NAMES)} {generator.choice(LAST_NAMES)} {i}")
+        for _ in range(generator.randint(0, 3)):
+            record.add_phone("0" + "".join(generator.choices("0123456789", k=9)))
+        if generator.random() < 0.7:
+            birthday = today - datetime.timedelta(days=generator.randint(365, 365 * 80))
+            record.add_birthday(birthday.strftime("%d.%m.%Y"))
+        if generator.random() < 0.5:
+            record.add_email(f"user{i}@example.com")
+        records.append(record)
+    return records
+
+
+def make_notes(count: int, seed: int = 0, words: int = 50) -> List[NoteRecord]:
+    """
+    Generates notes with texts from a small vocabulary and a few tags.
+
+    :param count: number of notes
+    :param seed: seed of the random generator
+    :param words: number of words in the text of a note
+    :return: the notes
+    """
+    generator = random.Random(seed)
+    return [NoteRecord(f"note {i}", " ".join(generator.choices(WORDS, k=words)),
+                       generator.sample(TAGS, generator.randint(0, 3)))
+            for i in range(count)]
+
+
+def make_tree(root: str, files: int, seed: int = 0, files_per_folder: int = 50, archives: float = 0.02) -> None:
+    """
+    Generates a folder to sort: nested folders with files of mixed extensions, Cyrillic names and small zip and
+    tar.gz archives.
+
+    :param root: path to the folder to create
+    :param files: number of files
+    :param seed: seed of the random generator
+    :param files_per_folder: average number of files in a folder
+    :param archives: share of the files that are archives
+    """
+    generator = random.Random(seed)
+    folders = [root]
+    os.makedirs(root, exist_ok=True)
+    for i in range(files):
+        if i % files_per_folder == 0 and i:
+            parent = generator.choice(folders)
+            folder_name = generator.choice(("папка", "folder", "нова тека"))
+            folder = os.path.join(parent, f"{folder_name} {len(folders)}")
+            os.makedirs(folder, exist_ok=True)
+            folders.append(folder)
+        folder = folders[-1]
+        stem = f"{generator.choice(FILE_STEMS)} {i}"
+        if generator.random() < archives:
+            write_archive(os.path.join(folder, stem), generator)
+        else:
+            with open(os.path.join(folder, stem + generator.choice(EXTENSIONS)), "wb") as f:
+                f.write(os.urandom(generator.randint(0, 4096)))
+
+
+def write_archive(path: str, generator: random.Random) -> None:
+    members = {f"inner {i}.txt": os.urandom(generator.randint(0, 4096)) for i in range(generator.randint(1, 5))}
+    if generator.random() < 0.5:
+        with zipfile.ZipFile(path + ".zip", "w") as zip_file:
+            for name, data in members.items():
+                zip_file.writestr(name, data)
+    else:
+        with tarfile.open(path + ".tar.gz", "w:gz") as tar_file:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar_file.addfile(info, io.BytesIO(data))
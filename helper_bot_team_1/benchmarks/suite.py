@@ -0,0 +1,242 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from benchmarks.generate import make_contacts, make_notes, make_tree
+from helper_bot_team_1.features.addressbook import AddressBook
+from helper_bot_team_1.features.journal import load_snapshot, write_snapshot
+from helper_bot_team_1.features.notebook import Notebook
+from helper_bot_team_1.features.records_container import STORAGES, JOURNAL_STORAGE
+from helper_bot_team_1.features.sorter import plan_folder, sort_folder
+
+GROUPS = ("contacts", "notes", "sort")
+DEFAULT_SIZES = "1000,10000,100000"
+DEFAULT_FILES = "1000,10000"
+DEFAULT_THRESHOLD = 0.2
+# differences smaller than this are noise whatever the ratio is
+MIN_DIFFERENCE = 0.001
+
+
+def measure(action: Callable, repeat: int = 1, setup: None | Callable = None) -> float:
+    """
+    Times the action. The best of the repeats is taken, as the slower runs are slowed down by something else.
+
+    :param action: what to time
+    :param repeat: how many times to run it
+    :param setup: what to run before each run without timing it
+    :return: seconds the fastest run took
+    """
+    best = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def consume(result) -> None:
+    """
+    Reads a result to the end, the commands that show records return generators that do nothing until read.
+    """
+    if not isinstance(result, str):
+        for _ in result:
+            pass
+
+
+def bench_contacts(folder: str, size: int, storage: str, repeat: int) -> dict[str, float]:
+    results = {}
+    records = make_contacts(size)
+    save_file = os.path.join(folder, f"contacts_{storage}_{size}.bin")
+
+    def add_all():
+        book = AddressBook(save_file, storage)
+        book.data.begin_batch()
+        book.data.add_records(records)
+        book.data.backup_data()
+
+    results["add"] = measure(add_all)
+    results["load"] = measure(lambda: AddressBook(save_file, storage), repeat)
+
+    book = AddressBook(save_file, storage)
+    name = records[len(records) // 2].name.value
+    # the indexed text is lowercase, so is the needle, otherwise only the fuzzy fallback would be timed
+    results["search.first"] = measure(lambda: consume(book.handle_command("search", "petrenko")))
+    results["search"] = measure(lambda: consume(book.handle_command("search", "petrenko")), repeat)
+    results["search.missing"] = measure(lambda: consume(book.handle_command("search", "nothing like this")), repeat)
+    results["search.fuzzy"] = measure(lambda: consume(book.handle_command("search", "olexandr", "--fuzzy")), repeat)
+    results["search.phone"] = measure(lambda: consume(book.handle_command("search", "067")), repeat)
+    results["show"] = measure(lambda: consume(book.handle_command("show")), repeat)
+    results["birthdays"] = measure(lambda: consume(book.handle_command("birthdays", "30")), repeat)
+    results["change"] = measure(lambda: book.handle_command("change", f"name={name}", "email=new@example.com"),
+                                repeat)
+    results["backup"] = measure(book.data.backup_data, repeat)
+    if storage == JOURNAL_STORAGE:
+        snapshot_file = save_file + ".snapshot"
+        results["snapshot.save"] = measure(lambda: write_snapshot(snapshot_file, book.data.data), repeat)
+        results["snapshot.load"] = measure(lambda: load_snapshot(snapshot_file), repeat)
+    book.close()
+    return results
+
+
+def bench_notes(folder: str, size: int, storage: str, repeat: int) -> dict[str, float]:
+    results = {}
+    notes = make_notes(size)
+    save_file = os.path.join(folder, f"notes_{storage}_{size}.bin")
+
+    def add_all():
+        notebook = Notebook(save_file, storage)
+        notebook.data.begin_batch()
+        notebook.data.add_records(notes)
+        notebook.data.backup_data()
+
+    results["add"] = measure(add_all)
+    results["load"] = measure(lambda: Notebook(save_file, storage), repeat)
+
+    notebook = Notebook(save_file, storage)
+    results["search.first"] = measure(lambda: consume(notebook.handle_command("search", "Київ", "budget")))
+    results["search"] = measure(lambda: consume(notebook.handle_command("search", "Київ", "budget")), repeat)
+    results["tags"] = measure(lambda: consume(notebook.handle_command("tags", "work", "AND", "NOT", "home")), repeat)
+    results["show"] = measure(lambda: consume(notebook.handle_command("show")), repeat)
+    results["backup"] = measure(notebook.data.backup_data, repeat)
+    notebook.close()
+    return results
+
+
+def bench_sort(folder: str, files: int, repeat: int) -> dict[str, float]:
+    results = {}
+    source = os.path.join(folder, f"tree_{files}")
+    make_tree(source, files)
+    target = os.path.join(folder, "sorted")
+
+    def fresh_copy():
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(source, target)
+
+    results["plan"] = measure(lambda: plan_folder(target, full=True), repeat, fresh_copy)
+    results["serial"] = measure(lambda: sort_folder(target), repeat, fresh_copy)
+    results["incremental"] = measure(lambda: sort_folder(target), repeat)
+    results["jobs4"] = measure(lambda: sort_folder(target, jobs=4), repeat, fresh_copy)
+    results["nested"] = measure(lambda: sort_folder(target, nested=True), repeat, fresh_copy)
+    results["dedupe"] = measure(lambda: sort_folder(target, dedupe="report"), repeat, fresh_copy)
+    shutil.rmtree(target, ignore_errors=True)
+    return results
+
+
+def run(sizes: list[int], files: list[int], storages: list[str], groups: list[str], repeat: int) -> dict:
+    """
+    Runs the benchmarks.
+
+    :param sizes: numbers of contacts and notes
+    :param files: numbers of files in the sorted folders
+    :param storages: storages to load and save the records with
+    :param groups: which benchmarks to run: "contacts", "notes" and "sort"
+    :param repeat: how many times to run each timed action
+    :return: the results with a description of the machine, the timings are in seconds by names like
+    "contacts.journal.1000.search"
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for group in groups:
+            if group == "sort":
+                runs = [(f"sort.{count}", lambda count=count: bench_sort(folder, count, repeat)) for count in files]
+            else:
+                bench = bench_contacts if group == "contacts" else bench_notes
+                runs = [(f"{group}.{storage}.{size}",
+                         lambda size=size, storage=storage, bench=bench: bench(folder, size, storage, repeat))
+                        for storage in storages for size in sizes]
+            for prefix, bench_run in runs:
+                print(f"{prefix}...", file=sys.stderr, flush=True)
+                for name, seconds in bench_run().items():
+                    results[f"{prefix}.{name}"] = seconds
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[tuple]:
+    """
+    Compares the results with the baseline.
+
+    :param results: new timings by names
+    :param baseline: old timings by names
+    :param threshold: how much slower, as a share of the old timing, is a regression
+    :return: rows of a name, the old and the new timing and whether it is a regression, for the names in both
+    """
+    rows = []
+    for name, seconds in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        regression = seconds > old * (1 + threshold) and seconds - old > MIN_DIFFERENCE
+        rows.append((name, old, seconds, regression))
+    return rows
+
+
+def format_table(rows: list[tuple]) -> str:
+    width = max((len(row[0]) for row in rows), default=4)
+    lines = [f"{'name':<{width}}  {'baseline':>10}  {'now':>10}  {'change':>8}"]
+    for name, old, new, regression in rows:
+        change = f"{(new - old) / old:+.0%}" if old else "n/a"
+        lines.append(f"{name:<{width}}  {old * 1000:>8.2f}ms  {new * 1000:>8.2f}ms  {change:>8}"
+                     + ("  REGRESSION" if regression else ""))
+    return "\n".join(lines)
+
+
+def parse_numbers(value: str) -> list[int]:
+    return [int(number) for number in value.split(",") if number]
+
+
+def main(argv: None | list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Times the storages, the search, the birthdays and the folder sort "
+                                                 "on generated data.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, type=parse_numbers,
+                        help=f"numbers of contacts and notes, comma separated (default {DEFAULT_SIZES})")
+    parser.add_argument("--files", default=DEFAULT_FILES, type=parse_numbers,
+                        help=f"numbers of files in the sorted folders, comma separated (default {DEFAULT_FILES})")
+    parser.add_argument("--storage", action="append", choices=list(STORAGES),
+                        help="storage to benchmark, may be given more than once (default all)")
+    parser.add_argument("--only", action="append", choices=GROUPS,
+                        help="benchmarks to run, may be given more than once (default all)")
+    parser.add_argument("--repeat", default=3, type=int, help="runs of each timed action, the best is taken")
+    parser.add_argument("--output", help="file to write the results to as JSON")
+    parser.add_argument("--baseline", help="results of an earlier run to compare with")
+    parser.add_argument("--threshold", default=DEFAULT_THRESHOLD, type=float,
+                        help=f"slowdown that counts as a regression (default {DEFAULT_THRESHOLD}, that is 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.files, args.storage or list(STORAGES), args.only or list(GROUPS),
+                 max(args.repeat, 1))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        for name, seconds in report["results"].items():
+            print(f"{name}: {seconds * 1000:.2f}ms")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    rows = compare(report["results"], baseline, args.threshold)
+    print(format_table(rows))
+    regressions = [row for row in rows if row[3]]
+    if regressions:
+        print(f"{len(regressions)} of {len(rows)} timings are more than {args.threshold:.0%} slower than the baseline.")
+        sys.exit(1)
@@ -1,24 +1,65 @@
-from typing import List, Any, Callable
+import os
+import threading
+from typing import List, Any, Callable, Iterator
 
-from helper_bot_team_1.features.addressbook import AddressBook
-from helper_bot_team_1.features.files import Files
-from helper_bot_team_1.features.notebook import Notebook
+from helper_bot_team_1.features.command_stats import Instrumentation, CPU_PROFILE
+from helper_bot_team_1.features.lazy_feature import LazyFeature
 
 ADDRESS_BOOK_FILE = "address_book.bin"
 NOTEBOOK_FILE = "notebook.bin"
 
+# "journal" or "sqlite", chosen for each feature separately
+ADDRESS_BOOK_STORAGE = os.environ.get("HELPER_BOT_CONTACTS_STORAGE", "journal")
+NOTEBOOK_STORAGE = os.environ.get("HELPER_BOT_NOTES_STORAGE", "journal")
+
+# "1" keeps the latencies of the commands for the "stats" command
+COLLECT_STATS = os.environ.get("HELPER_BOT_STATS", "0") == "1"
+# a command like "contacts search" whose first run is profiled, with cProfile ("cpu") or tracemalloc ("memory")
+PROFILE_COMMAND = os.environ.get("HELPER_BOT_PROFILE")
+PROFILE_MODE = os.environ.get("HELPER_BOT_PROFILE_MODE", CPU_PROFILE)
+
+
+def error_message(err: Exception) -> str:
+    """
+    :param err: a domain-level exception raised by a command
+    :return: a human-readable error message
+    """
+    if isinstance(err, TypeError):
+        return f"Invalid input, some info is missing: {err}"
+    if isinstance(err, KeyError):
+        return f"Sorry: {err}"
+    return f"ValueError: {err}"
+
+
+def catch_part_errors(parts: Iterator[str]) -> Iterator[str]:
+    """
+    Passes on the parts of a result that comes in parts, ending it with an error message if a part fails.
+
+    :param parts: parts of a result
+    :return: the same parts
+    """
+    try:
+        yield from parts
+    except (TypeError, KeyError, ValueError) as err:
+        yield error_message(err)
+
 
 class AssistantBot:
     """
     Assists a user with managing the features of the application.
+
+    Features are created on the first command that uses them, so the bot starts equally fast no matter how much data
+    the features have.
     """
 
     def __init__(self):
         self.features = [
-            Files(),
-            Notebook(NOTEBOOK_FILE),
-            AddressBook(ADDRESS_BOOK_FILE)
+            LazyFeature("files", "helper_bot_team_1.features.files", "Files"),
+            LazyFeature("notes", "helper_bot_team_1.features.notebook", "Notebook", NOTEBOOK_FILE, NOTEBOOK_STORAGE),
+            LazyFeature("contacts", "helper_bot_team_1.features.addressbook", "AddressBook", ADDRESS_BOOK_FILE,
+                        ADDRESS_BOOK_STORAGE)
         ]
+        self.instrumentation = Instrumentation(COLLECT_STATS, PROFILE_COMMAND, PROFILE_MODE)
 
     @staticmethod
     def input_error(func: Callable) -> Callable[[tuple[Any, ...]], str | Any]:
@@ -29,14 +70,11 @@ class AssistantBot:
         def exception_handler(*args, **kwargs):
             try:
                 result = func(*args, **kwargs)
-            except TypeError as err:
-                return f"Invalid input, some info is missing: {err}"
-            except KeyError as err:
-                return f"Sorry: {err}"
-            except ValueError as err:
-                return f"ValueError: {err}"
-            else:
+            except (TypeError, KeyError, ValueError) as err:
+                return error_message(err)
+            if result is None or isinstance(result, str):
                 return result
+            return catch_part_errors(iter(result))
 
         return exception_handler
 
@@ -51,14 +89,36 @@ class AssistantBot:
         """
         if handler_name == "help":
             return self.help()
+        if handler_name == "stats":
+            return self.stats(*args)
 
         command_handler = self._get_handler(handler_name)
 
         if command_handler:
+            if not args:
+                raise ValueError(f"Tell what to do with {handler_name}. Type 'help' to see the commands.")
             command_arguments = args[1:] if len(args) > 1 else []
-            return command_handler.handle_command(args[0], *command_arguments)
+            return self.instrumentation.measure(f"{handler_name} {args[0]}",
+                                                lambda: command_handler.handle_command(args[0], *command_arguments))
         else:
-            raise ValueError(f"Unexpected command: {command_handler}")
+            raise ValueError(f"Unexpected command: {handler_name}")
+
+    def stats(self, *args: str) -> str:
+        """
+        Shows how long the commands took since the bot started, or forgets it with "stats reset".
+
+        :param args: nothing, or "reset"
+        :return: the latencies of the commands
+        """
+        stats = self.instrumentation.stats
+        if stats is None:
+            return "Statistics of the commands are off. Start the bot with HELPER_BOT_STATS=1 to collect them."
+        if args == ("reset",):
+            stats.reset()
+            return "Statistics of the commands are cleared."
+        if args:
+            raise ValueError("Type 'stats' or 'stats reset'.")
+        return stats.report()
 
     def _get_handler(self, handler_name: str) -> Any:
         handler = next(filter(lambda x: x.name() == handler_name, self.features), None)
@@ -73,24 +133,41 @@ class AssistantBot:
         """
         return """
         To work with contacts type:
-        - contacts add
-        - contacts change name
+        - contacts add [name=... phones=... birthday=... email=... address=...]
+        - contacts change name [or: name=... phones=... birthday=... email=... address=...]
         - contacts remove name
-        - contacts show
-        - contacts search name/phone
+        - contacts show [--page N] [--page-size N]
+        - contacts search name/phone [--fuzzy] [--page N] [--page-size N]
+        - contacts import file.csv/file.vcf
+        - contacts dedupe [--min-score N]
+        - contacts merge keep=name other=name
 
         To work with notes type:
-        - notes make 
-        - notes change title
+        - notes make [title=... text=... tags=...]
+        - notes change title [or: title=... new_title=... text=... tags=...]
         - notes remove title
-        - notes show 
-        - notes search tag/title/text
+        - notes show [--page N] [--page-size N]
+        - notes search tag/title/text [--page N] [--page-size N]
+        - notes tags [tag AND/OR/NOT tag ...]
 
         To check a list of people who have birthdays in the given interval type:
         - contacts birthdays num_of_days
 
         To sort the given folder type:
-        - files sort path
+        - files sort [--jobs N] [--progress | --background] [--full] [--dedupe skip/link/report] [--nested]
+          [--dry-run] path
+        - files status
+        - files cancel
+
+        Fields can also be given as a JSON object, e.g. contacts add {"name": "John", "phones": ["0671234567"]}.
+        To run commands from a file without prompts, start the bot with: helper_bot --script commands.txt
+        To share the data between several users, start one bot with: helper_bot --serve [socket or host:port]
+        and the others with: helper_bot --connect [socket or host:port]. Commands are run without prompts.
+
+        To see how long the commands took, start the bot with HELPER_BOT_STATS=1 and type:
+        - stats [reset]
+        To profile the first run of a command, start the bot with HELPER_BOT_PROFILE="contacts search" and optionally
+        HELPER_BOT_PROFILE_MODE=memory.
         """
 
     def autocomplete(self) -> List:
@@ -101,14 +178,49 @@ class AssistantBot:
         """
         result = []
         for feature in self.features:
-            for command_name in feature.command_handlers.keys():
+            for command_name in feature.commands:
                 result.append(f"{feature.name()} {command_name}")
+        result.append("stats")
         return result
 
-    def backup_data(self):
+    def start_batch(self):
+        """
+        Switches the features to running commands without asking the user anything, and lets them save the data once
+        at the end instead of after every command.
+        """
+        for feature in self.features:
+            feature.start_batch()
+
+    def stop_prompts(self):
+        """
+        Switches the features to running commands without asking the user anything, for the users that talk to the
+        bot through a server.
+        """
+        for feature in self.features:
+            feature.stop_prompts()
+
+    def preload(self) -> threading.Thread:
+        """
+        Creates the features in a background thread, so that the first commands don't wait for the data to load.
+
+        :return: the started thread
+        """
+        thread = threading.Thread(target=lambda: [feature.feature for feature in self.features], daemon=True)
+        thread.start()
+        return thread
+
+    def backup_data(self, wait: bool = True):
         """
         Saves user data to files.
+
+        :param wait: whether to wait for the work the storages do in the background, not needed before the exit
+        """
+        for feature in self.features:
+            feature.backup_data(wait)
+
+    def close(self):
         """
-        for handler in self.features:
-            if hasattr(handler, "data"):
-                handler.data.backup_data(handler)
+        Stops the work the features run in the background.
+        """
+        for feature in self.features:
+            feature.close()
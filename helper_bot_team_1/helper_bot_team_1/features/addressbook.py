@@ -1,6 +1,23 @@
+from datetime import date
+from typing import Iterator
+
 from helper_bot_team_1.features.addressbook_fields import Record
-from helper_bot_team_1.features.bot_feature import BotFeature
-from helper_bot_team_1.features.records_container import RecordsContainer
+from helper_bot_team_1.features.birthday_index import BirthdayIndex
+from helper_bot_team_1.features.dedupe import find_duplicates, merge_records, MIN_SCORE
+from helper_bot_team_1.features.importer import import_contacts, build_record
+from helper_bot_team_1.features.bot_feature import BotFeature, parse_options, parse_fields, has_fields, as_list, \
+    check_field_names
+from helper_bot_team_1.features.name_index import NameIndex
+from helper_bot_team_1.features.phone_index import PhoneTrie, is_phone_query
+from helper_bot_team_1.features.records_container import RecordsContainer, JOURNAL_STORAGE, paginate, PAGE_SIZE, \
+    SEARCH_INDEX
+
+BIRTHDAY_INDEX = "birthdays"
+PHONE_INDEX = "phones"
+NAME_INDEX = "names"
+
+CONTACT_FIELDS = ("name", "phones", "birthday", "email", "address")
+ALREADY_EXISTS_MESSAGE = "This name is already in your phonebook. If you want to change something type 'change'."
 
 
 class AddressBook(BotFeature):
@@ -8,9 +25,14 @@ class AddressBook(BotFeature):
     A feature that allows users to manage their contacts.
     """
 
-    def __init__(self, save_file: str):
+    COMMANDS = ("add", "change", "remove", "show", "birthdays", "search", "import", "dedupe", "merge")
+
+    def __init__(self, save_file: str, storage: str = JOURNAL_STORAGE):
         self.save_file = save_file
-        self.data = RecordsContainer(save_file)
+        self.data = RecordsContainer(save_file, storage)
+        self.data.register_index(BIRTHDAY_INDEX, BirthdayIndex())
+        self.data.register_index(PHONE_INDEX, PhoneTrie())
+        self.data.register_index(NAME_INDEX, NameIndex())
 
         super().__init__({
             "add": self.add_contact,
@@ -18,47 +40,104 @@ class AddressBook(BotFeature):
             "remove": self.data.remove_record,
             "show": self.data.show_all,
             "birthdays": self.check_birthdays,
-            "search": self.data.search_record
+            "search": self.search_contacts,
+            "import": self.import_contacts,
+            "dedupe": self.dedupe_contacts,
+            "merge": self.merge_contacts
         })
 
     def name(self):
         return "contacts"
 
-    def add_contact(self):
+    def close(self) -> None:
+        self.data.close()
+
+    def add_contact(self, *args: str) -> str:
+        """
+        Creates a new contact. Asks the user for the fields unless they are given as arguments, for example:
+        name=John phones=0671234567,0501234567 birthday=01.02.1990 email=john@mail.com address=Main street 5
+        or the same fields as a JSON object.
+
+        :param args: optional fields of the contact
+        :return: success message
+        """
+
+        if args:
+            fields = parse_fields(args)
+            check_field_names(fields, CONTACT_FIELDS)
+            if "phones" in fields:
+                fields["phones"] = as_list(fields["phones"])
+            record = build_record(fields)
+            if self.data.record_exists(record.name.value):
+                raise ValueError(ALREADY_EXISTS_MESSAGE)
+            self.data.add_record(record)
+            return f"Contact {record.name} was created successfully!"
+        if not self.interactive:
+            raise ValueError("Give the fields of the contact as key=value pairs or JSON.")
+
         name = input("Enter the name: ").strip()
         if self.data.record_exists(name):
-            raise ValueError("This name is already in your phonebook. If you want to change something type 'change'.")
+            raise ValueError(ALREADY_EXISTS_MESSAGE)
 
         record = Record(name)
         self.data.add_record(record)
 
-        phones = input("Enter the phone or phones: ").strip().split()
-        if phones:
-            for phone in phones:
-                record.add_phone(phone)
+        try:
+            phones = input("Enter the phone or phones: ").strip().split()
+            if phones:
+                for phone in phones:
+                    record.add_phone(phone)
 
-        birthday = input("Enter the birthdate: ").strip()
-        if birthday:
-            record.add_birthday(birthday)
+            birthday = input("Enter the birthdate: ").strip()
+            if birthday:
+                record.add_birthday(birthday)
 
-        email = input("Enter the email: ").strip()
-        if email:
-            record.add_email(email)
+            email = input("Enter the email: ").strip()
+            if email:
+                record.add_email(email)
 
-        address = input("Enter the address: ").strip()
-        if address:
-            record.add_address(address)
+            address = input("Enter the address: ").strip()
+            if address:
+                record.add_address(address)
+        finally:
+            self.data.update_record(record)
 
         return f"Contact {name} was created successfully!"
 
     def change_contact(self, *args: str) -> str:
         """
-        Changes the contact data. Throws exception if the contact with the given name doesn't exist.
+        Changes the contact data. Throws exception if the contact with the given name doesn't exist. Asks the user what
+        to change unless the name and the new fields are given as key=value pairs or JSON, for example:
+        name=John email=john@mail.com. New phones replace the old ones.
 
-        :param args: name of a contact to change
+        :param args: name of a contact to change, or its name and new fields
         :return: success message or KeyError
         """
 
+        if has_fields(args):
+            fields = parse_fields(args)
+            check_field_names(fields, CONTACT_FIELDS)
+            name = fields.pop("name", "")
+            if not self.data.record_exists(name):
+                raise KeyError("Contact with this name doesn't exist.")
+            contact_to_change = self.data[name]
+            try:
+                if "phones" in fields:
+                    contact_to_change.phones.clear()
+                    for phone in as_list(fields["phones"]):
+                        contact_to_change.add_phone(phone)
+                if "birthday" in fields:
+                    contact_to_change.add_birthday(fields["birthday"])
+                if "email" in fields:
+                    contact_to_change.add_email(fields["email"])
+                if "address" in fields:
+                    contact_to_change.add_address(fields["address"])
+            finally:
+                self.data.update_record(contact_to_change)
+            return "The contact was changed successfully!"
+        if not self.interactive:
+            raise ValueError("Give the name and the new fields of the contact as key=value pairs or JSON.")
+
         name = " ".join(args)
         if self.data.record_exists(name):
             contact_to_change = self.data[name]
@@ -67,19 +146,22 @@ class AddressBook(BotFeature):
                 if to_change.lower() not in ["phone", "email", "address", "birthday"]:
                     print("Unknown command")
                     continue
-                elif to_change.lower() == "phone":
-                    new_phone = input("Enter a new phone: ")
-                    contact_to_change.phones.clear()
-                    contact_to_change.add_phone(new_phone)
-                elif to_change.lower() == "email":
-                    new_email = input("Enter a new email: ")
-                    contact_to_change.add_email(new_email)
-                elif to_change.lower() == "address":
-                    new_address = input("Enter new address here: ")
-                    contact_to_change.add_address(new_address)
-                elif to_change.lower() == "birthday":
-                    new_birthday = input("Enter a birthdate: ")
-                    contact_to_change.add_birthday(new_birthday)
+                try:
+                    if to_change.lower() == "phone":
+                        new_phone = input("Enter a new phone: ")
+                        contact_to_change.phones.clear()
+                        contact_to_change.add_phone(new_phone)
+                    elif to_change.lower() == "email":
+                        new_email = input("Enter a new email: ")
+                        contact_to_change.add_email(new_email)
+                    elif to_change.lower() == "address":
+                        new_address = input("Enter new address here: ")
+                        contact_to_change.add_address(new_address)
+                    elif to_change.lower() == "birthday":
+                        new_birthday = input("Enter a birthdate: ")
+                        contact_to_change.add_birthday(new_birthday)
+                finally:
+                    self.data.update_record(contact_to_change)
 
                 to_continue = input("Do you want to change something else in this contact? Enter y or n: ")
                 if to_continue.lower() not in ["y", "n"]:
@@ -92,6 +174,85 @@ class AddressBook(BotFeature):
         else:
             raise KeyError("Contact with this name doesn't exist.")
 
+    def search_contacts(self, *args: str) -> Iterator[str]:
+        """
+        Searches contacts. A query that looks like a phone is looked up by the phone prefix first, so +380671234567,
+        380671234567 and 0671234567 find the same contact. Other queries, and phones that no contact starts with, are
+        searched for in the whole contact. When nothing contains the query, or with "--fuzzy", contacts are searched
+        by the names that are like the query, in Latin or Cyrillic and with typos.
+
+        :param args: what to search, optionally followed by "--fuzzy", "--page N" and "--page-size N"
+        :return: found contacts as strings
+        """
+
+        options, needle = parse_options(args, page=0, page_size=PAGE_SIZE, fuzzy=False)
+        query = " ".join(needle)
+        if not query:
+            raise ValueError("Enter what to search.")
+
+        names = []
+        if not options["fuzzy"]:
+            if is_phone_query(query):
+                names = self.data.get_index(PHONE_INDEX).lookup(query)
+            if not names:
+                names = self.data.get_index(SEARCH_INDEX).search(query)
+        if not names:
+            names = [name for _, name in self.data.get_index(NAME_INDEX).search(query)]
+        if names:
+            return paginate((str(self.data[name]) for name in names), options["page"], options["page_size"])
+        return iter(["Sorry, couldn't find any records that match the query."])
+
+    def import_contacts(self, *args: str) -> str:
+        """
+        Imports contacts from a CSV or vCard file.
+
+        :param args: path to the file
+        :return: a report with the number of imported contacts and the rejected rows
+        """
+
+        return import_contacts(self.data, " ".join(args))
+
+    def dedupe_contacts(self, *args: str) -> str:
+        """
+        Finds the contacts that are probably the same person: they share a phone, an email or a name.
+
+        :param args: optional "--min-score N", the lowest score in percent to report, 50 by default
+        :return: the found pairs with their scores, the most likely first
+        """
+
+        options, _ = parse_options(args, min_score=int(MIN_SCORE * 100))
+        candidates = find_duplicates(self.data.values(), options["min_score"] / 100)
+        if not candidates:
+            return "No duplicates were found."
+        lines = [f"{pair_score:.0%}: {first} <-> {second} ({', '.join(reasons)})"
+                 for pair_score, first, second, reasons in candidates]
+        lines.append("To merge a pair type: contacts merge keep=name other=name")
+        return "\n".join(lines)
+
+    def merge_contacts(self, *args: str) -> str:
+        """
+        Merges a duplicate into another contact and removes the duplicate. The phones of both are kept, other fields
+        of the duplicate fill only the empty fields.
+
+        :param args: keep=name other=name, or the same fields as JSON
+        :return: success message
+        """
+
+        fields = parse_fields(args)
+        check_field_names(fields, ("keep", "other"))
+        keep, other = fields.get("keep", ""), fields.get("other", "")
+        for name in (keep, other):
+            if not self.data.record_exists(name):
+                raise KeyError(f"Contact {name} doesn't exist.")
+        if keep == other:
+            raise ValueError("Choose two different contacts.")
+
+        record = self.data[keep]
+        merge_records(record, self.data[other])
+        self.data.update_record(record)
+        self.data.remove_record(other)
+        return f"{other} was merged into {keep}."
+
     def check_birthdays(self, period: str) -> str:
         """
         Creates and returns a list of people who have birthdays in a given period.
@@ -102,14 +263,8 @@ class AddressBook(BotFeature):
         if not period.isdigit():
             raise ValueError("Enter a number of days.")
 
-        result = ""
-        for contact in self.data.values():
-            if contact.birthday is None:
-                continue
-            else:
-                days_to_contacts_bd = contact.count_days_to_birthday()
-                if int(days_to_contacts_bd) <= int(period):
-                    result += str(contact) + "\n"
+        index = self.data.get_index(BIRTHDAY_INDEX)
+        result = "".join(str(self.data[name]) + "\n" for name in index.upcoming(date.today(), int(period)))
         if result:
             return result
         else:
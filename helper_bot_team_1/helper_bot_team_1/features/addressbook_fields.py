@@ -1,15 +1,55 @@
-from re import match
+import re
+import calendar
 import datetime
 from typing import Match
 
+from helper_bot_team_1.features.slotted import Slotted
+
 DATE_FORMAT = "%d.%m.%Y"
+DATE_REGEX = re.compile(r"(\d{1,2})\.(\d{1,2})\.(\d{4})")
+PHONE_REGEX = re.compile(r"(\+?\d{12}|\d{10})")
+EMAIL_REGEX = re.compile(r"[a-zA-Z][a-zA-Z_.0-9]+@[a-zA-Z_]+?\.[a-zA-Z]{2,}")
+
+
+def parse_date(value: str) -> datetime.date:
+    """
+    Parses a date in DATE_FORMAT. Does the same as datetime.strptime, but with a precompiled regex, which is much
+    faster when many dates are parsed.
+
+    :param value: a date like 31.12.1990
+    :return: the parsed date
+    """
+    date_match = DATE_REGEX.fullmatch(value)
+    try:
+        if date_match is None:
+            raise ValueError
+        day, month, year = map(int, date_match.groups())
+        return datetime.date(year, month, day)
+    except ValueError:
+        raise ValueError(f"{value} does not march format '%d.%m.%Y'")
+
+
+def birthday_in_year(birthday: datetime.date, year: int) -> datetime.date:
+    """
+    Finds the date when a birthday is celebrated in the given year. People born on the 29th of February celebrate on
+    the 28th of February in non-leap years.
+
+    :param birthday: a birthdate
+    :param year: a year to celebrate in
+    :return: the date of the birthday in that year
+    """
+    if birthday.month == 2 and birthday.day == 29 and not calendar.isleap(year):
+        return datetime.date(year, 2, 28)
+    return birthday.replace(year=year)
 
 
-class Field:
+class Field(Slotted):
     """
     The base class for the fields of an addressbook.
     """
 
+    __slots__ = ("_value",)
+
     def __init__(self, value):
         self._value = None
         self.value = value
@@ -45,6 +85,8 @@ class Name(Field):
     A name of a person in an addressbook.
     """
 
+    __slots__ = ()
+
     def verify_value(self, value: str) -> None:
         """
         Verifies that name is not smaller than 2 characters long and not bigger than 30 characters. Raises exception if
@@ -62,9 +104,11 @@ class Phone(Field):
     A phone number of a person in an address book.
     """
 
+    __slots__ = ()
+
     @classmethod
     def is_valid(cls, value: str) -> None | Match[str]:
-        return match(r"(\+?\d{12}|\d{10})", value)
+        return PHONE_REGEX.match(value)
 
     def verify_value(self, value: str) -> None:
         """
@@ -82,6 +126,8 @@ class Birthday(Field):
     Person's birthday date.
     """
 
+    __slots__ = ()
+
     def verify_value(self, value: datetime.date) -> None:
         """
         Checks if the birthdate is not in the future. Raises exception if the date is in the future.
@@ -98,6 +144,8 @@ class Email(Field):
     Person's email.
     """
 
+    __slots__ = ()
+
     @classmethod
     def is_valid(cls, value: str) -> None | Match[str]:
         """
@@ -106,15 +154,17 @@ class Email(Field):
         :param value: email to check
         """
 
-        return match(r"[a-zA-Z][a-zA-Z_.0-9]+@[a-zA-Z_]+?\.[a-zA-Z]{2,}", value)
+        return EMAIL_REGEX.match(value)
 
 
-class Record:
+class Record(Slotted):
     """
     A record about a person in an address book. Name field is compulsory, while other fields are optional and can
     be omitted.
     """
 
+    __slots__ = ("name", "phones", "birthday", "address", "email")
+
     def __init__(self, name: str):
         if not name:
             raise ValueError("The record must have a name.")
@@ -137,25 +187,22 @@ class Record:
         else:
             raise ValueError(f"Phone must be in format +380XXXXXXXXX/380XXXXXXXXX/0XXXXXXXXX")
 
-    def count_days_to_birthday(self) -> str:
+    def count_days_to_birthday(self, today: datetime.date = None) -> int:
         """
         Counts the days left to the birthdate of the given person.
 
+        :param today: the date to count from, the current date by default
         :return: a number of days left
         """
 
-        today = datetime.datetime.now().date()
-        this_years_birthday = self.birthday.value.replace(year=today.year)
+        today = today or datetime.date.today()
+        this_years_birthday = birthday_in_year(self.birthday.value, today.year)
 
-        if today < this_years_birthday:
-            difference = this_years_birthday - today
-            return difference.days
-        if today == this_years_birthday:
-            return "0"
+        if today <= this_years_birthday:
+            return (this_years_birthday - today).days
         else:
-            next_years_birthday = this_years_birthday.replace(year=this_years_birthday.year + 1)
-            difference = next_years_birthday - today
-            return difference.days
+            next_years_birthday = birthday_in_year(self.birthday.value, today.year + 1)
+            return (next_years_birthday - today).days
 
     def add_birthday(self, birthday: str) -> None:
         """
@@ -163,12 +210,7 @@ class Record:
 
         :param birthday: datetime object
         """
-        try:
-            birthday_date = datetime.datetime.strptime(birthday, DATE_FORMAT).date()
-        except ValueError:
-            raise ValueError(f"{birthday} does not march format '%d.%m.%Y'")
-
-        self.birthday = Birthday(birthday_date)
+        self.birthday = Birthday(parse_date(birthday))
 
     def add_email(self, email: str) -> None:
         """
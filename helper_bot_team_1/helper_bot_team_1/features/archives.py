@@ -0,0 +1,308 @@
+import gzip
+import multiprocessing
+import os
+import shutil
+import tarfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, Future
+from pathlib import Path
+from typing import BinaryIO
+
+MULTIPART_SUFFIXES = (".tar.gz", ".tar.bz2", ".tar.xz")
+ZIP_SUFFIXES = (".zip",)
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+GZIP_SUFFIXES = (".gz",)
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + TAR_SUFFIXES + GZIP_SUFFIXES
+
+# the most bytes one archive, or all the archives of one sort together, may unpack into
+MAX_UNCOMPRESSED_BYTES = 4 * 1024 ** 3
+# forking copies the locks held by the threads of the bot (the autosave, the journal compaction) into the workers
+POOL_CONTEXT = "spawn"
+MAX_NESTING = 3
+CHUNK_SIZE = 1024 * 1024
+MAX_REPORTED_ERRORS = 50
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def file_suffix(filename: str) -> str:
+    """
+    Finds the extension of a file, including the multi-part extensions of archives like .tar.gz.
+
+    :param filename: name or path of the file
+    :return: the lowercase extension with the dot
+    """
+    name = Path(filename).name.lower()
+    for suffix in MULTIPART_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return suffix
+    return Path(name).suffix
+
+
+def archive_stem(filename: str) -> str:
+    """
+    Removes the extension from the name of an archive: "photos.tar.gz" becomes "photos".
+
+    :param filename: name or path of the archive
+    :return: name of the folder to unpack the archive into
+    """
+    name = Path(filename).name
+    return name[:len(name) - len(file_suffix(name))]
+
+
+def is_archive(filename: str) -> bool:
+    return file_suffix(filename) in ARCHIVE_SUFFIXES
+
+
+class Budget:
+    """
+    Counts the bytes written out of an archive and stops the extraction when there are more than allowed, so that an
+    archive bomb can't fill the disk. The bytes may also be taken from a counter shared by the worker processes, so
+    that all the archives of a sort together can't write more than allowed either.
+    """
+
+    def __init__(self, max_bytes: int, shared=None):
+        self.left = max_bytes
+        self.shared = shared
+        self.taken = 0
+
+    def take(self, size: int) -> None:
+        self.left -= size
+        self.taken += size
+        if self.shared is not None:
+            with self.shared.get_lock():
+                self.shared.value -= size
+                self.left = min(self.left, self.shared.value)
+        if self.left < 0:
+            raise ArchiveError("the archives unpack into more than the allowed size")
+
+    def check(self, size: int) -> None:
+        """
+        Stops the extraction before it starts if the sizes declared in the archive are more than allowed.
+
+        :param size: declared size of the unpacked archive
+        """
+        left = self.left if self.shared is None else min(self.left, self.shared.value)
+        if size > left:
+            self.take(size)
+
+    def refund(self) -> None:
+        """
+        Gives the taken bytes back to the shared counter once the output of the archive is removed.
+        """
+        if self.shared is not None:
+            with self.shared.get_lock():
+                self.shared.value += self.taken
+        self.taken = 0
+
+
+# bytes all the archives unpacked by the pool may still write, set in the worker processes by the ArchiveExtractor
+_shared_left = None
+
+
+def init_worker(shared_left) -> None:
+    global _shared_left
+    _shared_left = shared_left
+
+
+def member_path(target: str, name: str) -> str:
+    """
+    Finds where a member of an archive is written. Raises exception if the member would land outside the target
+    folder.
+
+    :param target: folder the archive is unpacked into
+    :param name: name of the member in the archive
+    :return: path to write the member to
+    """
+    target = os.path.normpath(target)
+    path = os.path.normpath(os.path.join(target, name))
+    if os.path.isabs(name) or (path != target and not path.startswith(target + os.sep)):
+        raise ArchiveError(f"member {name} points outside the archive folder")
+    return path
+
+
+def copy_stream(source: BinaryIO, path: str, budget: Budget) -> None:
+    """
+    Writes a member of an archive to the disk chunk by chunk, without reading it into memory whole.
+
+    :param source: the opened member
+    :param path: path to write to
+    :param budget: bytes that are still allowed to be written
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        while chunk := source.read(CHUNK_SIZE):
+            budget.take(len(chunk))
+            f.write(chunk)
+
+
+def extract_zip(archive: str, target: str, budget: Budget) -> None:
+    with zipfile.ZipFile(archive) as zip_file:
+        members = zip_file.infolist()
+        budget.check(sum(member.file_size for member in members))
+        for member in members:
+            path = member_path(target, member.filename)
+            if member.is_dir():
+                os.makedirs(path, exist_ok=True)
+            else:
+                with zip_file.open(member) as source:
+                    copy_stream(source, path, budget)
+
+
+def extract_tar(archive: str, target: str, budget: Budget) -> None:
+    # "r|*" reads the archive as a stream, members are written in the order they come without seeking back
+    with tarfile.open(archive, mode="r|*") as tar_file:
+        for member in tar_file:
+            path = member_path(target, member.name)
+            if member.isdir():
+                os.makedirs(path, exist_ok=True)
+            elif member.isfile():
+                copy_stream(tar_file.extractfile(member), path, budget)
+
+
+def extract_gzip(archive: str, target: str, budget: Budget) -> None:
+    try:
+        extract_tar(archive, target, budget)
+        return
+    except tarfile.ReadError:
+        pass
+    with gzip.open(archive) as source:
+        copy_stream(source, os.path.join(target, archive_stem(archive)), budget)
+
+
+def extract_archive(archive: str, target: str, budget: Budget, recursive: bool = False, depth: int = 0) -> None:
+    """
+    Unpacks the archive into the target folder. Nested archives are unpacked next to themselves and removed, if asked
+    for.
+
+    :param archive: path to the archive
+    :param target: folder to unpack into
+    :param budget: bytes that are still allowed to be written
+    :param recursive: whether to unpack the nested archives
+    :param depth: how deep in the nested archives this one is
+    """
+    suffix = file_suffix(archive)
+    os.makedirs(target, exist_ok=True)
+    try:
+        if suffix in ZIP_SUFFIXES:
+            extract_zip(archive, target, budget)
+        elif suffix in TAR_SUFFIXES:
+            extract_tar(archive, target, budget)
+        elif suffix in GZIP_SUFFIXES:
+            extract_gzip(archive, target, budget)
+        else:
+            raise ArchiveError(f"{suffix} files can't be unpacked")
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError) as err:
+        raise ArchiveError(str(err)) from err
+
+    if not recursive or depth >= MAX_NESTING:
+        return
+    for folder, _, filenames in os.walk(target):
+        for filename in filenames:
+            if is_archive(filename):
+                nested = os.path.join(folder, filename)
+                nested_target = os.path.join(folder, archive_stem(filename))
+                try:
+                    extract_archive(nested, nested_target, budget, recursive, depth + 1)
+                except ArchiveError:
+                    if budget.left < 0:
+                        raise
+                    # a broken nested archive is kept as it is, like any other file
+                    shutil.rmtree(nested_target, ignore_errors=True)
+                    continue
+                os.remove(nested)
+
+
+def unpack_archive_file(archive: str, target: str, max_bytes: int = MAX_UNCOMPRESSED_BYTES,
+                        recursive: bool = False) -> None:
+    """
+    Unpacks the archive and removes it. When the archive can't be unpacked, it is kept and nothing of it is left in the
+    target folder. Runs in a worker process of the ArchiveExtractor.
+
+    :param archive: path to the archive
+    :param target: folder to unpack into
+    :param max_bytes: the most bytes the archive may unpack into, nested archives included
+    :param recursive: whether to unpack the nested archives
+    """
+    budget = Budget(max_bytes, _shared_left)
+    try:
+        extract_archive(archive, target, budget, recursive)
+    except ArchiveError:
+        shutil.rmtree(target, ignore_errors=True)
+        budget.refund()
+        raise
+    os.remove(archive)
+
+
+class ArchiveExtractor:
+    """
+    Unpacks archives in a pool of processes while the sort goes on. The pool is started with the first archive, so a
+    sort without archives doesn't pay for it. All the archives together may unpack into at most max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = MAX_UNCOMPRESSED_BYTES, recursive: bool = False, workers: None | int = None):
+        self.max_bytes = max_bytes
+        self.recursive = recursive
+        self.workers = workers
+        self.errors = []
+        self._futures = []
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, archive: str, target: str) -> None:
+        """
+        Queues the archive to be unpacked and removed.
+
+        :param archive: path to the archive
+        :param target: folder to unpack into
+        """
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(POOL_CONTEXT)
+                shared_left = context.Value("q", self.max_bytes)
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                 initializer=init_worker, initargs=(shared_left,))
+            future = self._pool.submit(unpack_archive_file, archive, target, self.max_bytes, self.recursive)
+            future.archive = archive
+            self._futures.append(future)
+
+    def close(self) -> None:
+        """
+        Waits until all the queued archives are unpacked and collects the errors.
+        """
+        with self._lock:
+            pool, futures = self._pool, self._futures
+            self._pool, self._futures = None, []
+        if pool is None:
+            return
+        pool.shutdown(wait=True)
+        for future in futures:
+            self._collect(future)
+
+    def report(self) -> None | str:
+        """
+        Describes the archives that couldn't be unpacked.
+
+        :return: the report or None if all the archives were unpacked
+        """
+        if not self.errors:
+            return None
+        report = [f"{len(self.errors)} archives were not unpacked and are kept as they are:"]
+        report.extend(f"{archive}: {error}" for archive, error in self.errors[:MAX_REPORTED_ERRORS])
+        if len(self.errors) > MAX_REPORTED_ERRORS:
+            report.append(f"... and {len(self.errors) - MAX_REPORTED_ERRORS} more.")
+        return "\n".join(report)
+
+    def _collect(self, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            self.errors.append((future.archive, error))
+
+    def __enter__(self) -> "ArchiveExtractor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
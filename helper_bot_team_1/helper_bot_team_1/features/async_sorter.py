@@ -0,0 +1,246 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+from helper_bot_team_1.features.archives import ArchiveExtractor
+from helper_bot_team_1.features.sorter import CategoryDirs, SortManifest, category_dir, organize_file, \
+    finish_directory, dedupe_files
+
+PROGRESS_INTERVAL = 0.5
+MEGABYTE = 1024 * 1024
+
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+class SortProgress:
+    """
+    Counts the files and bytes processed by a sort and the throughput.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.state = RUNNING
+        self.started = time.monotonic()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def add(self, size: int) -> None:
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+
+    def finish(self, state: str) -> None:
+        self.state = state
+        self.finished = time.monotonic()
+
+    def __str__(self) -> str:
+        elapsed = max(self.elapsed, 1e-9)
+        return f"{self.state}: {self.files} files ({self.bytes / MEGABYTE:.1f} MB) in {self.elapsed:.1f} s, " \
+               f"{self.files / elapsed:.0f} files/s, {self.bytes / MEGABYTE / elapsed:.1f} MB/s"
+
+
+def organize_one(f: str, path: str, category_dirs: CategoryDirs, extractor: None | ArchiveExtractor = None) -> int:
+    """
+    Organizes one file into its category folder.
+
+    :param f: path to the file
+    :param path: path to the directory where the file is
+    :param category_dirs: creator of the category folders
+    :param extractor: pool to unpack the archives in, they are unpacked right away if None
+    :return: size of the file in bytes
+    """
+    size = os.path.getsize(f)
+    folder_name = category_dir(f)
+    if folder_name:
+        category_dirs.ensure(path, folder_name)
+        organize_file(f, path, folder_name, extractor)
+    return size
+
+
+class AsyncSorter:
+    """
+    Sorts a folder from an asyncio event loop. Filesystem calls run in a pool of threads, the loop only schedules them
+    and counts the progress.
+
+    The files of a directory are taken from a queue by at most jobs * 2 workers, and all the filesystem calls wait for
+    the same semaphore, so the number of tasks doesn't grow with the number of files.
+
+    The sort can be cancelled at any moment. Calls that are already running are finished and the queued ones are
+    dropped, so every file is either in its old place or in its category folder, never halfway.
+    """
+
+    def __init__(self, jobs: int = 1, full: bool = False, dedupe: None | str = None, nested: bool = False):
+        self.jobs = max(jobs, 1)
+        self.full = full
+        self.dedupe = dedupe
+        self.report = None
+        self.manifest = None
+        self.extractor = ArchiveExtractor(recursive=nested)
+        self.progress = SortProgress()
+        self.category_dirs = CategoryDirs()
+        self._executor = None
+        self._limit = None
+
+    async def sort(self, path: str) -> None:
+        """
+        Sorts the folder.
+
+        :param path: path to the root directory
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.jobs)
+        self._limit = asyncio.Semaphore(self.jobs * 2)
+        try:
+            self.manifest = SortManifest(path) if self.full else await self._run(SortManifest.load, path)
+            reports = [await self._run(dedupe_files, path, self.manifest, self.dedupe) if self.dedupe else None]
+            await self._sort_directory(path, is_root=True)
+            await self._run(self.extractor.close)
+            await self._run(self.manifest.save)
+            reports.append(self.extractor.report())
+            self.report = "\n".join(report for report in reports if report) or None
+            self.progress.finish(DONE)
+        except asyncio.CancelledError:
+            self.progress.finish(CANCELLED)
+            raise
+        except Exception:
+            self.progress.finish(FAILED)
+            raise
+        finally:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            # the archives that were moved already are unpacked even when the sort is cancelled
+            self.extractor.close()
+            if self.progress.state == CANCELLED and self.manifest is not None:
+                # the directories sorted so far are skipped next time
+                self.manifest.save(complete=False)
+
+    async def _sort_directory(self, path: str, is_root: bool = False) -> None:
+        files, subdirectories = await self._run(self.manifest.scan, path)
+        queue = asyncio.Queue()
+        for f in files:
+            queue.put_nowait(f)
+        children = [asyncio.ensure_future(child) for child in (
+            *(self._organize_queued(queue, path) for _ in range(min(len(files), self.jobs * 2))),
+            *(self._sort_directory(subdirectory) for subdirectory in subdirectories))]
+        try:
+            await asyncio.gather(*children)
+        except BaseException:
+            # the children are stopped and awaited here, so none of them is left unfinished when the loop is closed
+            for child in children:
+                child.cancel()
+            await asyncio.gather(*children, return_exceptions=True)
+            raise
+        await self._run(finish_directory, path, self.manifest, is_root)
+
+    async def _organize_queued(self, queue: asyncio.Queue, path: str) -> None:
+        while not queue.empty():
+            await self._run(self._organize_file, queue.get_nowait(), path)
+
+    def _organize_file(self, f: str, path: str) -> None:
+        # counted in the worker thread, so the files moved after a cancel are counted too
+        self.progress.add(organize_one(f, path, self.category_dirs, self.extractor))
+
+    async def _run(self, func: Callable, *args):
+        async with self._limit:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+
+async def report_progress(progress: SortProgress, report: Callable[[SortProgress], None]) -> None:
+    """
+    Reports the progress of a sort every PROGRESS_INTERVAL seconds until cancelled.
+
+    :param progress: progress of a sort
+    :param report: a function to report with
+    """
+    while True:
+        report(progress)
+        await asyncio.sleep(PROGRESS_INTERVAL)
+
+
+def sort_with_progress(path: str, jobs: int, report: Callable[[SortProgress], None], full: bool = False,
+                       dedupe: None | str = None, nested: bool = False) -> AsyncSorter:
+    """
+    Sorts the folder in the current thread, reporting the progress while it goes. Ctrl-C cancels the sort.
+
+    :param path: path to the root directory
+    :param jobs: number of threads for filesystem calls
+    :param report: a function to report the progress with
+    :param full: whether to ignore the manifest of the last sort and look at every file
+    :param dedupe: what to do with identical files before sorting: "skip", "link" or "report", nothing if None
+    :param nested: whether to unpack the archives found inside the archives
+    :return: the sorter with the final progress
+    """
+    sorter = AsyncSorter(jobs, full, dedupe, nested)
+
+    async def sort():
+        reporter = asyncio.create_task(report_progress(sorter.progress, report))
+        try:
+            await sorter.sort(path)
+        finally:
+            reporter.cancel()
+
+    try:
+        asyncio.run(sort())
+    except KeyboardInterrupt:
+        pass
+    report(sorter.progress)
+    return sorter
+
+
+class BackgroundSort:
+    """
+    Sorts a folder in a background thread with its own event loop, so that the user can keep working meanwhile.
+    """
+
+    def __init__(self, path: str, jobs: int, full: bool = False, dedupe: None | str = None, nested: bool = False):
+        self.path = path
+        self.sorter = AsyncSorter(jobs, full, dedupe, nested)
+        self.error = None
+        self._loop = asyncio.new_event_loop()
+        self._task = self._loop.create_task(self.sorter.sort(path))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def progress(self) -> SortProgress:
+        return self.sorter.progress
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def cancel(self, wait: bool = True) -> None:
+        """
+        Cancels the sort.
+
+        :param wait: whether to wait until the running filesystem calls are finished
+        """
+        if self.running:
+            try:
+                self._loop.call_soon_threadsafe(self._task.cancel)
+            except RuntimeError:
+                # the loop has just been closed, the sort is over
+                pass
+        if wait:
+            self._thread.join()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._task)
+        except asyncio.CancelledError:
+            pass
+        except Exception as err:
+            self.error = err
+        finally:
+            self._loop.close()
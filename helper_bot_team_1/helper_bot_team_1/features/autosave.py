@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Callable
+
+# the changes are saved after this many seconds without new changes...
+AUTOSAVE_INTERVAL = 2.0
+# ...but no later than this many seconds after the first unsaved change...
+AUTOSAVE_MAX_DELAY = 10.0
+# ...or as soon as there are this many of them
+AUTOSAVE_CHANGES = 10000
+
+
+class Autosave:
+    """
+    Counts the changes that are not saved yet and saves them in a background thread, once the changes stop coming for
+    a while, once the oldest of them waited long enough, or once there are many of them. Nothing is saved when nothing
+    changed, and the thread is started only with the first change.
+    """
+
+    def __init__(self, save: Callable[[], None], interval: float = AUTOSAVE_INTERVAL,
+                 max_delay: float = AUTOSAVE_MAX_DELAY, max_changes: int = AUTOSAVE_CHANGES):
+        self.save = save
+        self.interval = interval
+        self.max_delay = max_delay
+        self.max_changes = max_changes
+        self.changes = 0
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._closed = False
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def changed(self, count: int = 1) -> None:
+        """
+        Records that some changes were made.
+
+        :param count: number of the changes
+        """
+        with self._condition:
+            if self._closed:
+                return
+            now = time.monotonic()
+            if not self.changes:
+                self._first_change = now
+            self._last_change = now
+            self.changes += count
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            # the thread waiting for a deadline sees the later changes when it wakes up, it needs no extra wake-ups
+            if self.changes == count or self.changes >= self.max_changes:
+                self._condition.notify()
+
+    def saved(self) -> None:
+        """
+        Records that all the changes were saved by someone else.
+        """
+        with self._condition:
+            self.changes = 0
+
+    def close(self) -> None:
+        """
+        Stops the background thread. The changes that are left are saved by the caller.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._closed:
+                if not self.changes:
+                    self._condition.wait()
+                    continue
+                due = min(self._last_change + self.interval, self._first_change + self.max_delay)
+                wait = due - time.monotonic()
+                if wait > 0 and self.changes < self.max_changes:
+                    self._condition.wait(wait)
+                    continue
+
+                changes, self.changes = self.changes, 0
+                self._condition.release()
+                try:
+                    self.save()
+                    failed = False
+                except Exception:
+                    # the changes are still kept by the storage, they are tried again later and saved for sure on exit
+                    failed = True
+                finally:
+                    self._condition.acquire()
+                if failed:
+                    self.changes += changes
+                    self._first_change = self._last_change = time.monotonic()
@@ -0,0 +1,92 @@
+import calendar
+import datetime
+from bisect import bisect_left, insort
+from typing import Iterable, List, Tuple
+
+from helper_bot_team_1.features.indexes import RecordsIndex
+
+
+def birthday_key(record) -> None | Tuple[int, int]:
+    """
+    :param record: a contact
+    :return: the month and the day of the birthday of the contact, None if it isn't known
+    """
+    if record.birthday is None:
+        return None
+    return record.birthday.value.month, record.birthday.value.day
+
+
+class BirthdayIndex(RecordsIndex):
+    """
+    A sorted index of birthdays keyed by (month, day), so that the contacts who have birthdays in a period are found
+    with a range query instead of checking every contact.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+        self.days = {}
+
+    def add(self, name: str, record) -> None:
+        self.remove(name)
+        day = birthday_key(record)
+        if day is None:
+            return
+        self.days[name] = day
+        insort(self.entries, (*day, name))
+
+    def add_many(self, records: Iterable) -> None:
+        # the new entries are sorted together once instead of being inserted one by one
+        new_entries = []
+        for name, record in {record.name.value: record for record in records}.items():
+            self.remove(name)
+            day = birthday_key(record)
+            if day is not None:
+                self.days[name] = day
+                new_entries.append((*day, name))
+        if new_entries:
+            self.entries.extend(new_entries)
+            self.entries.sort()
+
+    def remove(self, name: str) -> None:
+        day = self.days.pop(name, None)
+        if day is None:
+            return
+        position = bisect_left(self.entries, (*day, name))
+        del self.entries[position]
+
+    def upcoming(self, today: datetime.date, period: int) -> List[str]:
+        """
+        Finds the contacts who have birthdays in the given number of days starting from today, wrapping around the end
+        of the year.
+
+        :param today: the first day of the period
+        :param period: number of days in the period
+        :return: names of the contacts, ordered by the date of their next birthday
+        """
+        if period >= 365:
+            # the period covers a whole year, so everybody has a birthday in it
+            return self._range((today.month, today.day), (12, 31), today.year) + \
+                self._range((1, 1), (today.month, today.day - 1), today.year)
+
+        end = today + datetime.timedelta(days=period)
+        if end.year == today.year:
+            return self._range((today.month, today.day), (end.month, end.day), end.year)
+        return self._range((today.month, today.day), (12, 31), today.year) + \
+            self._range((1, 1), (end.month, end.day), end.year)
+
+    def _range(self, first: Tuple[int, int], last: Tuple[int, int], year: int) -> List[str]:
+        if last == (2, 28) and not calendar.isleap(year):
+            # the 29th of February is celebrated on the 28th in non-leap years
+            last = (2, 29)
+        return self._between(first, (last[0], last[1] + 1))
+
+    def _between(self, start: Tuple[int, int], stop: Tuple[int, int]) -> List[str]:
+        """
+        :param start: the first (month, day)
+        :param stop: the (month, day) after the last one, the day may be past the end of the month
+        :return: names of the contacts with birthdays in the range, ordered by the date
+        """
+        first = bisect_left(self.entries, start)
+        last = bisect_left(self.entries, stop)
+        return [name for _, _, name in self.entries[first:last]]
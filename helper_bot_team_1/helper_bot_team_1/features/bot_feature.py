@@ -1,13 +1,140 @@
-from typing import List, Callable
+import json
+import re
+from typing import List, Callable, Any, Tuple
+
+LIST_SEPARATOR_REGEX = re.compile(r"[\s,;]+")
+
+
+def parse_options(args: tuple[str, ...], **defaults: Any) -> Tuple[dict[str, Any], list[str]]:
+    """
+    Splits "--name value" options from the rest of the arguments of a command. An option with a boolean default is
+    a flag and takes no value, other values are converted to the type of the default. Dashes in option names become
+    underscores: "--page-size 50" is returned as {"page_size": 50}.
+
+    :param args: arguments of a command
+    :param defaults: known options with their default values
+    :return: tuple(options, the rest of the arguments)
+    """
+    options = dict(defaults)
+    rest = []
+    args = iter(args)
+    for arg in args:
+        name = arg[2:].replace("-", "_")
+        if not arg.startswith("--") or name not in defaults:
+            rest.append(arg)
+            continue
+        if isinstance(defaults[name], bool):
+            options[name] = True
+            continue
+        value = next(args, None)
+        if value is None:
+            raise ValueError(f"Option {arg} needs a value.")
+        if isinstance(defaults[name], int):
+            if not value.isdigit():
+                raise ValueError(f"Option {arg} needs a number.")
+            value = int(value)
+        options[name] = value
+    return options, rest
+
+
+def has_fields(args: tuple[str, ...]) -> bool:
+    """
+    Checks if the arguments of a command hold the fields of a record, as JSON or as key=value pairs.
+
+    :param args: arguments of a command
+    :return: True if the fields can be parsed with parse_fields
+    """
+    return bool(args) and (args[0].startswith("{") or "=" in args[0])
+
+
+def parse_fields(args: tuple[str, ...]) -> dict[str, Any]:
+    """
+    Parses the fields of a record given as arguments of a command, either as a JSON object:
+    {"name": "John", "phones": ["0671234567"]}, or as key=value pairs: name=John phones=0671234567. Words without "="
+    continue the value before them, so address=Main street 5 is one field.
+
+    :param args: arguments of a command
+    :return: fields by their lowercase names
+    """
+    text = " ".join(args)
+    if text.startswith("{"):
+        fields = json.loads(text)
+        if not isinstance(fields, dict):
+            raise ValueError("Fields must be given as a JSON object.")
+        return {key.lower(): value for key, value in fields.items()}
+
+    fields = {}
+    key = None
+    for arg in args:
+        name, separator, value = arg.partition("=")
+        if separator and name.isidentifier():
+            key = name.lower()
+            fields[key] = value
+        elif key is None:
+            raise ValueError(f"Expected key=value, got {arg}.")
+        else:
+            fields[key] += " " + arg
+    return fields
+
+
+def check_field_names(fields: dict[str, Any], known: tuple[str, ...]) -> None:
+    """
+    Checks that a command got only the fields it knows. Raises exception otherwise.
+
+    :param fields: parsed fields
+    :param known: names of the fields the command takes
+    """
+    unknown = [name for name in fields if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Try: {', '.join(known)}.")
+
+
+def check_field_types(fields: dict[str, Any], text_fields: tuple[str, ...], list_fields: tuple[str, ...] = ()) -> None:
+    """
+    Checks that the fields have the types the command takes, as JSON can give numbers, lists or objects anywhere.
+    Raises exception otherwise.
+
+    :param fields: parsed fields
+    :param text_fields: names of the fields that must be strings
+    :param list_fields: names of the fields that must be strings or lists of strings
+    """
+    for name in text_fields:
+        if name in fields and not isinstance(fields[name], str):
+            raise ValueError(f"Field {name} must be a string.")
+    for name in list_fields:
+        value = fields.get(name, "")
+        if not isinstance(value, str) and \
+                not (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+            raise ValueError(f"Field {name} must be a string or a list of strings.")
+
+
+def as_list(value: Any) -> list[str]:
+    """
+    Turns a field that can hold several values into a list. A string is split by spaces, commas or semicolons.
+
+    :param value: a list or a string
+    :return: list of values
+    """
+    if isinstance(value, str):
+        return [item for item in LIST_SEPARATOR_REGEX.split(value) if item]
+    return [str(item) for item in value]
 
 
 class BotFeature:
     """
     A base class that handles commands for the features.
+
+    A feature is interactive by default, so commands may ask the user for the missing data. When it is not, commands
+    have to get everything in their arguments.
+
+    COMMANDS lists the names of the commands, so they are known without creating the feature.
     """
 
+    COMMANDS: tuple[str, ...] = ()
+
     def __init__(self, command_handlers: dict[str, Callable]):
         self.command_handlers = command_handlers
+        self.interactive = True
 
     def name(self):
         pass
@@ -18,3 +145,9 @@ class BotFeature:
             return handler(*args)
         else:
             raise ValueError("Unexpected command")
+
+    def close(self) -> None:
+        """
+        Stops the work the feature runs in the background. Called before the app terminates.
+        """
+        pass
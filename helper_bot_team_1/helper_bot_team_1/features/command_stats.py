@@ -0,0 +1,240 @@
+import cProfile
+import io
+import math
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Iterator, TextIO
+
+# the histogram buckets grow by GROWTH starting from MIN_LATENCY, so a percentile is off by at most 20%
+MIN_LATENCY = 0.00001
+GROWTH = 1.2
+PERCENTILES = (50, 95, 99)
+
+CPU_PROFILE = "cpu"
+MEMORY_PROFILE = "memory"
+PROFILE_MODES = (CPU_PROFILE, MEMORY_PROFILE)
+PROFILE_TOP = 20
+
+
+class LatencyHistogram:
+    """
+    Counts the latencies of a command in buckets that grow exponentially, so it takes the same little memory for ten
+    commands and for millions of them, and the percentiles are read from it without keeping every latency.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        bucket = 0 if seconds <= MIN_LATENCY else math.ceil(math.log(seconds / MIN_LATENCY, GROWTH))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """
+        Finds the latency that the given percent of the commands didn't exceed.
+
+        :param percent: a number from 0 to 100
+        :return: the upper bound of the bucket the percentile falls into, in seconds
+        """
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(MIN_LATENCY * GROWTH ** bucket, self.max)
+        return self.max
+
+
+class CommandStats:
+    """
+    Counts the runs and the errors of every command and keeps a histogram of their latencies.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, command: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            histogram = self.histograms.get(command)
+            if histogram is None:
+                histogram = self.histograms[command] = LatencyHistogram()
+            histogram.add(seconds)
+            if failed:
+                self.errors[command] = self.errors.get(command, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+
+    def report(self) -> str:
+        """
+        Describes the latencies of the commands, the commands that took the most time in total first.
+
+        :return: a table with the runs, errors, percentiles and the longest run of every command
+        """
+        with self._lock:
+            rows = sorted(self.histograms.items(), key=lambda item: -item[1].total)
+            if not rows:
+                return "No commands were run yet."
+            width = max(len("command"), *(len(command) for command, _ in rows))
+            header = [f"{'command':<{width}}", f"{'runs':>6}", f"{'errors':>6}",
+                      *(f"{f'p{percent}':>9}" for percent in PERCENTILES), f"{'max':>9}", f"{'total':>9}"]
+            lines = ["  ".join(header)]
+            for command, histogram in rows:
+                latencies = [histogram.percentile(percent) for percent in PERCENTILES]
+                lines.append("  ".join([f"{command:<{width}}", f"{histogram.count:>6}",
+                                        f"{self.errors.get(command, 0):>6}",
+                                        *(format_latency(seconds) for seconds in latencies),
+                                        format_latency(histogram.max), format_latency(histogram.total)]))
+            return "\n".join(lines)
+
+
+def format_latency(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:>7.2f}ms"
+    return f"{seconds:>8.2f}s"
+
+
+class ProfileSession:
+    """
+    Profiles one run of a command, either the time spent in every function with cProfile or the memory allocated
+    on every line with tracemalloc. The profiler can be paused while the results of the command are printed.
+    """
+
+    def __init__(self, command: str, mode: str):
+        self.command = command
+        self.mode = mode
+        self.profiler = cProfile.Profile() if mode == CPU_PROFILE else None
+        if mode == MEMORY_PROFILE:
+            tracemalloc.start()
+
+    def resume(self) -> None:
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    def pause(self) -> None:
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def dump(self, output: TextIO) -> None:
+        """
+        Stops the profiler and writes the hot spots of the command.
+
+        :param output: where to write them
+        """
+        print(f"Profile of '{self.command}', top {PROFILE_TOP} by {self.mode}:", file=output)
+        if self.profiler is not None:
+            text = io.StringIO()
+            pstats.Stats(self.profiler, stream=text).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+            print(text.getvalue(), file=output)
+            return
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        for statistic in snapshot.statistics("lineno")[:PROFILE_TOP]:
+            print(statistic, file=output)
+
+
+class Instrumentation:
+    """
+    Measures the commands the bot runs. Both parts are off unless asked for: the statistics of the latencies are kept
+    when enabled, and the first run of the profiled command is profiled and its hot spots are written to stderr.
+
+    The results that come in parts are measured while the parts are made, not while they are printed.
+    """
+
+    def __init__(self, stats_enabled: bool = False, profile_command: None | str = None, profile_mode: str = CPU_PROFILE,
+                 output: TextIO = sys.stderr):
+        if profile_mode not in PROFILE_MODES:
+            # a typo in a diagnostic setting must not stop the bot
+            print(f"Unknown profile mode {profile_mode}, profiling by {CPU_PROFILE}. "
+                  f"Try one of: {', '.join(PROFILE_MODES)}.", file=output)
+            profile_mode = CPU_PROFILE
+        self.stats = CommandStats() if stats_enabled else None
+        self.profile_command = " ".join(profile_command.lower().split()) if profile_command else None
+        self.profile_mode = profile_mode
+        self.output = output
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.stats is not None or self.profile_command is not None
+
+    def measure(self, command: str, call: Callable[[], Any]) -> Any:
+        """
+        Runs the command, measuring it if the instrumentation is enabled.
+
+        :param command: the feature and the command, e.g. "contacts search"
+        :param call: runs the command
+        :return: result of the command
+        """
+        if not self.enabled:
+            return call()
+
+        session = self._start_profile(command)
+        start = time.perf_counter()
+        try:
+            if session is not None:
+                session.resume()
+            try:
+                result = call()
+            finally:
+                if session is not None:
+                    session.pause()
+        except Exception:
+            self._finish(command, time.perf_counter() - start, session, failed=True)
+            raise
+        elapsed = time.perf_counter() - start
+
+        if result is None or isinstance(result, str):
+            self._finish(command, elapsed, session)
+            return result
+        return self._measure_parts(command, iter(result), elapsed, session)
+
+    def _measure_parts(self, command: str, parts: Iterator, elapsed: float,
+                       session: None | ProfileSession) -> Iterator:
+        failed = False
+        try:
+            while True:
+                start = time.perf_counter()
+                if session is not None:
+                    session.resume()
+                try:
+                    part = next(parts)
+                except StopIteration:
+                    return
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    if session is not None:
+                        session.pause()
+                    elapsed += time.perf_counter() - start
+                yield part
+        finally:
+            self._finish(command, elapsed, session, failed)
+
+    def _start_profile(self, command: str) -> None | ProfileSession:
+        with self._lock:
+            if self.profile_command != command:
+                return None
+            # only one run of the command is profiled
+            self.profile_command = None
+        return ProfileSession(command, self.profile_mode)
+
+    def _finish(self, command: str, seconds: float, session: None | ProfileSession, failed: bool = False) -> None:
+        if self.stats is not None:
+            self.stats.record(command, seconds, failed)
+        if session is not None:
+            session.dump(self.output)
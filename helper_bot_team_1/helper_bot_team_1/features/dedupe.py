@@ -0,0 +1,130 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Iterable, List, Tuple
+
+from helper_bot_team_1.features.phone_index import normalize_phone
+
+MAX_BLOCK_SIZE = 100
+MIN_SCORE = 0.5
+
+# a shared phone or the same name is enough to report a pair on its own, a shared email or birthday only together with
+# names that are somewhat alike
+PHONE_WEIGHT = 0.5
+EMAIL_WEIGHT = 0.4
+NAME_WEIGHT = 0.6
+BIRTHDAY_WEIGHT = 0.2
+
+NAME_SPLIT_REGEX = re.compile(r"\W+")
+
+Candidate = Tuple[float, str, str, List[str]]
+
+
+def folded_contact_name(name: str) -> str:
+    """
+    Brings a name to a form where the case, punctuation and the order of words don't matter, so "Ivan Petrenko" and
+    "petrenko, ivan" are the same.
+
+    :param name: a name of a contact
+    :return: the folded name
+    """
+    return " ".join(sorted(word for word in NAME_SPLIT_REGEX.split(name.lower()) if word))
+
+
+def blocking_keys(record) -> set[str]:
+    """
+    Creates the keys that the possible duplicates of a contact share with it: normalized phones, the lowercased email
+    and the folded name.
+
+    :param record: a contact
+    :return: set of keys
+    """
+    keys = {"phone:" + normalize_phone(phone.value) for phone in record.phones}
+    if record.email is not None:
+        keys.add("email:" + record.email.value.lower())
+    keys.add("name:" + folded_contact_name(record.name.value))
+    return keys
+
+
+def score(first, second) -> Tuple[float, List[str]]:
+    """
+    Scores how likely two contacts are the same person.
+
+    :param first: a contact
+    :param second: another contact
+    :return: a score from 0 to 1 and the reasons for it
+    """
+    reasons = []
+    total = 0.0
+
+    first_phones = {normalize_phone(phone.value) for phone in first.phones}
+    if first_phones & {normalize_phone(phone.value) for phone in second.phones}:
+        total += PHONE_WEIGHT
+        reasons.append("same phone")
+    if first.email is not None and second.email is not None \
+            and first.email.value.lower() == second.email.value.lower():
+        total += EMAIL_WEIGHT
+        reasons.append("same email")
+    if first.birthday is not None and second.birthday is not None \
+            and first.birthday.value == second.birthday.value:
+        total += BIRTHDAY_WEIGHT
+        reasons.append("same birthday")
+
+    similarity = SequenceMatcher(None, folded_contact_name(first.name.value),
+                                 folded_contact_name(second.name.value)).ratio()
+    total += NAME_WEIGHT * similarity
+    reasons.append(f"names {similarity:.0%} alike")
+    return min(total, 1.0), reasons
+
+
+def find_duplicates(records: Iterable, min_score: float = MIN_SCORE) -> List[Candidate]:
+    """
+    Finds the pairs of contacts that are probably the same person. Only the contacts that share a blocking key are
+    compared, so the work grows with the number of contacts and not with the number of all the pairs. Blocks bigger
+    than MAX_BLOCK_SIZE (like a phone of an office shared by everyone) are skipped.
+
+    :param records: contacts to check
+    :param min_score: the lowest score of a reported pair
+    :return: (score, name, name, reasons) of the found pairs, the most likely first
+    """
+    blocks = defaultdict(list)
+    by_name = {}
+    for record in records:
+        by_name[record.name.value] = record
+        for key in blocking_keys(record):
+            blocks[key].append(record.name.value)
+
+    pairs = set()
+    for names in blocks.values():
+        if 1 < len(names) <= MAX_BLOCK_SIZE:
+            pairs.update(tuple(sorted(pair)) for pair in combinations(names, 2))
+
+    candidates = []
+    for first, second in pairs:
+        pair_score, reasons = score(by_name[first], by_name[second])
+        if pair_score >= min_score:
+            candidates.append((pair_score, first, second, reasons))
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+    return candidates
+
+
+def merge_records(keep, other) -> None:
+    """
+    Merges one contact into another: adds the phones that the kept contact doesn't have yet and fills its empty
+    fields.
+
+    :param keep: a contact to keep
+    :param other: a duplicate to take the data from
+    """
+    known_phones = {normalize_phone(phone.value) for phone in keep.phones}
+    for phone in other.phones:
+        if normalize_phone(phone.value) not in known_phones:
+            known_phones.add(normalize_phone(phone.value))
+            keep.phones.append(phone)
+    if keep.birthday is None:
+        keep.birthday = other.birthday
+    if keep.email is None:
+        keep.email = other.email
+    if keep.address is None:
+        keep.address = other.address
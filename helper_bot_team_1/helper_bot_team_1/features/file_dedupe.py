@@ -0,0 +1,117 @@
+import hashlib
+import os
+from collections import defaultdict
+from typing import Iterable
+
+HEAD_SIZE = 4096
+CHUNK_SIZE = 1024 * 1024
+
+SKIP = "skip"
+LINK = "link"
+REPORT = "report"
+DEDUPE_MODES = (SKIP, LINK, REPORT)
+
+MAX_REPORTED_GROUPS = 50
+
+
+class FileDeduplicator:
+    """
+    Finds files with the same content. Files are grouped by size first, then by a hash of their first HEAD_SIZE bytes,
+    and only the files that still have a match are hashed whole. Most files have a unique size, so they are never
+    read at all.
+    """
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.bytes_total = 0
+
+    def find(self, paths: Iterable[str]) -> list[list[str]]:
+        """
+        Groups the files by their content.
+
+        :param paths: paths to the files
+        :return: groups of identical files, the first file of each group is the one to keep
+        """
+        by_size = defaultdict(list)
+        for path in paths:
+            size = os.path.getsize(path)
+            self.bytes_total += size
+            if size > 0:
+                by_size[size].append(path)
+
+        groups = []
+        for size, same_size in by_size.items():
+            if len(same_size) < 2:
+                continue
+            for same_head in self._group(same_size, HEAD_SIZE):
+                if size <= HEAD_SIZE:
+                    groups.append(same_head)
+                else:
+                    groups.extend(self._group(same_head, None))
+        return sorted(sorted(group) for group in groups)
+
+    def _group(self, paths: list[str], limit: None | int) -> list[list[str]]:
+        by_digest = defaultdict(list)
+        for path in paths:
+            by_digest[self.digest(path, limit)].append(path)
+        return [group for group in by_digest.values() if len(group) > 1]
+
+    def digest(self, path: str, limit: None | int = None) -> bytes:
+        """
+        Hashes the file, reading it in chunks.
+
+        :param path: path to the file
+        :param limit: number of bytes from the start of the file to hash, the whole file if None
+        :return: the digest
+        """
+        file_hash = hashlib.blake2b(digest_size=20)
+        left = limit
+        with open(path, "rb") as f:
+            while left is None or left > 0:
+                chunk = f.read(CHUNK_SIZE if left is None else min(left, CHUNK_SIZE))
+                if not chunk:
+                    break
+                self.bytes_read += len(chunk)
+                file_hash.update(chunk)
+                if left is not None:
+                    left -= len(chunk)
+        return file_hash.digest()
+
+
+def link_duplicates(groups: list[list[str]]) -> None:
+    """
+    Replaces the duplicates with hard links to the first file of their group, so they take the disk space once. A
+    duplicate on another device than the kept file is left as it is.
+
+    :param groups: groups of identical files
+    """
+    for keep, *duplicates in groups:
+        for duplicate in duplicates:
+            tmp_path = duplicate + ".link"
+            try:
+                os.link(keep, tmp_path)
+            except OSError:
+                continue
+            os.replace(tmp_path, duplicate)
+
+
+def duplicates_report(groups: list[list[str]], root: str, deduplicator: FileDeduplicator, mode: str) -> str:
+    """
+    Describes the found duplicates.
+
+    :param groups: groups of identical files
+    :param root: path to the sorted folder, the paths are shown relative to it
+    :param deduplicator: the deduplicator that found the groups
+    :param mode: what was done with the duplicates
+    :return: the report
+    """
+    duplicates = sum(len(group) - 1 for group in groups)
+    actions = {SKIP: "left unsorted", LINK: "replaced with hard links", REPORT: "sorted as usual"}
+    report = [f"{duplicates} duplicates of {len(groups)} files were found and {actions[mode]}. "
+              f"{deduplicator.bytes_read / CHUNK_SIZE:.1f} MB of {deduplicator.bytes_total / CHUNK_SIZE:.1f} MB "
+              f"were read."]
+    for keep, *others in groups[:MAX_REPORTED_GROUPS]:
+        report.append(f"{os.path.relpath(keep, root)}: " + ", ".join(os.path.relpath(f, root) for f in others))
+    if len(groups) > MAX_REPORTED_GROUPS:
+        report.append(f"... and {len(groups) - MAX_REPORTED_GROUPS} more.")
+    return "\n".join(report)
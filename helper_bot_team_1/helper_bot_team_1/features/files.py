@@ -1,5 +1,7 @@
-from helper_bot_team_1.features.sorter import sort_folder
-from helper_bot_team_1.features.bot_feature import BotFeature
+from helper_bot_team_1.features.async_sorter import BackgroundSort, SortProgress, sort_with_progress, DONE
+from helper_bot_team_1.features.file_dedupe import DEDUPE_MODES
+from helper_bot_team_1.features.sorter import sort_folder, plan_folder
+from helper_bot_team_1.features.bot_feature import BotFeature, parse_options
 import os.path
 
 
@@ -8,26 +10,97 @@ class Files(BotFeature):
     A feature that allows a user to sort files in a given directory according to files extensions.
     """
 
+    COMMANDS = ("sort", "status", "cancel")
+
     def __init__(self):
         super().__init__({
-            "sort": self.sort
+            "sort": self.sort,
+            "status": self.status,
+            "cancel": self.cancel
         })
+        self.background_sort = None
 
     def name(self):
         return "files"
 
-    @staticmethod
-    def sort(*args: str) -> str:
+    def sort(self, *args: str) -> str:
         """
         Sorts the folder. Catches system errors when the operating system tries to reach the path.
 
-        :param args:
+        :param args: path to the folder, optionally preceded by "--jobs N" to sort with N threads, "--progress" to
+        show the progress (Ctrl-C cancels the sort) or "--background" to sort while the user keeps working, and
+        "--full" to look at every file and not only at what changed since the last sort. "--dedupe skip/link/report"
+        finds identical files first and leaves them unsorted, replaces them with hard links or only reports them.
+        "--nested" unpacks the archives found inside the archives too. "--dry-run" only shows what the sort would do
         :return:
         """
-        
-        path = " ".join(args)
-        if os.path.exists(path):
-            sort_folder(path)
-            return "Folder is sorted"
-        else:
-            return "Path does not exist. Try again."
\ No newline at end of file
+
+        options, path = parse_options(args, jobs=1, progress=False, background=False, full=False, dedupe="",
+                                      nested=False, dry_run=False)
+        path = " ".join(path)
+        if not os.path.exists(path):
+            return "Path does not exist. Try again."
+        if options["dedupe"] and options["dedupe"] not in DEDUPE_MODES:
+            raise ValueError(f"Option --dedupe takes one of: {', '.join(DEDUPE_MODES)}.")
+        dedupe = options["dedupe"] or None
+
+        if options["dry_run"]:
+            return plan_folder(path, options["full"]).describe()
+
+        if options["background"]:
+            if self.background_sort is not None and self.background_sort.running:
+                raise ValueError("Another folder is being sorted. Type 'files status' or 'files cancel'.")
+            self.background_sort = BackgroundSort(path, options["jobs"], options["full"], dedupe, options["nested"])
+            return f"Sorting {path} in the background. Type 'files status' to see the progress."
+
+        if options["progress"]:
+            sorter = sort_with_progress(path, options["jobs"], self.print_progress, options["full"], dedupe,
+                                        options["nested"])
+            print()
+            if sorter.progress.state != DONE:
+                return "Sorting was cancelled, nothing is left halfway."
+            return self.sorted_message(sorter.report)
+
+        report = sort_folder(path, jobs=max(options["jobs"], 1), full=options["full"], dedupe=dedupe,
+                             nested=options["nested"])
+        return self.sorted_message(report)
+
+    def status(self) -> str:
+        """
+        Shows the progress of the background sort.
+
+        :return: progress message
+        """
+
+        if self.background_sort is None:
+            return "No folder is being sorted in the background."
+        message = f"{self.background_sort.path}: {self.background_sort.progress}"
+        if self.background_sort.sorter.report is not None:
+            message += "\n" + self.background_sort.sorter.report
+        if self.background_sort.error is not None:
+            message += f"\nError: {self.background_sort.error}"
+        return message
+
+    def cancel(self) -> str:
+        """
+        Cancels the background sort and waits until the files that are being moved are in place.
+
+        :return: progress message
+        """
+
+        if self.background_sort is None or not self.background_sort.running:
+            return "No folder is being sorted in the background."
+        self.background_sort.cancel()
+        return self.status()
+
+    def close(self) -> None:
+        if self.background_sort is not None:
+            self.background_sort.cancel()
+
+    @staticmethod
+    def sorted_message(report: None | str) -> str:
+        return "Folder is sorted" if report is None else f"Folder is sorted\n{report}"
+
+    @staticmethod
+    def print_progress(progress: SortProgress) -> None:
+        print(f"\r{progress}", end="", flush=True)
@@ -0,0 +1,206 @@
+import csv
+import re
+from pathlib import Path
+from typing import Iterator, Tuple, TextIO
+
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.bot_feature import as_list
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ROWS = 50
+
+CSV_EXTENSIONS = (".csv",)
+VCARD_EXTENSIONS = (".vcf", ".vcard")
+
+VCARD_DATE_REGEX = re.compile(r"(\d{4})-?(\d{2})-?(\d{2})")
+# the bytes that aren't UTF-8 are read as these surrogates, so a bad line is rejected instead of stopping the import
+UNDECODABLE_REGEX = re.compile("[\udc80-\udcff]")
+
+Row = Tuple[int, dict[str, str | list[str]]]
+
+
+def read_csv(f: TextIO) -> Iterator[Row]:
+    """
+    Reads contacts from a CSV file with a header. Known columns are name, phones (or phone), birthday, email and
+    address, in any order and case. Several phones in one cell are separated by spaces, commas or semicolons.
+
+    :param f: an open CSV file
+    :return: line numbers and fields of the contacts
+    """
+    reader = csv.DictReader(f)
+    if reader.fieldnames is None:
+        return
+    reader.fieldnames = [field.strip().lower() for field in reader.fieldnames]
+    for row in reader:
+        phones = row.get("phones") or row.get("phone") or ""
+        yield reader.line_num, {
+            "name": (row.get("name") or "").strip(),
+            "phones": as_list(phones),
+            "birthday": (row.get("birthday") or "").strip(),
+            "email": (row.get("email") or "").strip(),
+            "address": (row.get("address") or "").strip()
+        }
+
+
+def read_vcard(f: TextIO) -> Iterator[Row]:
+    """
+    Reads contacts from a vCard file. Uses the FN, TEL, BDAY, EMAIL and ADR properties.
+
+    :param f: an open vCard file
+    :return: line numbers where the cards begin and fields of the contacts
+    """
+    fields = None
+    start = 0
+    for line_number, (key, value) in unfold_vcard(f):
+        if key == "BEGIN" and value.upper() == "VCARD":
+            fields = {"name": "", "phones": [], "birthday": "", "email": "", "address": ""}
+            start = line_number
+        elif fields is None:
+            continue
+        elif key == "END":
+            yield start, fields
+            fields = None
+        elif key == "FN":
+            fields["name"] = value.strip()
+        elif key == "TEL":
+            fields["phones"].append(value.strip())
+        elif key == "BDAY":
+            fields["birthday"] = vcard_date(value.strip())
+        elif key == "EMAIL" and not fields["email"]:
+            fields["email"] = value.strip()
+        elif key == "ADR" and not fields["address"]:
+            fields["address"] = " ".join(part for part in value.split(";") if part.strip())
+
+
+def unfold_vcard(f: TextIO) -> Iterator[Tuple[int, Tuple[str, str]]]:
+    """
+    Joins the folded lines of a vCard file and splits them into property names and values. Parameters of a property
+    (like TEL;TYPE=cell) are dropped.
+
+    :param f: an open vCard file
+    :return: line numbers and (property name, value) pairs
+    """
+    current = None
+    current_line = 0
+    for line_number, line in enumerate(f, start=1):
+        line = line.rstrip("\r\n")
+        if line.startswith((" ", "\t")) and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current_line, split_property(current)
+        current, current_line = line, line_number
+    if current is not None:
+        yield current_line, split_property(current)
+
+
+def split_property(line: str) -> Tuple[str, str]:
+    """
+    Splits a vCard line into the property name without parameters and groups, and the value.
+
+    :param line: an unfolded vCard line
+    :return: tuple(property name, value)
+    """
+    name, _, value = line.partition(":")
+    return name.split(";")[0].split(".")[-1].upper(), value
+
+
+def vcard_date(value: str) -> str:
+    """
+    Converts a vCard date (1990-12-31 or 19901231) into DATE_FORMAT. Dates in other formats are returned as they are.
+
+    :param value: a vCard date
+    :return: the date in DATE_FORMAT
+    """
+    date_match = VCARD_DATE_REGEX.fullmatch(value)
+    if date_match is None:
+        return value
+    year, month, day = date_match.groups()
+    return f"{day}.{month}.{year}"
+
+
+def check_decoded(fields: dict) -> None:
+    """
+    Checks that the fields were read from valid UTF-8. Raises exception otherwise.
+
+    :param fields: fields of a contact
+    """
+    for value in fields.values():
+        for text in ([value] if isinstance(value, str) else value):
+            if UNDECODABLE_REGEX.search(text):
+                raise ValueError("The row is not valid UTF-8.")
+
+
+def build_record(fields: dict) -> Record:
+    """
+    Creates a record from the imported fields. Raises exception if some field is invalid.
+
+    :param fields: fields of a contact, only the name is compulsory
+    :return: a new record
+    """
+    record = Record(fields.get("name", ""))
+    for phone in fields.get("phones", []):
+        record.add_phone(phone)
+    if fields.get("birthday"):
+        record.add_birthday(fields["birthday"])
+    if fields.get("email"):
+        record.add_email(fields["email"])
+    if fields.get("address"):
+        record.add_address(fields["address"])
+    return record
+
+
+def import_contacts(container, path: str) -> str:
+    """
+    Streams the contacts from a CSV or vCard file into the container. Valid contacts are added in batches, so the
+    storage and the indexes are updated once per batch. Rows with invalid fields, rows that aren't valid UTF-8 and
+    names that already exist are rejected.
+
+    :param container: a records container to add the contacts to
+    :param path: path to the file
+    :return: a report with the number of imported contacts and the rejected rows
+    """
+    extension = Path(path).suffix.lower()
+    if extension in CSV_EXTENSIONS:
+        reader = read_csv
+    elif extension in VCARD_EXTENSIONS:
+        reader = read_vcard
+    else:
+        raise ValueError("Only .csv and .vcf files can be imported.")
+    if not Path(path).is_file():
+        raise ValueError(f"File {path} does not exist.")
+
+    imported = 0
+    rejected = []
+    batch = {}
+    with open(path, newline="", encoding="utf-8-sig", errors="surrogateescape") as f:
+        for line_number, fields in reader(f):
+            try:
+                check_decoded(fields)
+                record = build_record(fields)
+                if record.name.value in batch or container.record_exists(record.name.value):
+                    raise ValueError(f"{record.name.value} is already in your phonebook.")
+            except ValueError as err:
+                rejected.append((line_number, err))
+                continue
+
+            batch[record.name.value] = record
+            if len(batch) >= BATCH_SIZE:
+                container.add_records(list(batch.values()))
+                imported += len(batch)
+                batch.clear()
+    if batch:
+        container.add_records(list(batch.values()))
+        imported += len(batch)
+
+    return import_report(imported, rejected)
+
+
+def import_report(imported: int, rejected: list[Tuple[int, ValueError]]) -> str:
+    report = [f"{imported} contacts were imported."]
+    if rejected:
+        report.append(f"{len(rejected)} rows were rejected:")
+        report.extend(f"line {line_number}: {err}" for line_number, err in rejected[:MAX_REPORTED_ROWS])
+        if len(rejected) > MAX_REPORTED_ROWS:
+            report.append(f"... and {len(rejected) - MAX_REPORTED_ROWS} more.")
+    return "\n".join(report)
@@ -0,0 +1,122 @@
+from collections import defaultdict
+from itertools import count
+from typing import Iterable, List
+
+NGRAM_SIZE = 3
+
+
+def ngrams(text: str, size: int = NGRAM_SIZE) -> set[str]:
+    """
+    Splits the text into a set of overlapping n-grams.
+
+    :param text: a text to split
+    :param size: length of an n-gram
+    :return: set of n-grams, empty if the text is shorter than an n-gram
+    """
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class RecordsIndex:
+    """
+    A base class for the indexes that a records container keeps up to date. The index is built from the records on
+    the first use, so that opening a container stays cheap.
+    """
+
+    def __init__(self):
+        self.built = False
+
+    def build(self, records: Iterable) -> None:
+        """
+        Indexes all the given records.
+
+        :param records: records of a container
+        """
+        self.add_many(records)
+        self.built = True
+
+    def add_many(self, records: Iterable) -> None:
+        """
+        Adds several records to the index or replaces their indexed versions. Indexes that can add a batch faster
+        than one record at a time override it.
+
+        :param records: records to index
+        """
+        for record in records:
+            self.add(record.name.value, record)
+
+    def add(self, name: str, record) -> None:
+        """
+        Adds a record to the index or replaces the indexed version of the record.
+
+        :param name: a name of the record
+        :param record: a record to index
+        """
+        raise NotImplementedError
+
+    def remove(self, name: str) -> None:
+        """
+        Removes a record from the index. Does nothing if the record isn't indexed.
+
+        :param name: a name of the record
+        """
+        raise NotImplementedError
+
+
+class SearchIndex(RecordsIndex):
+    """
+    An inverted index from the n-grams of the rendered records to the names of the records.
+
+    Keeps the lowercased text of every record, so a query only has to intersect the postings of its n-grams and check
+    the few candidates left, instead of rendering every record.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.texts = {}
+        self.postings = defaultdict(set)
+        self._order = {}
+        self._counter = count()
+
+    def add(self, name: str, record) -> None:
+        self._discard_text(name)
+        text = str(record).lower()
+        self.texts[name] = text
+        if name not in self._order:
+            self._order[name] = next(self._counter)
+        for gram in ngrams(text):
+            self.postings[gram].add(name)
+
+    def remove(self, name: str) -> None:
+        self._discard_text(name)
+        self._order.pop(name, None)
+
+    def search(self, needle: str) -> List[str]:
+        """
+        Finds the records whose rendered text contains the needle.
+
+        :param needle: a substring to search for
+        :return: names of the matching records in the order they were added
+        """
+        grams = ngrams(needle)
+        if grams:
+            postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= posting
+        else:
+            candidates = self.texts.keys()
+
+        found = [name for name in candidates if needle in self.texts[name]]
+        return sorted(found, key=self._order.__getitem__)
+
+    def _discard_text(self, name: str) -> None:
+        text = self.texts.pop(name, None)
+        if text is None:
+            return
+        for gram in ngrams(text):
+            posting = self.postings[gram]
+            posting.discard(name)
+            if not posting:
+                del self.postings[gram]
@@ -0,0 +1,228 @@
+import os.path
+import pickle
+import threading
+
+from helper_bot_team_1.features.indexes import RecordsIndex, SearchIndex
+from helper_bot_team_1.features.snapshot import MAGIC, DEFAULT_COMPRESSION, gc_paused, is_snapshot, read_records, \
+    write_records
+
+COMPACTION_THRESHOLD = 1024 * 1024
+JOURNAL_SUFFIX = ".journal"
+PENDING_SUFFIX = ".journal.pending"
+
+PUT = "put"
+REMOVE = "remove"
+
+
+def load_snapshot(filepath: str) -> dict:
+    """
+    Loads records from a snapshot file. Save files pickled as a whole by the older versions of the bot are loaded too.
+
+    :param filepath: a snapshot file
+    :return: loaded records or an empty dict if there is no snapshot yet
+    """
+    if not os.path.exists(filepath):
+        return {}
+
+    with open(filepath, 'rb') as f, gc_paused():
+        if not is_snapshot(f.read(len(MAGIC))):
+            f.seek(0)
+            try:
+                return pickle.load(f)
+            except EOFError:
+                return {}
+        f.seek(0)
+        return {record.name: record for record in read_records(f)}
+
+
+def is_legacy_snapshot(filepath: str) -> bool:
+    """
+    Checks if the snapshot file is pickled as a whole, as the older versions of the bot saved it.
+
+    :param filepath: a snapshot file
+    :return: True if the file has to be rewritten in the current format
+    """
+    if not os.path.exists(filepath) or not os.path.getsize(filepath):
+        return False
+    with open(filepath, 'rb') as f:
+        return not is_snapshot(f.read(len(MAGIC)))
+
+
+def write_snapshot(filepath: str, data: dict, compression: str = DEFAULT_COMPRESSION) -> None:
+    """
+    Atomically replaces the snapshot file with the given records.
+
+    :param filepath: a snapshot file
+    :param data: records to save
+    :param compression: "zlib", "lzma" or "none"
+    """
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'wb') as f, gc_paused():
+        write_records(f, data.values(), compression)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
+
+
+def replay(filepath: str, data: dict) -> None:
+    """
+    Applies the entries of a journal file to the records. A torn entry at the end of the file (left by a crash in the
+    middle of a write) is cut off, so that new entries can be appended after the last complete one.
+
+    :param filepath: a journal file
+    :param data: records to apply the changes to
+    """
+    if not os.path.exists(filepath):
+        return
+
+    with open(filepath, 'r+b') as f:
+        last_complete = 0
+        while True:
+            try:
+                operation, payload = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                break
+            if operation == PUT:
+                data[payload.name] = payload
+            elif operation == REMOVE:
+                data.pop(payload, None)
+            last_complete = f.tell()
+        f.truncate(last_complete)
+
+
+class Journal:
+    """
+    A write-ahead log of the changes made to a records container.
+
+    Every change is appended to "<save_file>.journal" as a small pickled entry. When the journal grows past the
+    threshold, it is moved aside and merged into the snapshot in a background thread, while new changes go to a fresh
+    journal. A save file pickled by an older version of the bot is rewritten as a snapshot when it is loaded.
+    """
+
+    def __init__(self, save_file: str, threshold: int = COMPACTION_THRESHOLD, compression: str = DEFAULT_COMPRESSION):
+        self.save_file = save_file
+        self.compression = compression
+        self.journal_file = save_file + JOURNAL_SUFFIX
+        self.pending_file = save_file + PENDING_SUFFIX
+        self.threshold = threshold
+        self._file = None
+        self._compaction = None
+        self.batch = False
+
+    def load(self) -> dict:
+        """
+        Restores the records from the snapshot and replays the journals written after it.
+
+        :return: restored records
+        """
+        data = load_snapshot(self.save_file)
+        if is_legacy_snapshot(self.save_file):
+            write_snapshot(self.save_file, data, self.compression)
+        replay(self.pending_file, data)
+        replay(self.journal_file, data)
+
+        if os.path.exists(self.pending_file):
+            # a compaction was interrupted last time, finish it
+            self._compaction = threading.Thread(target=self._compact, daemon=True)
+            self._compaction.start()
+        return data
+
+    @staticmethod
+    def search_index() -> SearchIndex:
+        """
+        :return: an index that searches the records kept in memory
+        """
+        return SearchIndex()
+
+    @staticmethod
+    def storage_index(index: RecordsIndex) -> RecordsIndex:
+        """
+        :param index: an index registered with the container
+        :return: the same index, the records are kept in memory anyway
+        """
+        return index
+
+    def begin_batch(self) -> None:
+        """
+        Stops flushing the journal after every change. The changes are written in big chunks and are flushed for sure
+        only by flush().
+        """
+        self.batch = True
+
+    def put(self, record) -> None:
+        """
+        Logs that a record was added or changed.
+
+        :param record: a record with its current fields
+        """
+        self._append((PUT, record))
+
+    def put_many(self, records: list) -> None:
+        """
+        Logs that several records were added or changed, with one write to the journal.
+
+        :param records: records with their current fields
+        """
+        self._append(*((PUT, record) for record in records))
+
+    def remove(self, record_name: str) -> None:
+        """
+        Logs that a record was removed.
+
+        :param record_name: a name of the removed record
+        """
+        self._append((REMOVE, str(record_name)))
+
+    def sync(self) -> None:
+        """
+        Writes the changes held back in batch mode to the disk. Entries are only appended, and a torn entry at the end
+        is cut off when the journal is replayed, so the journal is valid at any moment.
+        """
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def flush(self, wait: bool = True) -> None:
+        """
+        Closes the journal file, after a running compaction finishes if asked to wait for it. A compaction that is
+        cut off by the exit of the app is finished on the next load, so the app doesn't have to wait for it to exit.
+
+        :param wait: whether to wait for a running compaction
+        """
+        if self._compaction is not None and wait:
+            self._compaction.join()
+            self._compaction = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _append(self, *entries: tuple) -> None:
+        if self._file is None:
+            self._file = open(self.journal_file, 'ab')
+        self._file.write(b"".join(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL) for entry in entries))
+        if not self.batch:
+            self._file.flush()
+        if self._file.tell() >= self.threshold:
+            self._start_compaction()
+
+    def _start_compaction(self) -> None:
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        if os.path.exists(self.pending_file):
+            return
+
+        self._file.close()
+        os.replace(self.journal_file, self.pending_file)
+        self._file = open(self.journal_file, 'ab')
+
+        self._compaction = threading.Thread(target=self._compact, daemon=True)
+        self._compaction.start()
+
+    def _compact(self) -> None:
+        """
+        Merges the pending journal into the snapshot. Works only with files, so it never touches live records.
+        """
+        data = load_snapshot(self.save_file)
+        replay(self.pending_file, data)
+        write_snapshot(self.save_file, data, self.compression)
+        os.remove(self.pending_file)
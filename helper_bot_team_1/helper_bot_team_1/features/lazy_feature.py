@@ -0,0 +1,101 @@
+import threading
+from importlib import import_module
+from typing import Any, List
+
+from helper_bot_team_1.features.bot_feature import BotFeature
+
+
+class LazyFeature:
+    """
+    Stands for a feature until it is needed. The module of the feature is imported and the feature (with its data) is
+    created on the first command that uses it, or earlier if it is preloaded. Only the module is imported to tell the
+    commands of the feature.
+    """
+
+    def __init__(self, name: str, module: str, class_name: str, *args: Any):
+        self._name = name
+        self.module = module
+        self.class_name = class_name
+        self.args = args
+        self.batch = False
+        self.interactive = True
+        self._feature = None
+        self._lock = threading.Lock()
+
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def loaded(self) -> bool:
+        return self._feature is not None
+
+    @property
+    def feature_class(self) -> type[BotFeature]:
+        return getattr(import_module(self.module), self.class_name)
+
+    @property
+    def commands(self) -> tuple[str, ...]:
+        return self.feature_class.COMMANDS
+
+    @property
+    def feature(self) -> BotFeature:
+        """
+        Returns the feature, creating it first if it doesn't exist yet. Safe to call from several threads.
+
+        :return: the feature
+        """
+        if self._feature is None:
+            with self._lock:
+                if self._feature is None:
+                    feature = self.feature_class(*self.args)
+                    feature.interactive = self.interactive
+                    if self.batch:
+                        start_feature_batch(feature)
+                    self._feature = feature
+        return self._feature
+
+    def handle_command(self, command: str, *args: List[str]):
+        return self.feature.handle_command(command, *args)
+
+    def start_batch(self) -> None:
+        """
+        Switches the feature to batch mode now or as soon as it is created.
+        """
+        with self._lock:
+            self.batch = True
+            if self._feature is not None:
+                start_feature_batch(self._feature)
+
+    def stop_prompts(self) -> None:
+        """
+        Makes the feature run commands without asking the user anything, now or as soon as it is created. Unlike batch
+        mode, every change is still saved right away.
+        """
+        with self._lock:
+            self.interactive = False
+            if self._feature is not None:
+                self._feature.interactive = False
+
+    def backup_data(self, wait: bool = True) -> None:
+        """
+        Saves the data of the feature. A feature that was never created has nothing to save.
+
+        :param wait: whether to wait for the work the storage does in the background
+        """
+        if self._feature is not None and hasattr(self._feature, "data"):
+            self._feature.data.backup_data(wait)
+
+    def close(self) -> None:
+        if self._feature is not None:
+            self._feature.close()
+
+
+def start_feature_batch(feature: BotFeature) -> None:
+    """
+    Makes the feature run commands without asking the user anything and save its data in bulk.
+
+    :param feature: a feature to switch
+    """
+    feature.interactive = False
+    if hasattr(feature, "data"):
+        feature.data.begin_batch()
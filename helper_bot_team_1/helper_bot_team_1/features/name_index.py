@@ -0,0 +1,126 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+from helper_bot_team_1.features.indexes import RecordsIndex, ngrams
+from helper_bot_team_1.features.transliteration import TRANSLITERATION
+
+NON_WORD_REGEX = re.compile(r"[\W_]+")
+
+# one typo is allowed in every LETTERS_PER_TYPO letters of the query, and at least one in any query
+LETTERS_PER_TYPO = 4
+MAX_RESULTS = 20
+
+
+def fold_name(name: str) -> str:
+    """
+    Brings a name to the form where the case, punctuation and the alphabet don't matter, so "Олександр" and
+    "oleksandr" are the same.
+
+    :param name: a name or a query
+    :return: lowercase latin words separated by single spaces
+    """
+    return NON_WORD_REGEX.sub(" ", name.lower().translate(TRANSLITERATION)).strip()
+
+
+def name_trigrams(folded: str) -> set[str]:
+    """
+    Splits a folded name into trigrams. The name is padded, so that the beginnings and the ends of the words make
+    their own trigrams and short names have trigrams at all.
+
+    :param folded: a folded name
+    :return: set of trigrams
+    """
+    return ngrams(f"  {folded} ")
+
+
+def edit_distance(first: str, second: str, bound: int) -> int:
+    """
+    Counts the insertions, deletions and substitutions that turn one string into another, giving up as soon as there
+    are more than the bound.
+
+    :param first: a string
+    :param second: another string
+    :param bound: the largest distance of interest
+    :return: the distance, or bound + 1 if it is larger than the bound
+    """
+    if abs(len(first) - len(second)) > bound:
+        return bound + 1
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, start=1):
+        current = [i]
+        for j, second_char in enumerate(second, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        if min(current) > bound:
+            return bound + 1
+        previous = current
+    return min(previous[-1], bound + 1)
+
+
+class NameIndex(RecordsIndex):
+    """
+    A trigram index over the folded names of the contacts for the search that tolerates typos.
+
+    A name with at most k typos shares all but 3k trigrams with the query, so only the names that share enough
+    trigrams are compared with the query letter by letter.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.postings = defaultdict(set)
+        self.folded = {}
+
+    def add(self, name: str, record) -> None:
+        self.remove(name)
+        folded = fold_name(name)
+        self.folded[name] = folded
+        for gram in name_trigrams(folded):
+            self.postings[gram].add(name)
+
+    def remove(self, name: str) -> None:
+        folded = self.folded.pop(name, None)
+        if folded is None:
+            return
+        for gram in name_trigrams(folded):
+            posting = self.postings[gram]
+            posting.discard(name)
+            if not posting:
+                del self.postings[gram]
+
+    def search(self, query: str, limit: int = MAX_RESULTS) -> List[Tuple[int, str]]:
+        """
+        Finds the names that are like the query. The query is compared with the whole name and, if it is one word,
+        with every word of the name, so "olexandr" finds "Oleksandr Petrenko".
+
+        :param query: a name with possible typos
+        :param limit: the most names to return
+        :return: pairs of the number of typos and a name, the closest first
+        """
+        folded_query = fold_name(query)
+        if not folded_query:
+            return []
+        bound = max(1, len(folded_query) // LETTERS_PER_TYPO)
+        grams = name_trigrams(folded_query)
+        min_shared = max(1, len(grams) - 3 * bound)
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        found = []
+        for name, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = self._distance(folded_query, self.folded[name], bound)
+            if distance <= bound:
+                found.append((distance, name))
+        return heapq.nsmallest(limit, found)
+
+    @staticmethod
+    def _distance(folded_query: str, folded_name: str, bound: int) -> int:
+        distance = edit_distance(folded_query, folded_name, bound)
+        if " " not in folded_query:
+            for word in folded_name.split():
+                distance = min(distance, edit_distance(folded_query, word, bound))
+        return distance
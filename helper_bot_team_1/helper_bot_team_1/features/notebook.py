@@ -1,14 +1,23 @@
-from typing import Any, List
+from typing import Any, Iterator, List
 from datetime import date
 import re
 
-from helper_bot_team_1.features.bot_feature import BotFeature
-from helper_bot_team_1.features.records_container import RecordsContainer
+from helper_bot_team_1.features.bot_feature import BotFeature, parse_fields, has_fields, as_list, check_field_names, \
+    check_field_types, parse_options
+from helper_bot_team_1.features.slotted import Slotted
+from helper_bot_team_1.features.records_container import RecordsContainer, JOURNAL_STORAGE, PAGE_SIZE, paginate
+from helper_bot_team_1.features.tag_index import TagIndex
+from helper_bot_team_1.features.text_index import TextIndex
 
+TAG_INDEX = "tags"
+TEXT_INDEX = "text"
+NOTE_FIELDS = ("title", "text", "tags")
 NAME_REGEX = re.compile(r"[a-zA-Zа-яА-Я0-9,.'\w]{2,30}")
 
 
-class Field:
+class Field(Slotted):
+
+    __slots__ = ("_value",)
 
     def __init__(self, value) -> None:
         self._value = None
@@ -25,6 +34,8 @@ class Field:
 
 class Title(Field):
 
+    __slots__ = ()
+
     @Field.value.setter
     def value(self, title: str):
         if not re.match(NAME_REGEX, title):
@@ -38,7 +49,9 @@ class Title(Field):
         return self.value == obj
 
 
-class NoteRecord:
+class NoteRecord(Slotted):
+
+    __slots__ = ("name", "text", "created", "tags")
 
     def __init__(self, title: str, text: str, tags: List[str]) -> None:
         self.name = Title(title)
@@ -83,48 +96,92 @@ class Notebook(BotFeature):
     An app feature that helps users to manage their notes.
     """
 
-    def __init__(self, save_file: str):
+    COMMANDS = ("make", "change", "remove", "show", "search", "tags")
+
+    def __init__(self, save_file: str, storage: str = JOURNAL_STORAGE):
         self.save_file = save_file
-        self.data = RecordsContainer(save_file)
+        self.data = RecordsContainer(save_file, storage)
+        self.data.register_index(TAG_INDEX, TagIndex())
+        self.data.register_index(TEXT_INDEX, TextIndex())
 
         super().__init__({
             "make": self.make_note,
             "change": self.change_note,
             "remove": self.data.remove_record,
             "show": self.data.show_all,
-            "search": self.data.search_record
+            "search": self.search_notes,
+            "tags": self.find_by_tags
             })
 
     @staticmethod
     def name():
         return "notes"
 
-    def make_note(self) -> str:
+    def close(self) -> None:
+        self.data.close()
+
+    def make_note(self, *args: str) -> str:
         """
-        Creates a new note. Raises exception if note with a given title already exists.
+        Creates a new note. Raises exception if note with a given title already exists. Asks the user for the fields
+        unless they are given as arguments: title=Plans text=Buy milk tags=home,shop, or the same fields as JSON.
 
+        :param args: optional fields of the note
         :return: success message
         """
 
-        title = input('Enter the title: ').strip()
+        if args:
+            fields = parse_fields(args)
+            check_field_names(fields, NOTE_FIELDS)
+            check_field_types(fields, ("title", "text"), ("tags",))
+            title = fields.get("title", "").strip()
+            text = fields.get("text", "")
+            tags = as_list(fields.get("tags", []))
+        elif not self.interactive:
+            raise ValueError("Give the fields of the note as key=value pairs or JSON.")
+        else:
+            title = input('Enter the title: ').strip()
+            if self.data.record_exists(title):
+                raise ValueError(f"Note {title} already exists! Try another name.")
+            text = input('Enter the text: ')
+            tags = input('Enter the tags: ').strip().split()
 
         if self.data.record_exists(title):
-            raise f"Note {title} already exists! Try another name."
-
-        text = input('Enter the text: ')
-        tags = input('Enter the tags: ').strip().split()
+            raise ValueError(f"Note {title} already exists! Try another name.")
         note = NoteRecord(title, text, tags)
         self.data.add_record(note)
         return f"Note {title} was created successfully!"
 
     def change_note(self, *args: str) -> str:
         """
-        Changes existing notes. Raises exception if a note that the user wants to change does not exist.
+        Changes existing notes. Raises exception if a note that the user wants to change does not exist. Asks the user
+        what to change unless the title and the new fields are given as key=value pairs or JSON, for example:
+        title=Plans new_title=Weekend tags=home.
 
-        :param args: note title
+        :param args: note title, or its title and new fields
         :return: success message
         """
 
+        if has_fields(args):
+            fields = parse_fields(args)
+            check_field_names(fields, NOTE_FIELDS + ("new_title",))
+            check_field_types(fields, ("title", "text", "new_title"), ("tags",))
+            title = fields.get("title", "")
+            if not self.data.record_exists(title):
+                raise KeyError("Note with this title doesn't exist.")
+            note_to_change = self.data[title]
+            try:
+                if "text" in fields:
+                    note_to_change.change_text(fields["text"])
+                if "tags" in fields:
+                    note_to_change.change_tags(*as_list(fields["tags"]))
+                if fields.get("new_title"):
+                    self._rename_note(note_to_change, title, fields["new_title"])
+            finally:
+                self.data.update_record(note_to_change)
+            return "The note was changed successfully!"
+        if not self.interactive:
+            raise ValueError("Give the title and the new fields of the note as key=value pairs or JSON.")
+
         title = " ".join(args)
         if self.data.record_exists(title):
             note_to_change = self.data[title]
@@ -135,15 +192,15 @@ class Notebook(BotFeature):
                     continue
                 elif to_change.lower() == "title":
                     new_title = input("Enter a new title: ")
-                    note_to_change.change_title(new_title)
-                    self.data.add_record(note_to_change)
-                    self.data.remove_record(title)
+                    self._rename_note(note_to_change, title, new_title)
+                    title = new_title
                 elif to_change.lower() == "tags":
                     new_tags = input("Enter new tags: ")
-                    note_to_change.change_tags(new_tags)
+                    note_to_change.change_tags(*new_tags.split())
                 elif to_change.lower() == "text":
                     new_text = input("Enter new text here: ")
                     note_to_change.change_text(new_text)
+                self.data.update_record(note_to_change)
 
                 to_continue = input("Do you want to change something else in this note? Enter y or n: ")
                 if to_continue.lower() not in ["y", "n"]:
@@ -155,3 +212,60 @@ class Notebook(BotFeature):
                     return "The note was changed successfully!"
         else:
             raise KeyError("Note with this title doesn't exist.")
+
+    def _rename_note(self, note: NoteRecord, title: str, new_title: str) -> None:
+        """
+        Moves a note to a new title.
+
+        :param note: a note to rename
+        :param title: the current title
+        :param new_title: a new title
+        """
+
+        if new_title == title:
+            return
+        if self.data.record_exists(new_title):
+            raise ValueError(f"Note {new_title} already exists! Try another name.")
+        note.change_title(new_title)
+        self.data.add_record(note)
+        self.data.remove_record(title)
+
+    def search_notes(self, *args: str) -> Iterator[str]:
+        """
+        Finds the notes whose title, text or tags have the words of the query, the most relevant first. When no note
+        has the words, finds the notes that contain the query as a substring.
+
+        :param args: words to search for, optionally followed by "--page N" and "--page-size N"
+        :return: found notes as strings
+        """
+
+        options, words = parse_options(args, page=1, page_size=PAGE_SIZE)
+        if not words:
+            raise ValueError("Enter what to search.")
+
+        page = max(options["page"], 1)
+        found = self.data.get_index(TEXT_INDEX).search(" ".join(words), page * options["page_size"])
+        if not found:
+            return self.data.search_record(*args)
+        return paginate((str(self.data[title]) for _, title in found), page, options["page_size"])
+
+    def find_by_tags(self, *args: str) -> str:
+        """
+        Finds the notes by a query over their tags, for example "work AND NOT draft OR urgent". Without a query shows
+        how many notes have each tag.
+
+        :param args: tags and operators AND, OR, NOT
+        :return: titles of the found notes with their tags, or tags with numbers of notes
+        """
+
+        index = self.data.get_index(TAG_INDEX)
+        if not args:
+            counts = index.counts()
+            if not counts:
+                return "You don't have any tags yet."
+            return "\n".join(f"{tag}: {count}" for tag, count in counts)
+
+        titles = index.query(*args)
+        if not titles:
+            return "Sorry, couldn't find any notes with these tags."
+        return "\n".join(f"{title}: {', '.join(sorted(index.tags_of(title)))}" for title in titles)
@@ -0,0 +1,103 @@
+import re
+from typing import List
+
+from helper_bot_team_1.features.indexes import RecordsIndex
+
+COUNTRY_CODE = "38"
+PHONE_QUERY_REGEX = re.compile(r"\+?[\d\s()-]{3,}")
+NON_DIGIT_REGEX = re.compile(r"\D")
+
+NAMES = ""
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Brings a phone or the beginning of a phone to the canonical form: only digits with the country code, so that
+    +380XXXXXXXXX, 380XXXXXXXXX and 0XXXXXXXXX become the same number.
+
+    :param phone: a phone or its prefix
+    :return: the canonical digits
+    """
+    digits = NON_DIGIT_REGEX.sub("", phone)
+    if digits.startswith("0"):
+        digits = COUNTRY_CODE + digits
+    return digits
+
+
+def record_phones(record) -> List[str]:
+    """
+    :param record: a contact
+    :return: the normalized phones of the contact without repeats
+    """
+    return list(dict.fromkeys(normalize_phone(phone.value) for phone in record.phones))
+
+
+def is_phone_query(query: str) -> bool:
+    """
+    Checks if the query looks like a phone or the beginning of a phone.
+
+    :param query: a search query
+    :return: True if the query can be looked up in the phone index
+    """
+    return bool(PHONE_QUERY_REGEX.fullmatch(query)) and len(normalize_phone(query)) >= 3
+
+
+class PhoneTrie(RecordsIndex):
+    """
+    A prefix tree over the normalized phones of the contacts. Finding the owners of a phone or a prefix takes as many
+    steps as there are digits in the query, plus the number of the found phones.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.root = {}
+        self.phones = {}
+
+    def add(self, name: str, record) -> None:
+        self.remove(name)
+        phones = record_phones(record)
+        if not phones:
+            return
+        self.phones[name] = phones
+        for phone in phones:
+            node = self.root
+            for digit in phone:
+                node = node.setdefault(digit, {})
+            node.setdefault(NAMES, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        for phone in self.phones.pop(name, []):
+            path = [self.root]
+            for digit in phone:
+                path.append(path[-1][digit])
+            path[-1][NAMES].discard(name)
+            if not path[-1][NAMES]:
+                del path[-1][NAMES]
+            for depth in range(len(phone), 0, -1):
+                if path[depth]:
+                    break
+                del path[depth - 1][phone[depth - 1]]
+
+    def lookup(self, prefix: str) -> List[str]:
+        """
+        Finds the contacts that have a phone starting with the given digits.
+
+        :param prefix: a phone or its beginning in any of the supported formats
+        :return: sorted names of the contacts
+        """
+        node = self.root
+        for digit in normalize_phone(prefix):
+            node = node.get(digit)
+            if node is None:
+                return []
+
+        names = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key == NAMES:
+                    names |= child
+                else:
+                    stack.append(child)
+        return sorted(names)
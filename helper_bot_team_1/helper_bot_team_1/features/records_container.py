@@ -1,45 +1,79 @@
-import os.path
-import pickle
+import threading
 from collections import UserDict
+from itertools import islice
+from typing import Iterable, Iterator
+
+from helper_bot_team_1.features.autosave import Autosave
+from helper_bot_team_1.features.bot_feature import parse_options
+
+from helper_bot_team_1.features.indexes import RecordsIndex
+from helper_bot_team_1.features.journal import Journal
+from helper_bot_team_1.features.sqlite_storage import SqliteStorage
+
+SEARCH_INDEX = "search"
+
+JOURNAL_STORAGE = "journal"
+SQLITE_STORAGE = "sqlite"
+STORAGES = {
+    JOURNAL_STORAGE: Journal,
+    SQLITE_STORAGE: SqliteStorage
+}
+PAGE_SIZE = 20
 
 
 class RecordsContainer(UserDict):
     """
     A class that holds records.
+
+    Every change is saved by the storage right away, so saving costs as much as the change itself and a crash doesn't
+    lose the session. The "journal" storage keeps all the records in memory and appends the changes to a journal file,
+    the "sqlite" storage keeps them in a database and reads only the records that are used. In batch mode the storage
+    holds the changes back, and they are saved in the background by the autosave, so a crash loses only the last few
+    seconds of them and backup_data() has little left to do.
     """
 
-    def __init__(self, save_file):
+    def __init__(self, save_file, storage: str = JOURNAL_STORAGE):
         super().__init__()
-        self.data = RecordsContainer.load_data(save_file) or {}
-
-    @classmethod
-    def load_data(cls, filepath: str) -> None | dict:
+        if storage not in STORAGES:
+            raise ValueError(f"Unknown storage {storage}. Try one of: {', '.join(STORAGES)}.")
+        self.save_file = save_file
+        self.storage = STORAGES[storage](save_file)
+        self.data = self.storage.load()
+        self.indexes = {}
+        self._index_lock = threading.Lock()
+        # the autosave thread syncs the storage while the changes may still be coming
+        self._storage_lock = threading.RLock()
+        self.autosave = Autosave(self._sync)
+        self.register_index(SEARCH_INDEX, self.storage.search_index())
+
+    def backup_data(self, wait: bool = True) -> None:
         """
-        Loads records from a file.
+        Makes sure that all the changes are saved to the files.
 
-        :param filepath: a backup file
+        :param wait: whether to wait for the work the storage does in the background, not needed before the exit
         """
-        if not os.path.exists(filepath):
-            return None
 
-        with open(filepath, 'rb') as f:
-            try:
-                loaded_data = pickle.load(f)
-                return loaded_data
-            except EOFError:
-                pass
-        return None
+        with self._storage_lock:
+            self.storage.flush(wait)
+            self.autosave.saved()
 
-    @staticmethod
-    def backup_data(handler) -> None:
+    def close(self) -> None:
         """
-        Saves records to a file.
+        Stops the autosave. The changes that are left are saved by backup_data().
+        """
+        self.autosave.close()
+
+    def _sync(self) -> None:
+        with self._storage_lock:
+            self.storage.sync()
 
-        :param handler: whose dara to save
+    def begin_batch(self) -> None:
+        """
+        Lets the storage save the changes in bulk instead of one by one. Everything is saved for sure by backup_data().
         """
 
-        with open(handler.save_file, 'wb') as f:
-            pickle.dump(handler.data, f)
+        with self._storage_lock:
+            self.storage.begin_batch()
 
     def add_record(self, record) -> None:
         """
@@ -49,6 +83,36 @@ class RecordsContainer(UserDict):
         :return:
         """
         self.data[record.name] = record
+        with self._storage_lock:
+            self.storage.put(record)
+        self.autosave.changed()
+        self._index_record(record)
+
+    def add_records(self, records: list) -> None:
+        """
+        Adds several new records at once, saving them and updating the indexes once for the whole batch.
+
+        :param records: records to add
+        """
+        for record in records:
+            self.data[record.name] = record
+        with self._storage_lock:
+            self.storage.put_many(records)
+        self.autosave.changed(len(records))
+        for index in self.indexes.values():
+            if index.built:
+                index.add_many(records)
+
+    def update_record(self, record) -> None:
+        """
+        Saves the changes made to the fields of an existing record.
+
+        :param record: a changed record
+        """
+        with self._storage_lock:
+            self.storage.put(record)
+        self.autosave.changed()
+        self._index_record(record)
 
     def remove_record(self, *args: str) -> str:
         """
@@ -60,10 +124,48 @@ class RecordsContainer(UserDict):
         record_name = " ".join(args)
         if self.record_exists(record_name):
             del self.data[record_name]
+            with self._storage_lock:
+                self.storage.remove(record_name)
+            self.autosave.changed()
+            self._unindex_record(record_name)
             return f"{record_name} was deleted successfully!"
         else:
             raise KeyError(f"{record_name} was not found!")
 
+    def register_index(self, name: str, index: RecordsIndex) -> None:
+        """
+        Registers an index that is kept up to date with the records. The index is built on the first use.
+
+        :param name: a name to get the index by
+        :param index: an index to register, the storage may replace it with one that queries the stored records
+        """
+        self.indexes[name] = self.storage.storage_index(index)
+
+    def get_index(self, name: str) -> RecordsIndex:
+        """
+        Returns a registered index, building it first if it hasn't been used yet.
+
+        :param name: a name of the index
+        :return: an up-to-date index
+        """
+        index = self.indexes[name]
+        if not index.built:
+            # several readers may ask for the same index at once when the bot is run as a server
+            with self._index_lock:
+                if not index.built:
+                    index.build(self.data.values())
+        return index
+
+    def _index_record(self, record) -> None:
+        for index in self.indexes.values():
+            if index.built:
+                index.add(record.name.value, record)
+
+    def _unindex_record(self, record_name: str) -> None:
+        for index in self.indexes.values():
+            if index.built:
+                index.remove(record_name)
+
     def record_exists(self, record_name: str) -> bool:
         """
         Checks if record exists.
@@ -74,30 +176,53 @@ class RecordsContainer(UserDict):
 
         return record_name in self.data
 
-    def show_all(self) -> str:
+    def show_all(self, *args: str) -> Iterator[str]:
         """
-        Shows all existing records.
+        Shows all existing records. The records are rendered lazily, one at a time.
 
-        :return: all records as a string
+        :param args: optional "--page N" and "--page-size N" to show only one page of records
+        :return: records as strings
         """
 
+        options, _ = parse_options(args, page=0, page_size=PAGE_SIZE)
         if self.data:
-            result = ""
-            for record in self.data.values():
-                result += "\n" + str(record) + "\n"
-            return result
+            return paginate((str(record) for record in self.data.values()), options["page"], options["page_size"])
         else:
-            return "You don't have any data yet."
+            return iter(["You don't have any data yet."])
 
-    def search_record(self, needle: str) -> str:
+    def search_record(self, *args: str) -> Iterator[str]:
         """
         Searches and returns a record that contains a needle.
 
-        :param needle: what to search
-        :return: a result string
+        :param args: what to search, optionally followed by "--page N" and "--page-size N"
+        :return: found records as strings
         """
-        result = list(filter(lambda record: needle in str(record).lower(), self.data.values()))
-        if result:
-            return "\n".join(["\n" + str(r) for r in result])
+        options, needle = parse_options(args, page=0, page_size=PAGE_SIZE)
+        if not needle:
+            raise ValueError("Enter what to search.")
+
+        names = self.get_index(SEARCH_INDEX).search(" ".join(needle))
+        if names:
+            return paginate((str(self.data[name]) for name in names), options["page"], options["page_size"])
         else:
-            return "Sorry, couldn't find any records that match the query."
+            return iter(["Sorry, couldn't find any records that match the query."])
+
+
+def paginate(rendered: Iterable[str], page: int, page_size: int) -> Iterator[str]:
+    """
+    Yields the rendered records separated by empty lines. Yields only the records of one page if the page is given.
+
+    :param rendered: rendered records
+    :param page: number of a page starting from 1, or 0 to yield all the records
+    :param page_size: number of records on a page
+    :return: rendered records
+    """
+    if page:
+        rendered = islice(rendered, (page - 1) * page_size, page * page_size)
+
+    empty = True
+    for record in rendered:
+        empty = False
+        yield "\n" + record
+    if empty:
+        yield f"There are no records on page {page}."
@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def slot_names(cls: type) -> tuple[str, ...]:
+    """
+    Collects the names of all the slots of a class, including the slots of its base classes.
+
+    :param cls: a class with __slots__
+    :return: names of the slots, from the base classes down
+    """
+    return tuple(name for klass in reversed(cls.__mro__) for name in getattr(klass, "__slots__", ()))
+
+
+class Slotted:
+    """
+    A base for the classes that keep their attributes in __slots__ instead of a per-object __dict__.
+
+    Objects are pickled as a bare tuple of the slot values, and objects pickled before the classes got slots (as
+    a __dict__) are restored as well.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name, None) for name in slot_names(type(self)))
+
+    def __setstate__(self, state) -> None:
+        if isinstance(state, dict):
+            state = state.items()
+        else:
+            state = zip(slot_names(type(self)), state)
+        for name, value in state:
+            setattr(self, name, value)
@@ -0,0 +1,322 @@
+import datetime
+import gc
+import lzma
+import marshal
+import os
+import sys
+import zlib
+from contextlib import contextmanager
+from importlib import import_module
+from operator import attrgetter
+from typing import BinaryIO, Callable, Iterable, Iterator
+
+from helper_bot_team_1.features.slotted import Slotted, slot_names
+
+MAGIC = b"HBSNAP\x00"
+VERSION = 1
+
+NO_COMPRESSION = "none"
+ZLIB = "zlib"
+LZMA = "lzma"
+COMPRESSIONS = (NO_COMPRESSION, ZLIB, LZMA)
+DEFAULT_COMPRESSION = os.environ.get("HELPER_BOT_SNAPSHOT_COMPRESSION", ZLIB)
+# the fastest levels: the records shrink about five times already, higher levels cost many times more to save
+ZLIB_LEVEL = 1
+LZMA_PRESET = 1
+
+# a frame holds this many records, the strings repeated inside a frame are written once
+FRAME_RECORDS = 1024
+FRAME_HEADER_SIZE = 8
+TRAILER_SIZE = 8
+CHUNK_SIZE = 1024 * 1024
+INTERN_MAX_LENGTH = 32
+MARSHAL_VERSION = 4
+
+# class ids of the values that are not records or fields, the classes get the ids after them
+DATE_ID = 0
+# was meant for pickled values, which could make any object when loaded, so it is never written and is refused
+PICKLED_ID = 1
+FIRST_CLASS_ID = 2
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def is_snapshot(head: bytes) -> bool:
+    """
+    Checks if a file is written in the snapshot format, not pickled as a whole like the old save files.
+
+    :param head: the first bytes of the file
+    :return: True if the file starts with the snapshot header
+    """
+    return head.startswith(MAGIC)
+
+
+def compressor(compression: str):
+    if compression == ZLIB:
+        return zlib.compressobj(ZLIB_LEVEL)
+    if compression == LZMA:
+        return lzma.LZMACompressor(preset=LZMA_PRESET)
+    return None
+
+
+def decompressor(compression: str):
+    if compression == ZLIB:
+        return zlib.decompressobj()
+    if compression == LZMA:
+        return lzma.LZMADecompressor()
+    return None
+
+
+class SnapshotWriter:
+    """
+    Writes records to a snapshot. Records are turned into tuples of plain values: a field or a record becomes a tuple
+    of its class id and its slot values, a date becomes its ordinal, and the classes are described once by the
+    module, the name and the slots. Values of any other type can't be saved. Every FRAME_RECORDS records are
+    marshalled, compressed and written as a frame prefixed with its length and checksum, so neither writing nor reading
+    keeps the whole file in memory.
+
+    File layout: MAGIC, version byte, compression byte, then the compressed stream of frames, an empty frame and the
+    number of the records as a trailer.
+    """
+
+    def __init__(self, file: BinaryIO, compression: str = DEFAULT_COMPRESSION):
+        if compression not in COMPRESSIONS:
+            raise SnapshotError(f"Unknown compression {compression}. Try one of: {', '.join(COMPRESSIONS)}.")
+        self.file = file
+        self.count = 0
+        self._compressor = compressor(compression)
+        self._classes = {}
+        self._new_classes = []
+        self._frame = []
+        file.write(MAGIC + bytes((VERSION, COMPRESSIONS.index(compression))))
+
+    def write(self, record) -> None:
+        self._frame.append(self._flatten(record))
+        self.count += 1
+        if len(self._frame) >= FRAME_RECORDS:
+            self._write_frame()
+
+    def close(self) -> None:
+        """
+        Writes the records that are left and the trailer.
+        """
+        if self._frame:
+            self._write_frame()
+        self._write(frame_header(b"") + self.count.to_bytes(TRAILER_SIZE, "big"))
+        if self._compressor is not None:
+            self.file.write(self._compressor.flush())
+
+    def _write_frame(self) -> None:
+        payload = marshal.dumps((self._new_classes, self._frame), MARSHAL_VERSION)
+        self._write(frame_header(payload) + payload)
+        self._new_classes = []
+        self._frame = []
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data if self._compressor is None else self._compressor.compress(data))
+
+    def _flatten(self, value):
+        value_type = type(value)
+        if value_type is str:
+            return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+        if value is None or value_type in (int, float, bool):
+            return value
+        if value_type is list:
+            return [self._flatten(item) for item in value]
+        if value_type is datetime.date:
+            return DATE_ID, value.toordinal()
+        if isinstance(value, Slotted):
+            class_id, names, get_slots = self._describe(value_type)
+            try:
+                slots = get_slots(value)
+            except AttributeError:
+                slots = tuple(getattr(value, name, None) for name in names)
+            return class_id, *[self._flatten(slot) for slot in slots]
+        raise SnapshotError(f"A value of type {value_type.__qualname__} can't be saved in a snapshot.")
+
+    def _describe(self, cls: type) -> tuple[int, tuple[str, ...], Callable]:
+        description = self._classes.get(cls)
+        if description is None:
+            class_id = FIRST_CLASS_ID + len(self._classes)
+            names = slot_names(cls)
+            description = self._classes[cls] = class_id, names, slots_getter(names)
+            self._new_classes.append((class_id, cls.__module__, cls.__qualname__, names))
+        return description
+
+
+def slots_getter(names: tuple[str, ...]) -> Callable:
+    """
+    Makes a function that gets the values of the slots of an object as a tuple.
+
+    :param names: names of the slots
+    :return: the function, it raises AttributeError if a slot isn't set
+    """
+    if len(names) > 1:
+        return attrgetter(*names)
+    # attrgetter returns a bare value instead of a tuple for a single name
+    return lambda obj: tuple(getattr(obj, name) for name in names)
+
+
+def frame_header(payload: bytes) -> bytes:
+    return len(payload).to_bytes(4, "big") + zlib.crc32(payload).to_bytes(4, "big")
+
+
+def write_records(file: BinaryIO, records: Iterable, compression: str = DEFAULT_COMPRESSION) -> None:
+    """
+    Writes the records to a snapshot.
+
+    :param file: a file opened for binary writing
+    :param records: records to write
+    :param compression: "zlib", "lzma" or "none"
+    """
+    writer = SnapshotWriter(file, compression)
+    for record in records:
+        writer.write(record)
+    writer.close()
+
+
+def resolve_class(module: str, qualname: str) -> type:
+    """
+    Finds the class of the saved objects. Only the records and the fields can be loaded, so a snapshot can't make the
+    bot create objects of any other class.
+
+    :param module: module of the class
+    :param qualname: name of the class in the module
+    :return: the class
+    """
+    try:
+        cls = import_module(module)
+        for name in qualname.split("."):
+            cls = getattr(cls, name)
+    except (ImportError, AttributeError) as err:
+        raise SnapshotError(f"The snapshot has objects of an unknown class {module}.{qualname}.") from err
+    if not isinstance(cls, type) or not issubclass(cls, Slotted):
+        raise SnapshotError(f"The snapshot has objects of a class that can't be loaded: {module}.{qualname}.")
+    return cls
+
+
+class SnapshotReader:
+    """
+    Reads the records from a snapshot frame by frame. The slots are matched by their names, so the snapshots stay
+    readable when the classes get new slots (they are set to None) or lose some (their values are skipped).
+    """
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        head = file.read(len(MAGIC) + 2)
+        if not is_snapshot(head) or len(head) < len(MAGIC) + 2:
+            raise SnapshotError("The file is not a snapshot.")
+        version, compression = head[len(MAGIC)], head[len(MAGIC) + 1]
+        if version > VERSION:
+            raise SnapshotError(f"The snapshot is written by a newer version of the bot (format {version}).")
+        if compression >= len(COMPRESSIONS):
+            raise SnapshotError(f"The snapshot is compressed in an unknown way ({compression}).")
+        self._decompressor = decompressor(COMPRESSIONS[compression])
+        self._builders = {}
+        self._buffer = bytearray()
+        self._eof = False
+
+    def __iter__(self) -> Iterator:
+        count = 0
+        while True:
+            header = self._read(FRAME_HEADER_SIZE)
+            size = int.from_bytes(header[:4], "big")
+            payload = self._read(size)
+            if zlib.crc32(payload) != int.from_bytes(header[4:], "big"):
+                raise SnapshotError("The snapshot is damaged: a checksum doesn't match.")
+            if not size:
+                break
+            try:
+                classes, records = marshal.loads(payload)
+            except (ValueError, EOFError, TypeError) as err:
+                raise SnapshotError(f"The snapshot is damaged: {err}") from err
+            for class_id, module, qualname, names in classes:
+                if class_id < FIRST_CLASS_ID:
+                    raise SnapshotError(f"The snapshot is damaged: a class has a reserved id {class_id}.")
+                self._builders[class_id] = self._make_builder(resolve_class(module, qualname), names)
+            for record in records:
+                yield self._build(record)
+            count += len(records)
+        if int.from_bytes(self._read(TRAILER_SIZE), "big") != count:
+            raise SnapshotError("The snapshot is damaged: the number of the records doesn't match.")
+
+    def _read(self, size: int) -> bytes:
+        while len(self._buffer) < size and not self._eof:
+            chunk = self.file.read(CHUNK_SIZE)
+            if not chunk:
+                self._eof = True
+                if self._decompressor is not None and hasattr(self._decompressor, "flush"):
+                    self._buffer += self._decompressor.flush()
+                break
+            try:
+                self._buffer += chunk if self._decompressor is None else self._decompressor.decompress(chunk)
+            except (zlib.error, lzma.LZMAError) as err:
+                raise SnapshotError(f"The snapshot is damaged: {err}") from err
+        if len(self._buffer) < size:
+            raise SnapshotError("The snapshot is cut off.")
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def _build(self, value):
+        value_type = type(value)
+        if value_type is tuple:
+            class_id = value[0]
+            if class_id == DATE_ID:
+                return datetime.date.fromordinal(value[1])
+            if class_id == PICKLED_ID:
+                raise SnapshotError("The snapshot has a pickled value, it can't be loaded safely.")
+            builder = self._builders.get(class_id)
+            if builder is None:
+                raise SnapshotError(f"The snapshot is damaged: unknown class id {class_id}.")
+            return builder(value)
+        if value_type is list:
+            return [self._build(item) for item in value]
+        return value
+
+    def _make_builder(self, cls: type, names: tuple[str, ...]) -> Callable:
+        current = slot_names(cls)
+        # the saved slots the class still has, by their positions in the saved tuple
+        setters = [(position, getattr(cls, name).__set__)
+                   for position, name in enumerate(names, start=1) if name in current]
+        missing = [getattr(cls, name).__set__ for name in current if name not in names]
+        build = self._build
+        new = cls.__new__
+
+        def builder(value: tuple):
+            obj = new(cls)
+            for position, setter in setters:
+                item = value[position]
+                setter(obj, build(item) if type(item) in (tuple, list) else item)
+            for setter in missing:
+                setter(obj, None)
+            return obj
+
+        return builder
+
+
+def read_records(file: BinaryIO) -> Iterator:
+    """
+    Reads the records from a snapshot one by one.
+
+    :param file: a file opened for binary reading
+    :return: the records in the order they were written
+    """
+    return iter(SnapshotReader(file))
+
+
+@contextmanager
+def gc_paused():
+    """
+    Stops the cyclic garbage collector while many objects are created at once. Every batch of new objects makes it
+    walk all the objects created before, which makes loading a big snapshot several times slower.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -1,29 +1,23 @@
+import json
 import re
 import os
 import shutil
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
+from typing import Callable, NamedTuple
 
-CYRILLIC_SYMBOLS = (
-    "а", "б", "в", "г", "д", "е", "ё", "ж", "з", "и", "й", "к", "л", "м", "н", "о", "п", "р", "с", "т", "у",
-    "ф", "х", "ц", "ч", "ш", "щ", "ъ", "ы", "ь", "э", "ю", "я", "є", "і", "ї", "ґ")
-LATIN_ALTERNATIVE = (
-    "a", "b", "v", "g", "d", "e", "e", "j", "z", "i", "j", "k", "l", "m", "n", "o", "p", "r", "s", "t", "u",
-    "f", "h", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "ya", "je", "i", "ji", "g")
-
-TRANSLITERATION = {}
-
-for cyrillic, latin in zip(CYRILLIC_SYMBOLS, LATIN_ALTERNATIVE):
-    """
-    Populates the transliteration mapping with "cyrillic": "latin" pairs for uppercase and lowercase letters.
-    """
-    TRANSLITERATION[ord(cyrillic)] = latin
-    TRANSLITERATION[ord(cyrillic.upper())] = latin.capitalize()
+from helper_bot_team_1.features.archives import ArchiveExtractor, ARCHIVE_SUFFIXES, archive_stem, file_suffix, \
+    unpack_archive_file
+from helper_bot_team_1.features.file_dedupe import FileDeduplicator, link_duplicates, duplicates_report, LINK, SKIP
+from helper_bot_team_1.features.transliteration import TRANSLITERATION
 
 IMAGES = (".jpeg", ".png", ".jpg", ".svg", ".bmp", ".heic")
 VIDEOS = (".avi", ".mp4", ".mov", ".mkv")
 DOCS = (".doc", ".docx", ".txt", ".pdf", ".xls", ".pptx", ".xlsx")
 AUDIO = (".mp3", ".ogg", ".wav", ".amr")
-ARCHIVES = (".zip", ".gz", ".tar", ".tar.gz")
+ARCHIVES = ARCHIVE_SUFFIXES
 
 IMAGE_DIR = "images"
 AUDIO_DIR = "audio"
@@ -31,6 +25,26 @@ VIDEO_DIR = "video"
 DOCUMENTS_DIR = "documents"
 ARCHIVES_DIR = "archives"
 
+CATEGORIES = (
+    (IMAGES, IMAGE_DIR),
+    (VIDEOS, VIDEO_DIR),
+    (DOCS, DOCUMENTS_DIR),
+    (AUDIO, AUDIO_DIR),
+    (ARCHIVES, ARCHIVES_DIR)
+)
+IGNORED_FOLDERS = [IMAGE_DIR, VIDEO_DIR, DOCUMENTS_DIR, AUDIO_DIR, ARCHIVES_DIR]
+
+FILES_PER_TASK = 64
+
+MANIFEST_NAME = ".sort_manifest.json"
+MANIFEST_VERSION = 1
+# mtimes on FAT and some network shares are only precise to 2 seconds
+RACY_WINDOW_NS = 2_000_000_000
+
+RENAME = "rename"
+COPY = "copy"
+MAX_SHOWN_MOVES = 50
+
 
 def normalized_name(filename: str) -> str:
     """
@@ -39,12 +53,42 @@ def normalized_name(filename: str) -> str:
 
     :return: normalized filename with extension
     """
-    path = Path(filename)
-    new_name = path.stem
+    name = Path(filename).name
+    stem_length = len(name) - len(file_suffix(name))
+    new_name = name[:stem_length]
     new_name = new_name.translate(TRANSLITERATION)
 
     new_name = re.sub(r"\W", "_", new_name)
-    return new_name + path.suffix
+    return new_name + name[stem_length:]
+
+
+def category_dir(filename: str) -> None | str:
+    """
+    Finds the folder that a file belongs to according to its extension.
+
+    :param filename: name or path of the file
+    :return: name of the category folder or None if the file is left where it is
+    """
+    extension = file_suffix(filename)
+    for extensions, folder_name in CATEGORIES:
+        if extension in extensions:
+            return folder_name
+    return None
+
+
+def organize_file(f: str, path: str, folder_name: str, extractor: None | ArchiveExtractor = None) -> None:
+    """
+    Moves the file to the category folder, unpacking it if it is an archive.
+
+    :param f: path to the file
+    :param path: path to the directory where the file is
+    :param folder_name: name of a category folder
+    :param extractor: pool to unpack the archives in, they are unpacked right away if None
+    """
+    if folder_name == ARCHIVES_DIR:
+        organize_archive(f, path, extractor)
+    else:
+        organize(f, path, folder_name)
 
 
 def organize(f: str, path: str, folder_name: str) -> None:
@@ -63,25 +107,25 @@ def organize(f: str, path: str, folder_name: str) -> None:
         shutil.move(f, os.path.join(new_path, os.path.basename(f)))
 
 
-def organize_archive(f: str, path: str) -> None:
+def organize_archive(f: str, path: str, extractor: None | ArchiveExtractor = None) -> None:
     """
-    Moves the archive to the "archives" directory, unpacks it into the folder and deletes the original archive.
+    Moves the archive to the "archives" directory, unpacks it into the folder named after it and deletes the original
+    archive. An archive that can't be unpacked is kept.
 
     :param f: path to the archive
     :param path: path to the directory where the file is
+    :param extractor: pool to unpack the archive in, it is unpacked right away if None
     """
     new_path = os.path.join(path, ARCHIVES_DIR)
-    if os.path.exists(new_path):
-        new_addr = os.path.join(new_path, os.path.basename(f))
-        shutil.move(f, new_addr)
-        shutil.unpack_archive(new_addr, os.path.join(new_addr, os.path.splitext(new_addr)[0]))
-        os.remove(new_addr)
+    if not os.path.exists(new_path):
+        os.mkdir(new_path)
+    new_addr = os.path.join(new_path, os.path.basename(f))
+    shutil.move(f, new_addr)
+    target = os.path.join(new_path, archive_stem(new_addr))
+    if extractor is None:
+        unpack_archive_file(new_addr, target)
     else:
-        os.mkdir(os.path.join(path, ARCHIVES_DIR))
-        new_addr = os.path.join(new_path, os.path.basename(f))
-        shutil.move(f, new_addr)
-        shutil.unpack_archive(new_addr, os.path.join(new_addr, os.path.splitext(new_addr)[0]))
-        os.remove(new_addr)
+        extractor.submit(new_addr, target)
 
 
 def is_empty_dir(directory):
@@ -94,38 +138,501 @@ def is_empty_dir(directory):
     return len(os.listdir(directory)) == 0
 
 
-def sort_folder(path) -> None:
+def sort_folder(path, jobs: int = 1, full: bool = False, dedupe: None | str = None,
+                nested: bool = False) -> None | str:
     """
     Iterates recursively over folders in the given path and organizes the files found in the folders according to their
-    extensions.
+    extensions. Only what changed since the last sort is looked at, unless a full sort is asked for. Archives are
+    unpacked in a pool of processes while the sort goes on.
 
     :param path: path to the root directory
+    :param jobs: number of threads to sort with. If it is 1, the sort is planned first and then done in the current
+    thread
+    :param full: whether to ignore the manifest of the last sort and look at every file
+    :param dedupe: what to do with identical files before sorting: "skip", "link" or "report", nothing if None
+    :param nested: whether to unpack the archives found inside the archives
+    :return: report of the found duplicates and of the archives that couldn't be unpacked, if there is any
     """
-    ignored_folders = [IMAGE_DIR, VIDEO_DIR, DOCUMENTS_DIR, AUDIO_DIR, ARCHIVES_DIR]
-    for filename in os.listdir(path):
-        f = os.path.join(path, filename)
-        if os.path.isdir(f):
-            if filename in ignored_folders:
-                continue
-            if is_empty_dir(f):
-                os.rmdir(f)
-            else:
-                sort_folder(f)
-                if is_empty_dir(f):
-                    os.rmdir(f)
+    manifest = SortManifest(path) if full else SortManifest.load(path)
+    reports = [dedupe_files(path, manifest, dedupe) if dedupe else None]
+    with ArchiveExtractor(recursive=nested) as extractor:
+        if jobs > 1:
+            ParallelSorter(jobs, manifest, extractor).sort(path)
+        else:
+            SortPlan.create(path, manifest).execute(manifest, extractor)
+    manifest.save()
+    reports.append(extractor.report())
+    return "\n".join(report for report in reports if report) or None
+
+
+def plan_folder(path: str, full: bool = False) -> "SortPlan":
+    """
+    Plans the sort of the folder without changing anything, for a dry run.
+
+    :param path: path to the root directory
+    :param full: whether to ignore the manifest of the last sort and look at every file
+    :return: the plan
+    """
+    manifest = SortManifest(path) if full else SortManifest.load(path)
+    return SortPlan.create(path, manifest)
+
+
+def finish_directory(path: str, manifest: "SortManifest", is_root: bool) -> None:
+    """
+    Removes the sorted directory if nothing is left in it, or records it in the manifest otherwise.
+
+    :param path: path to the directory whose whole subtree is sorted
+    :param manifest: manifest of the sorted folder
+    :param is_root: whether the directory is the sorted folder itself, which is never removed
+    """
+    if not is_root and is_empty_dir(path):
+        os.rmdir(path)
+    else:
+        manifest.done(path)
+
+
+def dedupe_files(path: str, manifest: "SortManifest", mode: str) -> str:
+    """
+    Finds identical files among the files that are going to be organized. The first of each group is sorted as
+    usual, the rest are left unsorted ("skip"), replaced with hard links to the first one ("link") or only reported.
+
+    :param path: path to the root directory
+    :param manifest: manifest of the sorted folder
+    :param mode: what to do with the duplicates
+    :return: report of the found duplicates
+    """
+    files = []
+    directories = [path]
+    while directories:
+        directory_files, subdirectories = manifest.scan(directories.pop())
+        files.extend(f for f in directory_files if category_dir(f))
+        directories.extend(subdirectories)
+
+    deduplicator = FileDeduplicator()
+    groups = deduplicator.find(files)
+    if mode == LINK:
+        link_duplicates(groups)
+    elif mode == SKIP:
+        manifest.skipped.update(duplicate for group in groups for duplicate in group[1:])
+    return duplicates_report(groups, path, deduplicator, mode)
+
+
+def scan_directory(path: str, is_unchanged: Callable[[os.DirEntry], bool] = None) -> tuple[list[str], list[str]]:
+    """
+    Lists the directory and normalizes the names of its files. Parallel sorters rename the files of a directory in one
+    thread with this function, because two files can get the same normalized name.
+
+    :param path: path to the directory
+    :param is_unchanged: tells which files were already sorted and haven't changed since, they are skipped
+    :return: files to organize and subdirectories to sort
+    """
+    files = {}
+    subdirectories = []
+    with os.scandir(path) as entries:
+        entries = list(entries)
+    for entry in entries:
+        if entry.is_dir():
+            if entry.name not in IGNORED_FOLDERS:
+                subdirectories.append(entry.path)
+        elif entry.name.startswith(MANIFEST_NAME) or (is_unchanged is not None and is_unchanged(entry)):
+            continue
         else:
-            new_path = os.path.join(path, normalized_name(f))
+            new_path = os.path.join(path, normalized_name(entry.path))
             if not os.path.exists(new_path):
-                os.rename(f, new_path)
-            extension = Path(new_path).suffix.lower()
-
-            if extension in IMAGES:
-                organize(new_path, path, IMAGE_DIR)
-            elif extension in VIDEOS:
-                organize(new_path, path, VIDEO_DIR)
-            elif extension in DOCS:
-                organize(new_path, path, DOCUMENTS_DIR)
-            elif extension in AUDIO:
-                organize(new_path, path, AUDIO_DIR)
-            elif extension in ARCHIVES:
-                organize_archive(new_path, path)
+                os.rename(entry.path, new_path)
+            files[new_path] = None
+    return list(files), subdirectories
+
+
+class SortManifest:
+    """
+    Remembers what the sorted folder looked like after the last sort, so that the next sort only looks at what
+    changed. The manifest is kept in the sorted folder.
+
+    A directory with the recorded mtime had no entries added, removed or renamed, so its files are skipped and only
+    its subdirectories are visited. In a changed directory, the files that were left where they are (they have no
+    category) are skipped if their size and mtime are the recorded ones. A directory changed less than RACY_WINDOW_NS
+    before the manifest was saved is looked at again, because a coarse mtime can't tell such changes apart. The sorted
+    folder itself is always looked at, as saving the manifest into it changes its mtime.
+    """
+
+    def __init__(self, root: str, directories: dict = None, saved_at: int = 0):
+        self.root = root
+        self.previous = directories or {}
+        self.saved_at = saved_at
+        self.directories = {}
+        self.skipped = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root: str) -> "SortManifest":
+        """
+        Reads the manifest of the sorted folder. A missing or unreadable manifest is the same as an empty one, so
+        everything is sorted.
+
+        :param root: path to the sorted folder
+        :return: the manifest
+        """
+        manifest_path = os.path.join(root, MANIFEST_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                data = json.load(f)
+            # the time of the filesystem, not of this computer, the folder may be a network share
+            saved_at = os.stat(manifest_path).st_mtime_ns
+        except (OSError, ValueError):
+            return cls(root)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(root)
+        return cls(root, data.get("directories", {}), saved_at)
+
+    def save(self, complete: bool = True) -> None:
+        """
+        Writes the manifest into the sorted folder.
+
+        :param complete: whether the sort visited the whole folder, the entries of the directories that were not
+        visited are kept otherwise. Nothing is written if nothing changed.
+        """
+        directories = self.directories if complete else {**self.previous, **self.directories}
+        if directories == self.previous:
+            return
+        manifest_path = os.path.join(self.root, MANIFEST_NAME)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            # dumps is encoded in C, dump is not
+            f.write(json.dumps({"version": MANIFEST_VERSION, "directories": directories}, separators=(",", ":")))
+        os.replace(tmp_path, manifest_path)
+
+    def scan(self, path: str) -> tuple[list[str], list[str]]:
+        """
+        Finds what has to be sorted in the directory.
+
+        :param path: path to the directory
+        :return: files to organize and subdirectories to sort
+        """
+        subdirectories = self.unchanged_subdirectories(path)
+        if subdirectories is not None:
+            return [], subdirectories
+        return scan_directory(path, self.file_filter(path))
+
+    def unchanged_subdirectories(self, path: str) -> None | list[str]:
+        """
+        Checks if the directory is the same as after the last sort.
+
+        :param path: path to the directory
+        :return: its subdirectories to visit if it is the same, None if it has to be looked at
+        """
+        key = os.path.relpath(path, self.root)
+        entry = self.previous.get(key)
+        if entry is None or not self._is_unchanged(path, entry):
+            return None
+        with self._lock:
+            self.directories[key] = entry
+        subdirectories = (os.path.join(path, name) for name in entry["subdirectories"])
+        return [subdirectory for subdirectory in subdirectories if os.path.isdir(subdirectory)]
+
+    def file_filter(self, path: str) -> Callable[[os.DirEntry], bool]:
+        """
+        Creates a check for the files of a changed directory that were left where they are by the last sort and
+        haven't changed since, or that are skipped as duplicates.
+
+        :param path: path to the directory
+        :return: a function that tells if a file can be skipped
+        """
+        entry = self.previous.get(os.path.relpath(path, self.root))
+        known_files = entry["files"] if entry is not None else {}
+
+        def is_unchanged(file_entry: os.DirEntry) -> bool:
+            if file_entry.path in self.skipped:
+                return True
+            known = known_files.get(file_entry.name)
+            if known is None or known[2] is not None:
+                return False
+            stat = file_entry.stat()
+            return known[0] == stat.st_size and known[1] == stat.st_mtime_ns
+
+        return is_unchanged
+
+    def done(self, path: str) -> None:
+        """
+        Records the directory once its whole subtree is sorted.
+
+        :param path: path to the directory
+        """
+        key = os.path.relpath(path, self.root)
+        with self._lock:
+            if key in self.directories:
+                return
+        files = {}
+        subdirectories = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.name not in IGNORED_FOLDERS:
+                        subdirectories.append(entry.name)
+                elif not entry.name.startswith(MANIFEST_NAME):
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_size, stat.st_mtime_ns, category_dir(entry.name)]
+        record = {"mtime": os.stat(path).st_mtime_ns, "subdirectories": subdirectories, "files": files}
+        with self._lock:
+            self.directories[key] = record
+
+    def _is_unchanged(self, path: str, entry: dict) -> bool:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return False
+        return mtime == entry["mtime"] and mtime + RACY_WINDOW_NS < self.saved_at
+
+
+class Move(NamedTuple):
+    source: str
+    destination: str
+    category: None | str
+    method: str
+    size: int
+
+
+class SortPlan:
+    """
+    Everything a sort is going to do, worked out in one walk over the folder before anything is changed. The plan can
+    be shown as a dry run or executed.
+
+    The plan keeps the rules of the sort: files get normalized names, a file whose normalized name is taken is left as
+    it is, files with a known extension go to their category folders and the directories left empty are removed.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.moves = []
+        self.directories_to_create = {}
+        self.directories_to_remove = []
+        self.directories_to_record = []
+
+    @classmethod
+    def create(cls, path: str, manifest: SortManifest) -> "SortPlan":
+        """
+        Plans the sort of the folder. Nothing is changed on the disk.
+
+        :param path: path to the root directory
+        :param manifest: manifest of the sorted folder
+        :return: the plan
+        """
+        plan = cls(path)
+        plan._plan_directory(path, manifest, is_root=True)
+        return plan
+
+    def execute(self, manifest: SortManifest, extractor: None | ArchiveExtractor = None) -> None:
+        """
+        Does what is planned. All the category folders are created first, then the files are moved, so no folder is
+        checked or created more than once.
+
+        :param manifest: manifest of the sorted folder, the sorted directories are recorded in it
+        :param extractor: pool to unpack the archives in, they are unpacked right away if None
+        """
+        for directory in self.directories_to_create:
+            os.makedirs(directory, exist_ok=True)
+        for move in self.moves:
+            if move.method == RENAME:
+                os.replace(move.source, move.destination)
+            else:
+                shutil.move(move.source, move.destination)
+            if move.category == ARCHIVES_DIR:
+                target = os.path.join(os.path.dirname(move.destination), archive_stem(move.destination))
+                if extractor is None:
+                    unpack_archive_file(move.destination, target)
+                else:
+                    extractor.submit(move.destination, target)
+        for directory in self.directories_to_remove:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                # something was put into the directory after it was planned
+                manifest.done(directory)
+        for directory in self.directories_to_record:
+            manifest.done(directory)
+
+    def describe(self) -> str:
+        """
+        Describes the plan for a dry run.
+
+        :return: what the sort would do
+        """
+        moved = [move for move in self.moves if move.category is not None]
+        copies = [move for move in self.moves if move.method == COPY]
+        archives = sum(1 for move in moved if move.category == ARCHIVES_DIR)
+        new_directories = sum(1 for directory in self.directories_to_create if not os.path.isdir(directory))
+        report = [f"The sort would move {len(moved)} files into category folders and rename "
+                  f"{len(self.moves) - len(moved)} more, unpack {archives} archives, create {new_directories} "
+                  f"folders and remove {len(self.directories_to_remove)} empty folders. {len(copies)} files "
+                  f"({sum(move.size for move in copies) / 1024 ** 2:.1f} MB) would be copied to another device, "
+                  f"the rest are renamed in place."]
+        for move in self.moves[:MAX_SHOWN_MOVES]:
+            report.append(f"{os.path.relpath(move.source, self.root)} -> "
+                          f"{os.path.relpath(move.destination, self.root)}")
+        if len(self.moves) > MAX_SHOWN_MOVES:
+            report.append(f"... and {len(self.moves) - MAX_SHOWN_MOVES} more.")
+        return "\n".join(report)
+
+    def _plan_directory(self, path: str, manifest: SortManifest, is_root: bool) -> bool:
+        """
+        Plans the sort of the directory and its subdirectories.
+
+        :return: True if the directory is going to be removed
+        """
+        subdirectories = manifest.unchanged_subdirectories(path)
+        if subdirectories is not None:
+            for subdirectory in subdirectories:
+                self._plan_directory(subdirectory, manifest, is_root=False)
+            # a directory that is the same as after the last sort isn't empty, it would have been removed then
+            self.directories_to_record.append(path)
+            return False
+
+        is_unchanged = manifest.file_filter(path)
+        with os.scandir(path) as entries:
+            entries = list(entries)
+        names = {entry.name for entry in entries}
+        devices = {}
+        left = 0
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir():
+                if entry.name in IGNORED_FOLDERS:
+                    left += 1
+                else:
+                    subdirectories.append(entry.path)
+                continue
+            if entry.name.startswith(MANIFEST_NAME) or is_unchanged(entry):
+                left += 1
+                continue
+
+            name = normalized_name(entry.name)
+            if name != entry.name:
+                if name in names:
+                    left += 1
+                    continue
+                names.discard(entry.name)
+                names.add(name)
+            category = category_dir(name)
+            if category is None:
+                left += 1
+                if name == entry.name:
+                    continue
+                target_directory = path
+            else:
+                target_directory = os.path.join(path, category)
+                if target_directory not in self.directories_to_create:
+                    self.directories_to_create[target_directory] = None
+                    left += 1
+
+            if target_directory not in devices:
+                # a category folder can be a mount point, other folders are where the file is
+                device_path = target_directory if os.path.isdir(target_directory) else path
+                devices[target_directory] = os.stat(device_path).st_dev
+            stat = entry.stat(follow_symlinks=False)
+            method = RENAME if stat.st_dev == devices[target_directory] else COPY
+            self.moves.append(Move(entry.path, os.path.join(target_directory, name), category, method, stat.st_size))
+
+        for subdirectory in subdirectories:
+            if not self._plan_directory(subdirectory, manifest, is_root=False):
+                left += 1
+        if not is_root and left == 0:
+            self.directories_to_remove.append(path)
+            return True
+        self.directories_to_record.append(path)
+        return False
+
+
+class CategoryDirs:
+    """
+    Creates the category folders for sorters that organize files from several threads. Each folder is created once,
+    and the creation is serialized per parent directory.
+    """
+
+    def __init__(self):
+        self._created = set()
+        self._locks = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def ensure(self, path: str, folder_name: str) -> None:
+        """
+        Makes sure that the category folder exists.
+
+        :param path: path to the parent directory
+        :param folder_name: name of the category folder
+        """
+        new_path = os.path.join(path, folder_name)
+        if new_path in self._created:
+            return
+        with self._locks_guard:
+            lock = self._locks[path]
+        with lock:
+            if new_path not in self._created:
+                if not os.path.exists(new_path):
+                    os.mkdir(new_path)
+                self._created.add(new_path)
+
+
+class ParallelSorter:
+    """
+    Sorts a folder with a bounded pool of threads.
+
+    Sibling subtrees and batches of files from the same directory are sorted at the same time. Only the creation of
+    the category folders in each parent directory is serialized.
+    """
+
+    def __init__(self, jobs: int, manifest: SortManifest, extractor: None | ArchiveExtractor = None):
+        self.jobs = jobs
+        self.manifest = manifest
+        self.extractor = extractor
+        self.category_dirs = CategoryDirs()
+
+    def sort(self, path: str) -> None:
+        """
+        Sorts the folder and waits until all the files are organized.
+
+        :param path: path to the root directory
+        """
+        pending = {path: 1}
+        parents = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = {executor.submit(self.manifest.scan, path): path}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory = futures.pop(future)
+                    scanned = future.result()
+                    if scanned is not None:
+                        files, subdirectories = scanned
+                        for i in range(0, len(files), FILES_PER_TASK):
+                            batch = files[i:i + FILES_PER_TASK]
+                            futures[executor.submit(self._organize_files, batch, directory)] = directory
+                            pending[directory] += 1
+                        for subdirectory in subdirectories:
+                            futures[executor.submit(self.manifest.scan, subdirectory)] = subdirectory
+                            parents[subdirectory] = directory
+                            pending[subdirectory] = 1
+                            pending[directory] += 1
+                    self._task_done(directory, pending, parents)
+
+    def _task_done(self, directory: str, pending: dict, parents: dict) -> None:
+        """
+        Marks a task of the directory as finished. Once its whole subtree is sorted, removes the directory if nothing
+        is left in it.
+        """
+        pending[directory] -= 1
+        while pending[directory] == 0:
+            del pending[directory]
+            parent = parents.pop(directory, None)
+            finish_directory(directory, self.manifest, is_root=parent is None)
+            if parent is None:
+                return
+            directory = parent
+            pending[directory] -= 1
+
+    def _organize_files(self, files: list[str], path: str) -> None:
+        for f in files:
+            folder_name = category_dir(f)
+            if folder_name:
+                self.category_dirs.ensure(path, folder_name)
+                organize_file(f, path, folder_name, self.extractor)
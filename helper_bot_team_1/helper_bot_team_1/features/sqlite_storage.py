@@ -0,0 +1,448 @@
+import os.path
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from helper_bot_team_1.features.birthday_index import BirthdayIndex, birthday_key
+from helper_bot_team_1.features.indexes import RecordsIndex
+from helper_bot_team_1.features.journal import Journal
+from helper_bot_team_1.features.phone_index import PhoneTrie, normalize_phone, record_phones
+from helper_bot_team_1.features.tag_index import TagIndex, note_tags
+
+DB_SUFFIX = ".db"
+CACHE_SIZE = 4096
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    data BLOB NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS record_keys (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS record_keys_by_key ON record_keys (kind, key);
+CREATE INDEX IF NOT EXISTS record_keys_by_name ON record_keys (name);
+CREATE TABLE IF NOT EXISTS key_kinds (
+    kind TEXT PRIMARY KEY
+);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    text, content='records', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS records_ai AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS records_ad AFTER DELETE ON records BEGIN
+    INSERT INTO records_fts(records_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS records_au AFTER UPDATE ON records BEGIN
+    INSERT INTO records_fts(records_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO records_fts(rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+UPSERT = """
+INSERT INTO records (name, data, text) VALUES (?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET data = excluded.data, text = excluded.text
+"""
+
+FTS_MIN_LENGTH = 3
+
+
+def record_key(name) -> str:
+    """
+    Turns a name of a record into the key it is stored by.
+
+    :param name: a name field or a string
+    :return: the name as a string
+    """
+    return name.value if hasattr(name, "value") else name
+
+
+class SqliteRecords(MutableMapping):
+    """
+    A mapping of the records stored in an SQLite database. Records are unpickled only when they are accessed, and the
+    recently used ones are kept in a small cache.
+
+    The mapping itself doesn't write to the database, SqliteStorage does that when the container saves a change.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, cache_size: int = CACHE_SIZE):
+        self.connection = connection
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        # the cache is reordered by the readers, which may run in several threads when the bot is run as a server
+        self._cache_lock = threading.Lock()
+
+    def __getitem__(self, name):
+        name = record_key(name)
+        with self._cache_lock:
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                return self._cache[name]
+
+        row = self.connection.execute("SELECT data FROM records WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        record = pickle.loads(row[0])
+        self._remember(name, record)
+        return record
+
+    def __setitem__(self, name, record) -> None:
+        self._remember(record_key(name), record)
+
+    def __delitem__(self, name) -> None:
+        with self._cache_lock:
+            self._cache.pop(record_key(name), None)
+
+    def __contains__(self, name) -> bool:
+        name = record_key(name)
+        with self._cache_lock:
+            if name in self._cache:
+                return True
+        return self.connection.execute("SELECT 1 FROM records WHERE name = ?", (name,)).fetchone() is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for (name,) in self.connection.execute("SELECT name FROM records ORDER BY id"):
+            yield name
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT count(*) FROM records").fetchone()[0]
+
+    def values(self) -> Iterator:
+        """
+        Streams all the records with one query, without filling the cache.
+
+        :return: records in the order they were added
+        """
+        for name, data in self.connection.execute("SELECT name, data FROM records ORDER BY id"):
+            with self._cache_lock:
+                cached = self._cache.get(name)
+            yield cached if cached is not None else pickle.loads(data)
+
+    def _remember(self, name: str, record) -> None:
+        with self._cache_lock:
+            self._cache[name] = record
+            self._cache.move_to_end(name)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+class SqliteSearchIndex(RecordsIndex):
+    """
+    Searches the records with SQL. The database keeps the text of the records itself, so there is nothing to build or
+    update in memory.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, full_text: bool):
+        super().__init__()
+        self.connection = connection
+        self.full_text = full_text
+        self.built = True
+
+    def add(self, name: str, record) -> None:
+        pass
+
+    def remove(self, name: str) -> None:
+        pass
+
+    def search(self, needle: str) -> List[str]:
+        """
+        Finds the records whose rendered text contains the needle. Long enough needles are first looked up in the
+        trigram full-text index, the exact substring check then runs only on its candidates.
+
+        :param needle: a substring to search for
+        :return: names of the matching records in the order they were added
+        """
+        if self.full_text and len(needle) >= FTS_MIN_LENGTH:
+            rows = self.connection.execute(
+                "SELECT name FROM records WHERE id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?) "
+                "AND instr(text, ?) > 0 ORDER BY id",
+                ('"' + needle.replace('"', '""') + '"', needle))
+        else:
+            rows = self.connection.execute(
+                "SELECT name FROM records WHERE instr(text, ?) > 0 ORDER BY id", (needle,))
+        return [name for (name,) in rows]
+
+
+class SqliteKeysIndex(RecordsIndex):
+    """
+    A base for the indexes that look the records up by the keys SqliteStorage keeps in the database next to the
+    records, so that the records don't have to be read into memory to build them. The subclasses tell what the keys
+    of a record are and answer the queries of the in-memory index they replace with SQL.
+    """
+
+    kind = ""
+
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__()
+        self.connection = connection
+        self.built = True
+
+    @staticmethod
+    def keys(record) -> Iterable[str]:
+        """
+        :param record: a record to index
+        :return: the keys the record is found by
+        """
+        raise NotImplementedError
+
+    def add(self, name: str, record) -> None:
+        pass
+
+    def add_many(self, records: Iterable) -> None:
+        pass
+
+    def remove(self, name: str) -> None:
+        pass
+
+    def _names(self, condition: str, *parameters, order: str = "name") -> List[str]:
+        rows = self.connection.execute(
+            f"SELECT name FROM record_keys WHERE kind = ? AND {condition} ORDER BY {order}", (self.kind, *parameters))
+        return [name for (name,) in rows]
+
+
+def day_key(day: Tuple[int, int]) -> str:
+    return f"{day[0]:02}-{day[1]:02}"
+
+
+class SqliteBirthdayIndex(SqliteKeysIndex, BirthdayIndex):
+    """
+    Finds the birthdays with range queries over the "MM-DD" keys of the contacts.
+    """
+
+    kind = "birthdays"
+
+    @staticmethod
+    def keys(record) -> List[str]:
+        day = birthday_key(record)
+        return [] if day is None else [day_key(day)]
+
+    def _between(self, start: Tuple[int, int], stop: Tuple[int, int]) -> List[str]:
+        return self._names("key >= ? AND key < ?", day_key(start), day_key(stop), order="key, name")
+
+
+class SqlitePhoneIndex(SqliteKeysIndex, PhoneTrie):
+    """
+    Finds the contacts by a phone or its beginning with a range query over the normalized phones.
+    """
+
+    kind = "phones"
+
+    @staticmethod
+    def keys(record) -> List[str]:
+        return record_phones(record)
+
+    def lookup(self, prefix: str) -> List[str]:
+        digits = normalize_phone(prefix)
+        # ":" follows "9", so the range holds all the phones that start with the digits
+        return list(dict.fromkeys(self._names("key >= ? AND key < ?", digits, digits + ":")))
+
+
+class SqliteTagIndex(SqliteKeysIndex, TagIndex):
+    """
+    Answers the tag queries with SQL over the lowercase tags of the notes.
+    """
+
+    kind = "tags"
+
+    @staticmethod
+    def keys(record) -> List[str]:
+        return sorted(note_tags(record))
+
+    def tags_of(self, name: str) -> frozenset[str]:
+        rows = self.connection.execute("SELECT key FROM record_keys WHERE kind = ? AND name = ?", (self.kind, name))
+        return frozenset(tag for (tag,) in rows)
+
+    def counts(self) -> List[Tuple[str, int]]:
+        return self.connection.execute(
+            "SELECT key, count(*) FROM record_keys WHERE kind = ? GROUP BY key ORDER BY count(*) DESC, key",
+            (self.kind,)).fetchall()
+
+    def _titles(self, tag: str) -> set[str]:
+        return set(self._names("key = ?", tag))
+
+    def _all_titles(self) -> set[str]:
+        return {name for (name,) in self.connection.execute("SELECT name FROM records")}
+
+
+# the in-memory indexes that are replaced with the ones that query the database
+KEYS_INDEXES = {
+    BirthdayIndex: SqliteBirthdayIndex,
+    PhoneTrie: SqlitePhoneIndex,
+    TagIndex: SqliteTagIndex
+}
+
+
+class SqliteStorage:
+    """
+    Stores the records in an SQLite database next to the save file, one row per record. Every change is committed in
+    its own transaction, or in batch mode all the changes are committed together by flush(). A database created next
+    to an existing save file is filled with the records from it.
+
+    The birthday, phone and tag indexes are replaced with the keys of the records kept in the same transactions as the
+    records. The keys of an index are written for all the records the first time the index is used with a database.
+    """
+
+    def __init__(self, save_file: str):
+        self.save_file = save_file
+        self.db_file = os.path.splitext(save_file)[0] + DB_SUFFIX
+        is_new = not os.path.exists(self.db_file)
+
+        self.batch = False
+        # the functions that give the keys of a record, by the kinds of the indexes used in this session
+        self.key_functions = {}
+        self._other_kinds_dropped = False
+        # the storage may be opened by a background thread and then used by the main one
+        self.connection = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # FTS5 or its trigram tokenizer isn't compiled into this SQLite
+            self.full_text = False
+
+        if is_new:
+            self.put_many(Journal(save_file).load().values())
+
+    def load(self) -> SqliteRecords:
+        """
+        Opens the records without reading them.
+
+        :return: a lazy mapping of the records
+        """
+        return SqliteRecords(self.connection)
+
+    def search_index(self) -> SqliteSearchIndex:
+        """
+        :return: an index that searches the records in the database
+        """
+        return SqliteSearchIndex(self.connection, self.full_text)
+
+    def storage_index(self, index: RecordsIndex) -> RecordsIndex:
+        """
+        Replaces an index that would have to read every record into memory with one that queries the database.
+
+        :param index: an index registered with the container
+        :return: the index to use instead, or the same index if it has no replacement
+        """
+        keys_index_class = KEYS_INDEXES.get(type(index))
+        if keys_index_class is None:
+            return index
+        keys_index = keys_index_class(self.connection)
+        self.key_functions[keys_index.kind] = keys_index.keys
+        self._fill_keys(keys_index.kind, keys_index.keys)
+        return keys_index
+
+    def begin_batch(self) -> None:
+        """
+        Stops committing after every change, everything is committed at once by flush().
+        """
+        self.batch = True
+
+    def put(self, record) -> None:
+        """
+        Saves a new or changed record.
+
+        :param record: a record with its current fields
+        """
+        self._write(self._put_rows, [record])
+
+    def put_many(self, records: Iterable) -> None:
+        """
+        Saves several new or changed records in one transaction.
+
+        :param records: records with their current fields
+        """
+        self._write(self._put_rows, list(records))
+
+    def remove(self, record_name: str) -> None:
+        """
+        Deletes a record.
+
+        :param record_name: a name of the removed record
+        """
+        self._write(self._delete_rows, str(record_name))
+
+    def sync(self) -> None:
+        """
+        Commits the changes held back in batch mode. A transaction is committed as a whole or not at all.
+        """
+        self.connection.commit()
+
+    def flush(self, wait: bool = True) -> None:
+        """
+        Commits everything that is not committed yet.
+
+        :param wait: not used, the database has no work in the background
+        """
+        self.connection.commit()
+
+    def _write(self, write: Callable, argument) -> None:
+        self._drop_other_kinds()
+        if self.batch:
+            write(argument)
+        else:
+            with self.connection:
+                write(argument)
+
+    def _put_rows(self, records: list) -> None:
+        self.connection.executemany(UPSERT, (self._row(record) for record in records))
+        if self.key_functions:
+            self.connection.executemany("DELETE FROM record_keys WHERE name = ?",
+                                        ((record.name.value,) for record in records))
+            self.connection.executemany("INSERT INTO record_keys (kind, key, name) VALUES (?, ?, ?)",
+                                        self._key_rows(records, self.key_functions))
+
+    def _delete_rows(self, record_name: str) -> None:
+        self.connection.execute("DELETE FROM records WHERE name = ?", (record_name,))
+        self.connection.execute("DELETE FROM record_keys WHERE name = ?", (record_name,))
+
+    @staticmethod
+    def _key_rows(records: Iterable, key_functions: dict[str, Callable]) -> Iterator[Tuple[str, str, str]]:
+        for record in records:
+            for kind, keys in key_functions.items():
+                for key in keys(record):
+                    yield kind, key, record.name.value
+
+    def _fill_keys(self, kind: str, keys: Callable) -> None:
+        """
+        Writes the keys of an index for all the records, unless the database has them already.
+        """
+        if self.connection.execute("SELECT 1 FROM key_kinds WHERE kind = ?", (kind,)).fetchone():
+            return
+        with self.connection:
+            self.connection.execute("DELETE FROM record_keys WHERE kind = ?", (kind,))
+            # the records are unpickled one by one and dropped right away
+            records = (pickle.loads(data) for (data,) in self.connection.execute("SELECT data FROM records"))
+            self.connection.executemany("INSERT INTO record_keys (kind, key, name) VALUES (?, ?, ?)",
+                                        self._key_rows(records, {kind: keys}))
+            self.connection.execute("INSERT INTO key_kinds (kind) VALUES (?)", (kind,))
+
+    def _drop_other_kinds(self) -> None:
+        """
+        Forgets the keys of the indexes not used in this session before the first change, as they aren't kept up
+        to date. They are written again when their index is used.
+        """
+        if self._other_kinds_dropped:
+            return
+        self._other_kinds_dropped = True
+        kinds = list(self.key_functions)
+        marks = ", ".join("?" * len(kinds))
+        with self.connection:
+            self.connection.execute(f"DELETE FROM record_keys WHERE kind NOT IN ({marks})", kinds)
+            self.connection.execute(f"DELETE FROM key_kinds WHERE kind NOT IN ({marks})", kinds)
+
+    @staticmethod
+    def _row(record) -> tuple[str, bytes, str]:
+        return record.name.value, pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL), str(record).lower()
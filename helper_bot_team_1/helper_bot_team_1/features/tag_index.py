@@ -0,0 +1,125 @@
+from collections import defaultdict
+from typing import List, Tuple
+
+from helper_bot_team_1.features.indexes import RecordsIndex
+
+AND = "and"
+OR = "or"
+NOT = "not"
+
+
+class TagIndex(RecordsIndex):
+    """
+    An index from the tags of the notes to the titles of the notes. Tags are compared case-insensitively.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.titles = defaultdict(set)
+        self.note_tags = {}
+
+    def add(self, name: str, record) -> None:
+        self.remove(name)
+        tags = note_tags(record)
+        self.note_tags[name] = tags
+        for tag in tags:
+            self.titles[tag].add(name)
+
+    def remove(self, name: str) -> None:
+        tags = self.note_tags.pop(name, None)
+        if tags is None:
+            return
+        for tag in tags:
+            titles = self.titles[tag]
+            titles.discard(name)
+            if not titles:
+                del self.titles[tag]
+
+    def tags_of(self, name: str) -> frozenset[str]:
+        """
+        :param name: a title of a note
+        :return: the lowercase tags of the note
+        """
+        return self.note_tags.get(name, frozenset())
+
+    def counts(self) -> List[Tuple[str, int]]:
+        """
+        Counts the notes with every tag.
+
+        :return: pairs of a tag and a number of notes, the most used tags first
+        """
+        return sorted(((tag, len(titles)) for tag, titles in self.titles.items()), key=lambda pair: (-pair[1], pair[0]))
+
+    def query(self, *words: str) -> List[str]:
+        """
+        Finds the notes that match a boolean query over the tags, for example "work AND NOT draft OR urgent". AND binds
+        tighter than OR, and tags that follow each other without an operator are joined with AND.
+
+        :param words: tags and operators AND, OR, NOT
+        :return: sorted titles of the matching notes
+        """
+        result = set()
+        for group in split_query(words, OR):
+            if not group:
+                raise ValueError("OR must stand between two tags.")
+            result |= self._match_all(group)
+        return sorted(result)
+
+    def _match_all(self, words: List[str]) -> set[str]:
+        included = []
+        excluded = set()
+        negate = False
+        for word in words:
+            if word.lower() == AND:
+                continue
+            if word.lower() == NOT:
+                negate = not negate
+                continue
+            titles = self._titles(word.lower())
+            if negate:
+                excluded |= titles
+                negate = False
+            else:
+                included.append(titles)
+        if negate:
+            raise ValueError("NOT must be followed by a tag.")
+
+        if included:
+            included.sort(key=len)
+            matching = set(included[0])
+            for titles in included[1:]:
+                matching &= titles
+        else:
+            matching = self._all_titles()
+        return matching - excluded
+
+    def _titles(self, tag: str) -> set[str]:
+        return self.titles.get(tag, set())
+
+    def _all_titles(self) -> set[str]:
+        return set(self.note_tags)
+
+
+def note_tags(record) -> frozenset[str]:
+    """
+    :param record: a note
+    :return: the tags of the note in lowercase, without repeats
+    """
+    return frozenset(tag.lower() for tag in record.tags)
+
+
+def split_query(words: Tuple[str, ...], operator: str) -> List[List[str]]:
+    """
+    Splits the words of a query by an operator.
+
+    :param words: words of a query
+    :param operator: an operator to split by
+    :return: groups of words between the operators
+    """
+    groups = [[]]
+    for word in words:
+        if word.lower() == operator:
+            groups.append([])
+        else:
+            groups[-1].append(word)
+    return groups
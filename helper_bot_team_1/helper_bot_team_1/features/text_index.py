@@ -0,0 +1,97 @@
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+from helper_bot_team_1.features.indexes import RecordsIndex
+from helper_bot_team_1.features.transliteration import TRANSLITERATION
+
+TOKEN_REGEX = re.compile(r"\w+")
+
+# BM25 parameters: how fast the score of a term saturates and how much long notes are penalized
+K1 = 1.2
+B = 0.75
+
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+TEXT_WEIGHT = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits the text into words. Case is ignored and Cyrillic letters are transliterated, so "Київ" and "kijiv" are
+    the same word.
+
+    :param text: a text to split
+    :return: folded words in the order of the text
+    """
+    return TOKEN_REGEX.findall(text.lower().translate(TRANSLITERATION))
+
+
+class TextIndex(RecordsIndex):
+    """
+    A BM25 index over the titles, texts and tags of the notes. Words of the title and the tags count more than the
+    words of the text.
+
+    The postings are updated note by note, so making or changing a note costs as much as the note itself. A query
+    scores only the notes that have its words and takes the best ones from a heap instead of sorting all of them.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.postings = defaultdict(dict)
+        self.terms = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def add(self, name: str, record) -> None:
+        self.remove(name)
+        terms = Counter()
+        for field, weight in ((record.name.value, TITLE_WEIGHT), (" ".join(record.tags), TAG_WEIGHT),
+                              (record.text, TEXT_WEIGHT)):
+            for token in tokenize(field):
+                terms[token] += weight
+        self.terms[name] = terms
+        length = sum(terms.values())
+        self.lengths[name] = length
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings[term][name] = frequency
+
+    def remove(self, name: str) -> None:
+        terms = self.terms.pop(name, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(name)
+        for term in terms:
+            posting = self.postings[term]
+            del posting[name]
+            if not posting:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, str]]:
+        """
+        Finds the notes that are the most relevant to the query.
+
+        :param query: words to search for
+        :param limit: the most notes to return
+        :return: pairs of a score and a title, the best first
+        """
+        count = len(self.terms)
+        if not count:
+            return []
+        average_length = self.total_length / count
+
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for name, frequency in posting.items():
+                norm = K1 * (1 - B + B * self.lengths[name] / average_length)
+                scores[name] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, name) for name, score in best]
@@ -0,0 +1,15 @@
+CYRILLIC_SYMBOLS = (
+    "а", "б", "в", "г", "д", "е", "ё", "ж", "з", "и", "й", "к", "л", "м", "н", "о", "п", "р", "с", "т", "у",
+    "ф", "х", "ц", "ч", "ш", "щ", "ъ", "ы", "ь", "э", "ю", "я", "є", "і", "ї", "ґ")
+LATIN_ALTERNATIVE = (
+    "a", "b", "v", "g", "d", "e", "e", "j", "z", "i", "j", "k", "l", "m", "n", "o", "p", "r", "s", "t", "u",
+    "f", "h", "ts", "ch", "sh", "sch", "", "y", "", "e", "yu", "ya", "je", "i", "ji", "g")
+
+TRANSLITERATION = {}
+
+for cyrillic, latin in zip(CYRILLIC_SYMBOLS, LATIN_ALTERNATIVE):
+    """
+    Populates the transliteration mapping with "cyrillic": "latin" pairs for uppercase and lowercase letters.
+    """
+    TRANSLITERATION[ord(cyrillic)] = latin
+    TRANSLITERATION[ord(cyrillic.upper())] = latin.capitalize()
@@ -1,8 +1,14 @@
-from typing import Tuple
+import argparse
+import os
+import sys
+from typing import Tuple, Iterable
 from prompt_toolkit import prompt
 from prompt_toolkit.completion import WordCompleter
 
 from helper_bot_team_1.bot import AssistantBot
+from helper_bot_team_1.server import BotClient, run_server, default_address
+
+STOP_WORDS = ["goodbye", "close", "exit"]
 
 
 class App:
@@ -14,29 +20,73 @@ class App:
     into a file and restores them from the file when run again.
     """
 
-    def run(self):
+    def run(self, bot: None | AssistantBot | BotClient = None):
         """
         Waits for the user input in an infinite loop. Terminates when one of the stop words is given.
 
+        :param bot: the bot to run the commands with, a new one by default, or a client of a bot server
         :return: result of running the command by the bot
         """
-        bot = AssistantBot()
+        bot = bot or AssistantBot()
+        if os.environ.get("HELPER_BOT_PRELOAD", "1") != "0":
+            bot.preload()
         command_completer = WordCompleter(bot.autocomplete())
 
         try:
             while True:
                 feature, args = self.parse_command(prompt("What do you want to do? ", completer=command_completer))
-                if feature in ["goodbye", "close", "exit"]:
-                    bot.backup_data()
+                if feature in STOP_WORDS:
+                    bot.close()
+                    bot.backup_data(wait=False)
                     print("Goodbye!")
                     break
                 else:
-                    result = bot.handle(feature, args)
-                    if result:
-                        print(result)
+                    self.print_result(bot.handle(feature, args))
         except Exception as err:
             print(err)
 
+    def run_script(self, lines: Iterable[str], bot: None | AssistantBot | BotClient = None) -> None:
+        """
+        Runs the commands one per line without asking the user anything. Empty lines and lines starting with # are
+        skipped. The data is saved once, after the last command or one of the stop words.
+
+        :param lines: commands to run
+        :param bot: the bot to run the commands with, a new one by default, or a client of a bot server
+        """
+        bot = bot or AssistantBot()
+        bot.start_batch()
+
+        try:
+            for line_number, line in enumerate(lines, start=1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                feature, args = self.parse_command(line)
+                if feature in STOP_WORDS:
+                    break
+                try:
+                    self.print_result(bot.handle(feature, args))
+                except Exception as err:
+                    print(f"Line {line_number}: {err}", file=sys.stderr)
+        finally:
+            bot.close()
+            bot.backup_data(wait=False)
+
+    @staticmethod
+    def print_result(result: None | str | Iterable[str]) -> None:
+        """
+        Prints the result of a command. Results that come in parts are printed as soon as each part is ready.
+
+        :param result: result of running the command by the bot
+        """
+        if not result:
+            return
+        if isinstance(result, str):
+            print(result)
+        else:
+            for part in result:
+                print(part)
+
     @staticmethod
     def parse_command(user_input: str) -> Tuple[str, list[str]]:
         """
@@ -54,7 +104,33 @@ class App:
 
 
 def run_app():
-    App().run()
+    parser = argparse.ArgumentParser(prog="helper_bot", description="Personal assistant bot. Runs interactively "
+                                     "unless commands are given in a script or piped to the standard input.")
+    parser.add_argument("--script", help="a file with commands to run without prompts, one command per line")
+    parser.add_argument("--serve", nargs="?", const=default_address(), metavar="ADDRESS",
+                        help="keep the data loaded and run the commands of the clients that connect to the Unix "
+                             f"socket or host:port (default {default_address()})")
+    parser.add_argument("--connect", nargs="?", const=default_address(), metavar="ADDRESS",
+                        help="run the commands with a bot started with --serve at the address")
+    arguments = parser.parse_args()
+
+    if arguments.serve:
+        run_server(arguments.serve)
+        return
+
+    bot = None
+    if arguments.connect:
+        try:
+            bot = BotClient(arguments.connect)
+        except OSError as err:
+            sys.exit(f"Couldn't connect to the bot at {arguments.connect}: {err}")
+    if arguments.script:
+        with open(arguments.script, encoding="utf-8") as f:
+            App().run_script(f, bot)
+    elif not sys.stdin.isatty():
+        App().run_script(sys.stdin, bot)
+    else:
+        App().run(bot)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Iterable
+
+from helper_bot_team_1.bot import AssistantBot
+
+DEFAULT_SOCKET = "helper_bot.sock"
+DEFAULT_TCP_ADDRESS = "127.0.0.1:8765"
+READ_WORKERS = 4
+# commands that only read the data of their feature, any other command is a write
+READ_COMMANDS = {
+    "contacts": ("show", "birthdays", "search", "dedupe"),
+    "notes": ("show", "search", "tags"),
+    "files": ("status",),
+}
+
+
+def default_address() -> str:
+    return DEFAULT_SOCKET if hasattr(socket, "AF_UNIX") else DEFAULT_TCP_ADDRESS
+
+
+def parse_address(address: str) -> None | tuple[str, int]:
+    """
+    Tells a TCP address from a path to a Unix socket.
+
+    :param address: "host:port" or a path
+    :return: host and port, or None for a path
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and os.sep not in address:
+        return host or "127.0.0.1", int(port)
+    return None
+
+
+def render(result: None | str | Iterable[str]) -> list[str]:
+    """
+    Turns the result of a command into the lines to send to a client. Results that come in parts are read to the
+    end, so that they are made while the command still holds its lock.
+
+    :param result: result of a command
+    :return: parts of the result
+    """
+    if not result:
+        return []
+    if isinstance(result, str):
+        return [result]
+    return [str(part) for part in result]
+
+
+class ReadWriteLock:
+    """
+    Lets many readers or one writer in at a time. A waiting writer keeps new readers out, so a stream of reads can't
+    keep a write waiting forever.
+    """
+
+    def __init__(self):
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reading(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and not self._waiting_writers)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def writing(self):
+        async with self._condition:
+            self._waiting_writers += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writer and not self._readers)
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class BotServer:
+    """
+    Hosts one assistant bot for many clients, so they share the data loaded once and don't overwrite each other's
+    changes.
+
+    Every client sends commands as JSON lines and gets a JSON line back for each. Commands run in threads: the commands
+    that only read are run together by a pool of readers, and the commands that change the data of a feature are run
+    one at a time by the single writer of that feature, while no one reads it. The bot never asks anything, so the
+    commands have to be given with all their fields, e.g. contacts add name=John phones=0671234567.
+    """
+
+    def __init__(self, address: str, bot: None | AssistantBot = None):
+        self.address = address
+        self.bot = bot or AssistantBot()
+        self.bot.stop_prompts()
+        self.readers = ThreadPoolExecutor(max_workers=READ_WORKERS, thread_name_prefix="reader")
+        names = [feature.name() for feature in self.bot.features]
+        self.writers = {name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-writer") for name in names}
+        self.locks = {name: ReadWriteLock() for name in names}
+        self._server = None
+
+    async def start(self) -> None:
+        tcp_address = parse_address(self.address)
+        if tcp_address is not None:
+            self._server = await asyncio.start_server(self.serve_client, *tcp_address)
+            return
+        if os.path.exists(self.address):
+            if is_listening(self.address):
+                raise ValueError(f"Another server is already running at {self.address}.")
+            # left by a server that didn't stop cleanly
+            os.remove(self.address)
+        self._server = await asyncio.start_unix_server(self.serve_client, self.address)
+
+    async def serve_forever(self) -> None:
+        """
+        Serves the clients until cancelled, then saves the data.
+        """
+        await self.start()
+        print(f"Serving at {self.address}. Press Ctrl-C to stop.")
+        self.bot.preload()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """
+        Waits for the running commands, then stops the work of the features and saves the data.
+        """
+        self.readers.shutdown(wait=True)
+        for writer in self.writers.values():
+            writer.shutdown(wait=True)
+        self.bot.close()
+        self.bot.backup_data(wait=False)
+        if parse_address(self.address) is None and os.path.exists(self.address):
+            os.remove(self.address)
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, line: bytes) -> dict[str, Any]:
+        """
+        Runs the command of one request.
+
+        :param line: the request, a JSON object with the feature and the arguments of the command
+        :return: the response, a JSON object with the output of the command or an error
+        """
+        try:
+            request = json.loads(line)
+            feature, args = request["feature"], request["args"]
+            if not isinstance(feature, str) or not isinstance(args, list) or \
+                    not all(isinstance(arg, str) for arg in args):
+                raise TypeError("the feature must be a string and the arguments a list of strings")
+        except (ValueError, KeyError, TypeError) as err:
+            return {"error": f"Bad request: {err}"}
+
+        try:
+            return {"output": await self.run(feature, args)}
+        except Exception as err:
+            return {"error": str(err)}
+
+    async def run(self, feature: str, args: list[str]) -> list[str]:
+        loop = asyncio.get_running_loop()
+        lock = self.locks.get(feature)
+        if lock is None:
+            # commands of the bot itself and unknown features don't touch the data
+            return await loop.run_in_executor(self.readers, self._execute, feature, args)
+
+        if args and args[0] in READ_COMMANDS.get(feature, ()):
+            async with lock.reading():
+                return await loop.run_in_executor(self.readers, self._execute, feature, args)
+        async with lock.writing():
+            return await loop.run_in_executor(self.writers[feature], self._execute, feature, args)
+
+    def _execute(self, feature: str, args: list[str]) -> list[str]:
+        return render(self.bot.handle(feature, args))
+
+
+def is_listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def run_server(address: str) -> None:
+    """
+    Runs the server until it is interrupted with Ctrl-C.
+
+    :param address: path to a Unix socket, or host:port to listen on TCP
+    """
+    server = BotServer(address)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except (ValueError, OSError) as err:
+        print(err)
+        return
+    print("Goodbye!")
+
+
+class BotClient:
+    """
+    Sends commands to a bot server and waits for their results. Has the methods of the assistant bot that the app
+    uses, so the app runs the same way with a bot of its own or with a server.
+    """
+
+    def __init__(self, address: str):
+        tcp_address = parse_address(address)
+        if tcp_address is not None:
+            self.socket = socket.create_connection(tcp_address)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(address)
+        self.file = self.socket.makefile("rwb")
+
+    def handle(self, feature: str, args: list[str]) -> list[str]:
+        """
+        Runs a command on the server.
+
+        :param feature: the feature, or a command of the bot like "help"
+        :param args: the command of the feature and its arguments
+        :return: parts of the result, or the error if the server couldn't run the command
+        """
+        self.file.write(json.dumps({"feature": feature, "args": args}).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection.")
+        response = json.loads(line)
+        if "error" in response:
+            return [f"Error: {response['error']}"]
+        return response["output"]
+
+    @staticmethod
+    def autocomplete() -> list[str]:
+        return AssistantBot().autocomplete()
+
+    def start_batch(self) -> None:
+        """
+        Does nothing: the server saves every change right away.
+        """
+        pass
+
+    def preload(self) -> None:
+        """
+        Does nothing: the server keeps the data loaded.
+        """
+        pass
+
+    def backup_data(self, wait: bool = True) -> None:
+        """
+        Does nothing: the server saves the data.
+        """
+        pass
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
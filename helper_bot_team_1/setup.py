@@ -5,6 +5,6 @@ setup(name="helper-bot-team-1",
       description="Personal assistant bot that manages contacts, notes and can organize user's folders.",
       url="https://github.com/PavelDushinskiy/GoIT-Core-Project",
       author="Yanina Lubenska, Eugene Vyshnytsky, Pavel Dushinskiy",
-      packages=find_namespace_packages(),
+      packages=find_namespace_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
       entry_points={'console_scripts': ['helper_bot=helper_bot_team_1.main:run_app']}
       )
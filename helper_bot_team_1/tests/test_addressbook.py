@@ -0,0 +1,29 @@
+import pytest
+
+from helper_bot_team_1.features.addressbook import AddressBook, PHONE_INDEX
+
+
+def answers(monkeypatch, *replies: str) -> None:
+    replies = iter(replies)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(replies))
+
+
+def test_interactive_change_to_invalid_phone_keeps_indexes_and_journal(tmp_path, monkeypatch):
+    save_file = str(tmp_path / "address_book.bin")
+    book = AddressBook(save_file)
+    book.handle_command("add", "name=John", "phones=0671234567")
+    assert book.data.get_index(PHONE_INDEX).lookup("0671234567") == ["John"]
+
+    answers(monkeypatch, "phone", "not a phone")
+    with pytest.raises(ValueError):
+        book.handle_command("change", "John")
+
+    # the phones were cleared before the new one failed, the indexes and the saved data must agree with that
+    assert book.data["John"].phones == []
+    assert book.data.get_index(PHONE_INDEX).lookup("0671234567") == []
+    book.close()
+    book.data.backup_data()
+
+    reloaded = AddressBook(save_file)
+    assert reloaded.data["John"].phones == []
+    reloaded.close()
@@ -0,0 +1,59 @@
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from helper_bot_team_1.features.archives import ArchiveExtractor, ArchiveError, unpack_archive_file, file_suffix, \
+    archive_stem
+
+SIZE = 40_000
+
+
+def make_zip(path, members: dict[str, bytes]) -> str:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    return str(path)
+
+
+def unpacked_bytes(folder) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(folder) for name in names if not name.endswith(".zip"))
+
+
+@pytest.mark.parametrize("name, suffix, stem", [("a.tar.gz", ".tar.gz", "a"), ("B.ZIP", ".zip", "B"),
+                                                ("x.gz", ".gz", "x"), (".tar.gz", ".gz", ".tar")])
+def test_multipart_suffixes(name, suffix, stem):
+    assert file_suffix(name) == suffix
+    assert archive_stem(name) == stem
+
+
+def test_archive_over_the_limit_is_kept_and_its_output_removed(tmp_path):
+    archive = make_zip(tmp_path / "bomb.zip", {"big.txt": b"0" * SIZE})
+    with pytest.raises(ArchiveError):
+        unpack_archive_file(archive, str(tmp_path / "bomb"), max_bytes=SIZE - 1)
+    assert os.path.exists(archive)
+    assert not os.path.exists(tmp_path / "bomb")
+
+
+def test_members_outside_the_target_are_refused(tmp_path):
+    archive = str(tmp_path / "evil.tar")
+    with tarfile.open(archive, "w") as tar_file:
+        (tmp_path / "payload").write_bytes(b"x")
+        tar_file.add(tmp_path / "payload", arcname="../escaped")
+    with pytest.raises(ArchiveError):
+        unpack_archive_file(archive, str(tmp_path / "evil"))
+    assert not os.path.exists(tmp_path / "escaped")
+
+
+def test_the_limit_applies_to_all_the_archives_of_the_pool(tmp_path):
+    archives = [make_zip(tmp_path / f"archive {i}.zip", {f"file {i}.txt": os.urandom(SIZE)}) for i in range(5)]
+    with ArchiveExtractor(max_bytes=int(SIZE * 2.5), workers=2) as extractor:
+        for archive in archives:
+            extractor.submit(archive, archive[:-len(".zip")])
+
+    assert unpacked_bytes(tmp_path) <= SIZE * 2.5
+    assert len(extractor.errors) == len(archives) - 2
+    assert sum(os.path.exists(archive) for archive in archives) == len(archives) - 2
+    assert "were not unpacked" in extractor.report()
@@ -0,0 +1,44 @@
+import asyncio
+import gc
+import time
+
+from benchmarks.generate import make_tree
+from helper_bot_team_1.features.async_sorter import AsyncSorter, BackgroundSort, CANCELLED, DONE
+
+
+def test_cancelled_background_sort_keeps_stderr_clean(tmp_path, capfd, caplog):
+    make_tree(str(tmp_path), 3000)
+    sort = BackgroundSort(str(tmp_path), jobs=4)
+    # cancelled once the sort is deep in the nested folders
+    deadline = time.monotonic() + 10
+    while sort.progress.files < 500 and sort.running and time.monotonic() < deadline:
+        time.sleep(0.001)
+    sort.cancel()
+    gc.collect()
+
+    assert sort.progress.state == CANCELLED
+    assert sort.error is None
+    # asyncio logs the exceptions that were never retrieved, pytest takes the log records away from stderr
+    assert [record.getMessage() for record in caplog.records if record.name == "asyncio"] == []
+    assert capfd.readouterr().err == ""
+
+
+class TaskCountingSorter(AsyncSorter):
+    most_tasks = 0
+
+    async def _run(self, func, *args):
+        self.most_tasks = max(self.most_tasks, len(asyncio.all_tasks()))
+        return await super()._run(func, *args)
+
+
+def test_tasks_dont_grow_with_the_files_of_a_folder(tmp_path):
+    for i in range(300):
+        (tmp_path / f"photo {i}.jpg").write_bytes(b"")
+    sorter = TaskCountingSorter(jobs=2, full=True)
+    asyncio.run(sorter.sort(str(tmp_path)))
+
+    assert sorter.progress.state == DONE
+    assert sorter.progress.files == 300
+    assert len(list((tmp_path / "images").iterdir())) == 300
+    # the main task and four workers
+    assert sorter.most_tasks <= 5
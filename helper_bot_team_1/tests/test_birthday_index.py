@@ -0,0 +1,40 @@
+import datetime
+
+import pytest
+
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.birthday_index import BirthdayIndex
+
+BIRTHDAYS = ("01.01.1990", "31.12.1985", "29.02.2000", "28.02.1999", "01.03.1970", "15.06.2001", "30.12.1960")
+
+
+def make_index() -> tuple[BirthdayIndex, list[Record]]:
+    records = []
+    for i, birthday in enumerate(BIRTHDAYS):
+        record = Record(f"Person {i}")
+        record.add_birthday(birthday)
+        records.append(record)
+    records.append(Record("No birthday"))
+    index = BirthdayIndex()
+    index.build(records)
+    return index, records
+
+
+@pytest.mark.parametrize("today", [datetime.date(2023, 12, 25), datetime.date(2024, 2, 27), datetime.date(2023, 2, 27),
+                                   datetime.date(2023, 3, 1), datetime.date(2024, 1, 1), datetime.date(2023, 6, 15)])
+@pytest.mark.parametrize("period", [0, 1, 2, 7, 30, 200, 364, 365, 1000])
+def test_upcoming_matches_counting_the_days_of_every_contact(today, period):
+    index, records = make_index()
+    days = {record.name.value: record.count_days_to_birthday(today) for record in records if record.birthday}
+    found = index.upcoming(today, period)
+    assert sorted(found) == sorted(name for name, left in days.items() if left <= period)
+    # ordered by the next birthday, the 29th of February and the 28th may come in any order in a non-leap year
+    assert [days[name] for name in found] == sorted(days[name] for name in found)
+
+
+def test_removed_and_changed_birthdays_are_reindexed():
+    index, records = make_index()
+    index.remove("Person 0")
+    records[1].add_birthday("02.01.1985")
+    index.add("Person 1", records[1])
+    assert index.upcoming(datetime.date(2023, 12, 31), 2) == ["Person 1"]
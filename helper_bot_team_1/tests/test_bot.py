@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+from helper_bot_team_1.bot import AssistantBot
+from helper_bot_team_1.main import App
+
+
+@AssistantBot.input_error
+def show_parts(failure: Exception):
+    yield "first"
+    raise failure
+
+
+def test_errors_of_a_result_in_parts_end_it_with_a_message(capsys):
+    App.print_result(show_parts(ValueError("Page must be a number.")))
+    App.print_result(show_parts(KeyError("Ann")))
+    assert capsys.readouterr().out.splitlines() == ["first", "ValueError: Page must be a number.", "first",
+                                                    "Sorry: 'Ann'"]
+
+
+def test_other_errors_of_a_result_in_parts_are_not_caught():
+    parts = show_parts(OSError("disk"))
+    assert next(parts) == "first"
+    with pytest.raises(OSError):
+        next(parts)
+
+
+def test_commands_are_told_without_creating_the_features(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bot = AssistantBot()
+    completions = bot.autocomplete()
+    assert not any(feature.loaded for feature in bot.features)
+
+    for feature in bot.features:
+        assert set(feature.feature.command_handlers) == set(feature.commands)
+        assert all(f"{feature.name()} {command}" in completions for command in feature.commands)
+    bot.close()
+
+
+def test_search_indexes_are_imported_without_the_sorter():
+    code = "import sys, helper_bot_team_1.features.text_index, helper_bot_team_1.features.name_index; " \
+           "print('helper_bot_team_1.features.sorter' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout == "False\n"
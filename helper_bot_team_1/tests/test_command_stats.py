@@ -0,0 +1,10 @@
+import io
+
+from helper_bot_team_1.features.command_stats import Instrumentation, CPU_PROFILE
+
+
+def test_unknown_profile_mode_falls_back_to_cpu():
+    output = io.StringIO()
+    instrumentation = Instrumentation(profile_command="contacts show", profile_mode="mem", output=output)
+    assert instrumentation.profile_mode == CPU_PROFILE
+    assert "Unknown profile mode mem" in output.getvalue()
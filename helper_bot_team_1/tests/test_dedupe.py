@@ -0,0 +1,26 @@
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.dedupe import find_duplicates, folded_contact_name
+
+
+def contact(name: str, phone: str = "", email: str = "") -> Record:
+    record = Record(name)
+    if phone:
+        record.add_phone(phone)
+    if email:
+        record.add_email(email)
+    return record
+
+
+def test_names_are_folded_regardless_of_case_punctuation_and_order():
+    assert folded_contact_name("Ivan Petrenko") == folded_contact_name("petrenko, IVAN") == "ivan petrenko"
+
+
+def test_contacts_with_only_the_same_name_are_reported():
+    found = find_duplicates([contact("Ivan Petrenko", "0671234567"), contact("Petrenko Ivan", "0509876543")])
+    assert [(first, second) for _, first, second, _ in found] == [("Ivan Petrenko", "Petrenko Ivan")]
+
+
+def test_shared_phone_is_reported_with_its_reasons():
+    found = find_duplicates([contact("Ivan Petrenko", "+380671234567"), contact("I. Petrenko", "0671234567")])
+    assert len(found) == 1
+    assert "same phone" in found[0][3]
@@ -0,0 +1,90 @@
+import datetime
+
+import pytest
+
+from helper_bot_team_1.features import importer
+from helper_bot_team_1.features.addressbook import AddressBook, BIRTHDAY_INDEX, PHONE_INDEX
+from helper_bot_team_1.features.birthday_index import BirthdayIndex
+from helper_bot_team_1.features.addressbook_fields import Record
+
+
+@pytest.fixture
+def book(tmp_path):
+    book = AddressBook(str(tmp_path / "address_book.bin"))
+    yield book
+    book.close()
+
+
+def test_csv_rows_are_imported_and_bad_rows_reported_by_line(book, tmp_path):
+    book.handle_command("add", "name=Existing")
+    path = tmp_path / "contacts.csv"
+    path.write_text("Name,Phone,Birthday,Email,Address\n"
+                    "Ann,0671234567;+380501112233,01.02.1990,ann@mail.com,Main street 5\n"
+                    "Bob,12345,,,\n"
+                    "Eve,,31.02.1990,,\n"
+                    "Ann,0679999999,,,\n"
+                    "Existing,,,,\n"
+                    ",0671111111,,,\n"
+                    "Max,,,,\n", encoding="utf-8")
+
+    report = book.handle_command("import", str(path)).splitlines()
+
+    assert report[0] == "2 contacts were imported."
+    assert report[1] == "5 rows were rejected:"
+    assert [line.split(":")[0] for line in report[2:]] == ["line 3", "line 4", "line 5", "line 6", "line 7"]
+    assert "Ann is already in your phonebook." in report[4]
+    assert [phone.value for phone in book.data["Ann"].phones] == ["0671234567", "+380501112233"]
+    assert book.data["Ann"].address == "Main street 5"
+    assert book.data.record_exists("Max")
+
+
+def test_vcard_with_folded_lines_and_dates(book, tmp_path):
+    path = tmp_path / "contacts.vcf"
+    path.write_text("BEGIN:VCARD\r\nVERSION:3.0\r\nFN:Ann\r\n  Petrenko\r\nTEL;TYPE=cell:0671234567\r\n"
+                    "BDAY:1990-02-01\r\nitem1.EMAIL:ann@mail.com\r\nADR:;;Main street 5;Kyiv;;;\r\nEND:VCARD\r\n"
+                    "BEGIN:VCARD\r\nFN:Bob\r\nTEL:bad\r\nEND:VCARD\r\n", encoding="utf-8")
+
+    report = book.handle_command("import", str(path)).splitlines()
+
+    assert report[:2] == ["1 contacts were imported.", "1 rows were rejected:"]
+    assert report[2].startswith("line 10:")
+    ann = book.data["Ann Petrenko"]
+    assert ann.birthday.value == datetime.date(1990, 2, 1)
+    assert ann.email.value == "ann@mail.com"
+    assert ann.address == "Main street 5 Kyiv"
+
+
+def test_undecodable_row_is_rejected_and_the_rest_imported(book, tmp_path):
+    path = tmp_path / "contacts.csv"
+    path.write_bytes(b"name,phone\nAnn,0671234567\nB\xff\xfeb,0501234567\nEve,0931234567\n")
+
+    report = book.handle_command("import", str(path)).splitlines()
+
+    assert report[0] == "2 contacts were imported."
+    assert report[2] == "line 3: The row is not valid UTF-8."
+    assert sorted(name.value for name in book.data) == ["Ann", "Eve"]
+
+
+def test_batches_update_the_built_indexes(book, tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, "BATCH_SIZE", 2)
+    book.data.get_index(BIRTHDAY_INDEX)
+    book.data.get_index(PHONE_INDEX)
+    path = tmp_path / "contacts.csv"
+    path.write_text("name,phone,birthday\n" + "".join(f"Name {i},067000000{i},0{i + 1}.01.1990\n" for i in range(5)),
+                    encoding="utf-8")
+
+    assert book.handle_command("import", str(path)) == "5 contacts were imported."
+    assert book.data.get_index(PHONE_INDEX).lookup("0670000003") == ["Name 3"]
+    assert book.data.get_index(BIRTHDAY_INDEX).upcoming(datetime.date(2023, 1, 1), 400) == \
+        [f"Name {i}" for i in range(5)]
+
+
+def test_birthday_index_batch_replaces_earlier_entries():
+    index = BirthdayIndex()
+    old, new, other = Record("Ann"), Record("Ann"), Record("Bob")
+    old.add_birthday("01.01.1990")
+    new.add_birthday("05.05.1990")
+    other.add_birthday("03.03.1990")
+    index.add("Ann", old)
+    index.add_many([other, new, new])
+    assert index.entries == [(3, 3, "Bob"), (5, 5, "Ann")]
@@ -0,0 +1,89 @@
+import os
+import pickle
+
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.journal import Journal, load_snapshot, is_legacy_snapshot
+from helper_bot_team_1.features.records_container import RecordsContainer
+
+
+def contact(name: str, phone: str = "0671234567") -> Record:
+    record = Record(name)
+    record.add_phone(phone)
+    return record
+
+
+def names(data: dict) -> list[str]:
+    return sorted(str(name) for name in data)
+
+
+def test_changes_are_replayed_without_a_backup(tmp_path):
+    save_file = str(tmp_path / "book.bin")
+    container = RecordsContainer(save_file)
+    container.add_record(contact("Ann"))
+    container.add_record(contact("Bob"))
+    container.remove_record("Ann")
+    changed = container["Bob"]
+    changed.add_phone("0501234567")
+    container.update_record(changed)
+    # no backup_data(): the journal alone keeps the changes
+
+    reloaded = RecordsContainer(save_file)
+    assert names(reloaded) == ["Bob"]
+    assert [phone.value for phone in reloaded["Bob"].phones] == ["0671234567", "0501234567"]
+
+
+def test_torn_tail_is_cut_and_new_entries_follow_it(tmp_path):
+    save_file = str(tmp_path / "book.bin")
+    journal = Journal(save_file)
+    journal.load()
+    journal.put(contact("Ann"))
+    journal.put(contact("Bob"))
+    journal.flush()
+    size = os.path.getsize(journal.journal_file)
+    with open(journal.journal_file, "r+b") as f:
+        f.truncate(size - 5)
+
+    journal = Journal(save_file)
+    assert names(journal.load()) == ["Ann"]
+    journal.put(contact("Eve"))
+    journal.flush()
+    assert names(Journal(save_file).load()) == ["Ann", "Eve"]
+
+
+def test_compaction_merges_the_journal_into_the_snapshot(tmp_path):
+    save_file = str(tmp_path / "book.bin")
+    journal = Journal(save_file, threshold=1)
+    journal.load()
+    for i in range(20):
+        journal.put(contact(f"Name {i}"))
+    journal.remove("Name 3")
+    journal.flush()
+
+    assert not os.path.exists(journal.pending_file)
+    assert len(load_snapshot(save_file)) >= 1
+    assert names(Journal(save_file).load()) == sorted(f"Name {i}" for i in range(20) if i != 3)
+
+
+def test_interrupted_compaction_is_finished_on_load(tmp_path):
+    save_file = str(tmp_path / "book.bin")
+    journal = Journal(save_file)
+    journal.load()
+    journal.put(contact("Ann"))
+    journal.flush()
+    os.replace(journal.journal_file, journal.pending_file)
+
+    journal = Journal(save_file)
+    assert names(journal.load()) == ["Ann"]
+    journal.flush()
+    assert not os.path.exists(journal.pending_file)
+    assert names(load_snapshot(save_file)) == ["Ann"]
+
+
+def test_legacy_pickled_save_file_is_loaded_and_rewritten(tmp_path):
+    save_file = str(tmp_path / "book.bin")
+    with open(save_file, "wb") as f:
+        pickle.dump({"Ann": contact("Ann")}, f)
+
+    assert names(Journal(save_file).load()) == ["Ann"]
+    assert not is_legacy_snapshot(save_file)
+    assert names(load_snapshot(save_file)) == ["Ann"]
@@ -0,0 +1,30 @@
+import pytest
+
+from helper_bot_team_1.features.notebook import Notebook
+
+
+@pytest.fixture
+def notebook(tmp_path):
+    notebook = Notebook(str(tmp_path / "notebook.bin"))
+    yield notebook
+    notebook.close()
+
+
+@pytest.mark.parametrize("fields", ['{"title": 7}', '{"title": "Plans", "text": 5}',
+                                    '{"title": "Plans", "tags": ["home", 1]}', '{"title": "Plans", "tags": {"a": 1}}'])
+def test_make_refuses_fields_of_wrong_types(notebook, fields):
+    with pytest.raises(ValueError):
+        notebook.handle_command("make", fields)
+    assert not notebook.data.record_exists("Plans")
+    assert list(notebook.handle_command("search", "plans")) == \
+        ["Sorry, couldn't find any records that match the query."]
+
+
+def test_change_refuses_fields_of_wrong_types(notebook):
+    notebook.handle_command("make", '{"title": "Plans", "text": "Buy milk", "tags": ["home"]}')
+    for fields in ('{"title": "Plans", "text": 5}', '{"title": "Plans", "new_title": 5}',
+                   '{"title": "Plans", "tags": [1]}'):
+        with pytest.raises(ValueError):
+            notebook.handle_command("change", fields)
+    assert notebook.data["Plans"].text == "Buy milk"
+    assert "Plans" in next(iter(notebook.handle_command("search", "milk")))
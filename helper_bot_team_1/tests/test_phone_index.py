@@ -0,0 +1,44 @@
+import pytest
+
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.phone_index import PhoneTrie, normalize_phone, is_phone_query
+
+
+def contact(name: str, *phones: str) -> Record:
+    record = Record(name)
+    for phone in phones:
+        record.add_phone(phone)
+    return record
+
+
+@pytest.mark.parametrize("phone", ["+380671234567", "380671234567", "0671234567", "+38 (067) 123-45-67"])
+def test_every_format_is_normalized_to_the_same_digits(phone):
+    assert normalize_phone(phone) == "380671234567"
+
+
+@pytest.mark.parametrize("query, expected", [("0671234567", True), ("+38067", True), ("067 12", True),
+                                             ("06", False), ("John", False), ("067a", False)])
+def test_phone_queries_are_told_from_other_queries(query, expected):
+    assert is_phone_query(query) is expected
+
+
+def test_lookup_by_a_phone_or_a_prefix_in_any_format():
+    trie = PhoneTrie()
+    trie.build([contact("Ann", "0671234567", "+380501112233"), contact("Bob", "380679999999"), contact("Eve")])
+    assert trie.lookup("0671234567") == ["Ann"]
+    assert trie.lookup("+380671234567") == ["Ann"]
+    assert trie.lookup("067") == ["Ann", "Bob"]
+    assert trie.lookup("38050") == ["Ann"]
+    assert trie.lookup("093") == []
+
+
+def test_removed_phones_are_pruned():
+    trie = PhoneTrie()
+    trie.build([contact("Ann", "0671234567"), contact("Bob", "0679999999")])
+    trie.add("Ann", contact("Ann", "0501112233"))
+    trie.remove("Bob")
+    assert trie.lookup("067") == []
+    assert trie.lookup("050") == ["Ann"]
+    assert list(trie.root) == ["3"]
+    trie.remove("Ann")
+    assert trie.root == {}
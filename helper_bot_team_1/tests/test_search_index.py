@@ -0,0 +1,37 @@
+import pytest
+
+from benchmarks.generate import make_contacts
+from helper_bot_team_1.features.records_container import RecordsContainer, SEARCH_INDEX, STORAGES
+
+NEEDLES = ("petrenko", "пет", "o", "67", "example.com", "olena kovalenko 1", "nothing like this", "user1@", " ")
+
+
+def substring_search(container: RecordsContainer, needle: str) -> list[str]:
+    return [record.name.value for record in container.data.values() if needle in str(record).lower()]
+
+
+@pytest.mark.parametrize("storage", list(STORAGES))
+def test_index_finds_the_same_records_as_a_substring_scan(tmp_path, storage):
+    container = RecordsContainer(str(tmp_path / "book.bin"), storage)
+    container.add_records(make_contacts(300))
+    index = container.get_index(SEARCH_INDEX)
+    for needle in NEEDLES:
+        assert index.search(needle) == substring_search(container, needle), needle
+
+
+@pytest.mark.parametrize("storage", list(STORAGES))
+def test_index_follows_changes_and_removals(tmp_path, storage):
+    container = RecordsContainer(str(tmp_path / "book.bin"), storage)
+    records = make_contacts(50)
+    container.add_records(records)
+    index = container.get_index(SEARCH_INDEX)
+
+    changed = container[records[0].name.value]
+    changed.add_email("unique@changed.org")
+    container.update_record(changed)
+    container.remove_record(records[1].name.value)
+
+    assert index.search("unique@changed") == [records[0].name.value]
+    assert index.search(records[1].name.value.lower()) == []
+    for needle in NEEDLES:
+        assert index.search(needle) == substring_search(container, needle), needle
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from helper_bot_team_1.server import BotServer, BotClient, ReadWriteLock, parse_address, render
+
+
+async def hold(lock: ReadWriteLock, mode: str, events: list, name: str, release: asyncio.Event) -> None:
+    async with (lock.reading() if mode == "read" else lock.writing()):
+        events.append(f"{name} in")
+        await release.wait()
+        events.append(f"{name} out")
+
+
+def test_readers_share_the_lock_and_a_writer_waits_for_them():
+    async def scenario():
+        lock = ReadWriteLock()
+        events = []
+        release = asyncio.Event()
+        readers = [asyncio.create_task(hold(lock, "read", events, f"reader {i}", release)) for i in range(2)]
+        await asyncio.sleep(0)
+        writer = asyncio.create_task(hold(lock, "write", events, "writer", asyncio.Event()))
+        await asyncio.sleep(0.01)
+        assert events == ["reader 0 in", "reader 1 in"]
+
+        release.set()
+        await asyncio.gather(*readers)
+        await asyncio.sleep(0.01)
+        assert events[-1] == "writer in"
+        writer.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_a_waiting_writer_keeps_new_readers_out():
+    async def scenario():
+        lock = ReadWriteLock()
+        events = []
+        first_reader_done, writer_done = asyncio.Event(), asyncio.Event()
+        tasks = [asyncio.create_task(hold(lock, "read", events, "reader 1", first_reader_done))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(hold(lock, "write", events, "writer", writer_done)))
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(hold(lock, "read", events, "reader 2", asyncio.Event())))
+        await asyncio.sleep(0.01)
+        assert events == ["reader 1 in"]
+
+        first_reader_done.set()
+        await asyncio.sleep(0.01)
+        assert events == ["reader 1 in", "reader 1 out", "writer in"]
+        writer_done.set()
+        await asyncio.sleep(0.01)
+        assert events[-1] == "reader 2 in"
+        tasks[-1].cancel()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("address, expected", [("127.0.0.1:8765", ("127.0.0.1", 8765)), (":9000", ("127.0.0.1", 9000)),
+                                               ("helper_bot.sock", None), ("/tmp/a:1", None)])
+def test_tcp_addresses_are_told_from_socket_paths(address, expected):
+    assert parse_address(address) == expected
+
+
+def test_results_in_parts_are_read_to_the_end():
+    assert render(None) == []
+    assert render("done") == ["done"]
+    assert render(str(i) for i in range(3)) == ["0", "1", "2"]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = BotServer(str(tmp_path / "bot.sock"))
+    loop = asyncio.new_event_loop()
+    serving = loop.create_task(server.serve_forever())
+    thread = threading.Thread(target=loop.run_until_complete, args=(asyncio.gather(serving, return_exceptions=True),))
+    thread.start()
+    while server._server is None or not server._server.is_serving():
+        time.sleep(0.001)
+    yield server
+    loop.call_soon_threadsafe(serving.cancel)
+    thread.join()
+    loop.close()
+
+
+def test_clients_share_the_data_of_one_bot(server):
+    first, second = BotClient(server.address), BotClient(server.address)
+    assert first.handle("contacts", ["add", "name=Ann", "phones=0671234567"]) == \
+        ["Contact Ann was created successfully!"]
+    found = second.handle("contacts", ["search", "0671234567"])
+    assert len(found) == 1 and "Ann" in found[0]
+    assert second.handle("contacts", ["add", "name=Ann"])[0].startswith("ValueError: This name is already")
+    first.close()
+    second.close()
+
+
+def test_bad_requests_get_an_error(server):
+    client = BotClient(server.address)
+    for request in (b"not json\n", b'{"feature": "contacts"}\n', b'{"feature": 1, "args": []}\n'):
+        client.file.write(request)
+        client.file.flush()
+        assert json.loads(client.file.readline())["error"].startswith("Bad request:")
+    client.close()
@@ -0,0 +1,65 @@
+import io
+import marshal
+import pickle
+
+import pytest
+
+from helper_bot_team_1.features.addressbook_fields import Record
+from helper_bot_team_1.features.notebook import NoteRecord
+from helper_bot_team_1.features.snapshot import MAGIC, VERSION, COMPRESSIONS, NO_COMPRESSION, MARSHAL_VERSION, \
+    PICKLED_ID, TRAILER_SIZE, SnapshotError, frame_header, read_records, write_records
+
+
+class Exploit:
+    created = []
+
+    def __reduce__(self):
+        return Exploit.created.append, ("pwned",)
+
+
+def crafted_snapshot(records: list, classes: list = ()) -> io.BytesIO:
+    payload = marshal.dumps((list(classes), records), MARSHAL_VERSION)
+    return io.BytesIO(MAGIC + bytes((VERSION, COMPRESSIONS.index(NO_COMPRESSION)))
+                      + frame_header(payload) + payload
+                      + frame_header(b"") + len(records).to_bytes(TRAILER_SIZE, "big"))
+
+
+def test_records_round_trip():
+    contact = Record("John")
+    contact.add_phone("0671234567")
+    contact.add_birthday("01.02.1990")
+    note = NoteRecord("Plans", "Buy milk", ["home", "shop"])
+    file = io.BytesIO()
+    write_records(file, [contact, note])
+    file.seek(0)
+    loaded_contact, loaded_note = read_records(file)
+    assert str(loaded_contact) == str(contact)
+    assert str(loaded_note) == str(note)
+
+
+def test_unsupported_value_is_not_written():
+    note = NoteRecord("Plans", "Buy milk", [])
+    note.text = {"not": "a supported value"}
+    with pytest.raises(SnapshotError):
+        write_records(io.BytesIO(), [note])
+
+
+def test_crafted_pickled_value_is_refused():
+    file = crafted_snapshot([(PICKLED_ID, pickle.dumps(Exploit()))])
+    with pytest.raises(SnapshotError):
+        list(read_records(file))
+    assert Exploit.created == []
+
+
+def test_crafted_class_with_reserved_id_is_refused():
+    file = crafted_snapshot([(PICKLED_ID,)], [(PICKLED_ID, "builtins", "object", ())])
+    with pytest.raises(SnapshotError):
+        list(read_records(file))
+
+
+def test_damaged_frame_is_refused():
+    file = crafted_snapshot([])
+    data = bytearray(file.getvalue())
+    data[len(MAGIC) + 2 + 8] ^= 0xFF
+    with pytest.raises(SnapshotError):
+        list(read_records(io.BytesIO(bytes(data))))
@@ -0,0 +1,90 @@
+import os
+import time
+
+import pytest
+
+from helper_bot_team_1.features import sorter
+from helper_bot_team_1.features.sorter import SortManifest, sort_folder, MANIFEST_NAME
+
+
+def make_folder(root) -> None:
+    (root / "trip").mkdir()
+    (root / "trip" / "photo.jpg").write_bytes(b"jpg")
+    (root / "trip" / "notes.xyz").write_bytes(b"unknown")
+    (root / "song.mp3").write_bytes(b"mp3")
+
+
+def age_manifest(root) -> None:
+    # a real sort happens long after the last one, here the directories would still look racily changed
+    future = time.time_ns() + 10 * sorter.RACY_WINDOW_NS
+    os.utime(root / MANIFEST_NAME, ns=(future, future))
+
+
+def touch(directory) -> None:
+    # the mtime may be too coarse to change right after the last sort
+    later = os.stat(directory).st_mtime_ns + sorter.RACY_WINDOW_NS
+    os.utime(directory, ns=(later, later))
+
+
+def listed_directories(monkeypatch) -> list[str]:
+    listed = []
+    file_filter = SortManifest.file_filter
+
+    def spy(manifest, path):
+        listed.append(os.path.relpath(path, manifest.root))
+        return file_filter(manifest, path)
+
+    monkeypatch.setattr(SortManifest, "file_filter", spy)
+    return listed
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_unchanged_directories_are_not_listed_again(tmp_path, monkeypatch, jobs):
+    make_folder(tmp_path)
+    sort_folder(str(tmp_path), jobs=jobs)
+    assert (tmp_path / "trip" / "images" / "photo.jpg").exists()
+    assert (tmp_path / "audio" / "song.mp3").exists()
+    assert (tmp_path / "trip" / "notes.xyz").exists()
+    age_manifest(tmp_path)
+
+    listed = listed_directories(monkeypatch)
+    sort_folder(str(tmp_path), jobs=jobs)
+    # the sorted folder itself is changed by saving the manifest into it
+    assert listed == ["."]
+
+
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_only_new_and_changed_files_are_looked_at(tmp_path, monkeypatch, jobs):
+    make_folder(tmp_path)
+    sort_folder(str(tmp_path), jobs=jobs)
+    (tmp_path / "trip" / "film.mp4").write_bytes(b"mp4")
+    touch(tmp_path / "trip")
+    age_manifest(tmp_path)
+
+    manifest = SortManifest.load(str(tmp_path))
+    files, subdirectories = manifest.scan(str(tmp_path / "trip"))
+    # the unknown file was left in place by the last sort and hasn't changed since
+    assert [os.path.basename(f) for f in files] == ["film.mp4"]
+
+    listed = listed_directories(monkeypatch)
+    sort_folder(str(tmp_path), jobs=jobs)
+    assert listed == [".", "trip"]
+    assert (tmp_path / "trip" / "video" / "film.mp4").exists()
+
+
+def test_full_sort_ignores_the_manifest(tmp_path, monkeypatch):
+    make_folder(tmp_path)
+    sort_folder(str(tmp_path))
+    age_manifest(tmp_path)
+
+    listed = listed_directories(monkeypatch)
+    sort_folder(str(tmp_path), full=True)
+    assert sorted(listed) == [".", "trip"]
+
+
+def test_unreadable_manifest_sorts_everything(tmp_path):
+    make_folder(tmp_path)
+    (tmp_path / MANIFEST_NAME).write_text("not json")
+    manifest = SortManifest.load(str(tmp_path))
+    assert manifest.previous == {}
+    assert manifest.unchanged_subdirectories(str(tmp_path)) is None
@@ -0,0 +1,123 @@
+import datetime
+import threading
+
+from benchmarks.generate import make_contacts, make_notes
+from helper_bot_team_1.features.birthday_index import BirthdayIndex
+from helper_bot_team_1.features.phone_index import PhoneTrie
+from helper_bot_team_1.features.records_container import RecordsContainer, JOURNAL_STORAGE, SQLITE_STORAGE
+from helper_bot_team_1.features.sqlite_storage import SqliteBirthdayIndex, SqlitePhoneIndex, SqliteTagIndex
+from helper_bot_team_1.features.tag_index import TagIndex
+
+QUERIES = (("work",), ("work", "home"), ("work", "OR", "дім"), ("NOT", "urgent"), ("ROBOTA",), ("missing",))
+
+
+def contacts_in(storage: str, save_file: str, records: list) -> RecordsContainer:
+    container = RecordsContainer(save_file, storage)
+    container.register_index("birthdays", BirthdayIndex())
+    container.register_index("phones", PhoneTrie())
+    container.add_records(records)
+    return container
+
+
+def notes_in(storage: str, save_file: str, records: list) -> RecordsContainer:
+    container = RecordsContainer(save_file, storage)
+    container.register_index("tags", TagIndex())
+    container.add_records(records)
+    return container
+
+
+def test_contacts_are_found_in_sql_as_in_memory(tmp_path):
+    records = make_contacts(300)
+    memory = contacts_in(JOURNAL_STORAGE, str(tmp_path / "memory.bin"), records)
+    sql = contacts_in(SQLITE_STORAGE, str(tmp_path / "sql.bin"), records)
+    assert isinstance(sql.get_index("birthdays"), SqliteBirthdayIndex)
+    assert isinstance(sql.get_index("phones"), SqlitePhoneIndex)
+
+    for today in (datetime.date(2023, 12, 25), datetime.date(2024, 2, 28), datetime.date(2023, 6, 15)):
+        for period in (0, 7, 60, 365):
+            assert sql.get_index("birthdays").upcoming(today, period) == \
+                memory.get_index("birthdays").upcoming(today, period)
+    for prefix in ("0", "06", "+38067", records[0].phones[0].value if records[0].phones else "050", "999"):
+        assert sql.get_index("phones").lookup(prefix) == memory.get_index("phones").lookup(prefix)
+    memory.close()
+    sql.close()
+
+
+def test_notes_are_found_by_tags_in_sql_as_in_memory(tmp_path):
+    records = make_notes(200, words=5)
+    memory = notes_in(JOURNAL_STORAGE, str(tmp_path / "memory.bin"), records)
+    sql = notes_in(SQLITE_STORAGE, str(tmp_path / "sql.bin"), records)
+    assert isinstance(sql.get_index("tags"), SqliteTagIndex)
+
+    assert sql.get_index("tags").counts() == memory.get_index("tags").counts()
+    for query in QUERIES:
+        assert sql.get_index("tags").query(*query) == memory.get_index("tags").query(*query)
+    assert sql.get_index("tags").tags_of("note 1") == memory.get_index("tags").tags_of("note 1")
+    memory.close()
+    sql.close()
+
+
+def test_keys_follow_changes_and_are_written_for_an_existing_database(tmp_path):
+    save_file = str(tmp_path / "notes.bin")
+    container = RecordsContainer(save_file, SQLITE_STORAGE)
+    container.add_records(make_notes(20, words=5))
+    container.close()
+
+    # the database was filled without the tag index, its keys are written when it is first used
+    container = notes_in(SQLITE_STORAGE, save_file, [])
+    tags = container.get_index("tags")
+    assert tags.counts() == notes_in(JOURNAL_STORAGE, str(tmp_path / "memory.bin"), make_notes(20, words=5)) \
+        .get_index("tags").counts()
+
+    note = container["note 1"]
+    note.change_tags("Fresh", "fresh")
+    container.update_record(note)
+    container.remove_record("note 2")
+    assert tags.tags_of("note 1") == frozenset({"fresh"})
+    assert tags.query("fresh") == ["note 1"]
+    assert tags.tags_of("note 2") == frozenset()
+    container.close()
+
+    reloaded = notes_in(SQLITE_STORAGE, save_file, [])
+    assert reloaded.get_index("tags").query("fresh") == ["note 1"]
+    reloaded.close()
+
+
+def test_keys_of_an_unused_index_are_rewritten_after_changes(tmp_path):
+    save_file = str(tmp_path / "notes.bin")
+    notes_in(SQLITE_STORAGE, save_file, [make_notes(1)[0]]).close()
+
+    # a session without the tag index changes the notes, so the stored tags can't be trusted any more
+    container = RecordsContainer(save_file, SQLITE_STORAGE)
+    note = container["note 0"]
+    note.change_tags("later")
+    container.update_record(note)
+    container.close()
+
+    reloaded = notes_in(SQLITE_STORAGE, save_file, [])
+    assert reloaded.get_index("tags").counts() == [("later", 1)]
+    reloaded.close()
+
+
+def test_records_are_read_from_several_threads(tmp_path):
+    container = RecordsContainer(str(tmp_path / "book.bin"), SQLITE_STORAGE)
+    records = make_contacts(50)
+    container.add_records(records)
+    errors = []
+
+    def read():
+        try:
+            for _ in range(200):
+                for record in records:
+                    assert record.name.value in container.data
+                list(container.data.values())
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    container.close()
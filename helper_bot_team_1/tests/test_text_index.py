@@ -0,0 +1,5 @@
+from helper_bot_team_1.features.text_index import tokenize
+
+
+def test_cyrillic_and_transliterated_words_are_the_same_token():
+    assert tokenize("Київ") == tokenize("kijiv") == tokenize("KIJIV") == ["kijiv"]